@@ -0,0 +1,84 @@
+"""Compare dispatching plain keyword launches through click with the fast path
+in YeahYeah.launch_plain(). Nothing is actually opened.
+
+usage:
+
+$ python benchmarks/bench_dispatch.py [--repeat N]
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import timeit
+from pathlib import Path
+from unittest.mock import patch
+
+from yeahyeah.core import YeahYeah
+
+PLUGIN_PATHS = [
+    "yeahyeah_plugins.url_pattern_plugin.core.UrlPatternsPlugin",
+    "yeahyeah_plugins.path_item_plugin.core.PathItemPlugin",
+]
+
+CALLS = [["wiki", "an_article"], ["search", "some", "words"], ["home"]]
+
+
+def create_yeahyeah(configuration_path):
+    """Lazy YeahYeah instance with default plugin config and a valid index"""
+    jj = YeahYeah(configuration_path=configuration_path)
+    for path in PLUGIN_PATHS:
+        jj.add_lazy_plugin(path)
+    jj.load_all_plugins()  # writes default config files and command index
+
+    jj = YeahYeah(configuration_path=configuration_path)
+    for path in PLUGIN_PATHS:
+        jj.add_lazy_plugin(path)
+    return jj
+
+
+def via_click(jj, args):
+    try:
+        jj.root_cli.main(args=args, prog_name="jj")
+    except SystemExit:
+        pass
+
+
+def via_fast_path(jj, args):
+    if not jj.launch_plain(args):
+        raise ValueError(f"{args} was not launched directly")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    repeat = parser.parse_args().repeat
+
+    with contextlib.ExitStack() as stack:
+        folder = stack.enter_context(tempfile.TemporaryDirectory())
+        for target in (
+            "click.launch",
+            "webbrowser.open_new",
+            "yeahyeah_plugins.path_item_plugin.core.open_terminal",
+        ):
+            stack.enter_context(patch(target))
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+
+        jj = create_yeahyeah(Path(folder))
+        results = {}
+        for args in CALLS:
+            for name, dispatch in (("click", via_click), ("fast", via_fast_path)):
+                seconds = timeit.timeit(lambda: dispatch(jj, args), number=repeat)
+                results[" ".join(args), name] = seconds / repeat * 1e6
+
+    print(f"{'command':<25}{'click (us)':>12}{'fast (us)':>12}{'speedup':>10}")
+    for args in CALLS:
+        command = " ".join(args)
+        click_us, fast_us = results[command, "click"], results[command, "fast"]
+        print(
+            f"{command:<25}{click_us:>12.1f}{fast_us:>12.1f}"
+            f"{click_us / fast_us:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
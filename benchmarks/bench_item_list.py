@@ -0,0 +1,98 @@
+"""Time getting, checking and removing menu items by name in a MenuItemList, and
+the same with a plain list scan, as admin remove used to do. Items are looked
+up and removed from all over the list. Also reports memory per item, for item
+objects with __slots__ and for the same objects with a __dict__.
+
+usage:
+
+$ python benchmarks/bench_item_list.py [--size N] [--lookups N]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from yeahyeah_plugins.url_pattern_plugin.core import URLPatternList, UrlPattern
+
+
+def timed(function):
+    """Seconds function takes to run once"""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+class DictUrlPattern(UrlPattern):
+    """UrlPattern with a __dict__, like items were before they had __slots__"""
+
+
+def bytes_per_item(item_class, size):
+    """Memory allocated per item for a URLPatternList of size items"""
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    item_list = URLPatternList(
+        items=[
+            item_class(name=f"url_{i}", pattern=f"https://site{i}.example.com/{{q}}")
+            for i in range(size)
+        ]
+    )
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del item_list
+    return used / size
+
+
+def scan_remove(items, names):
+    """Remove by scanning the whole list for each name"""
+    for name in names:
+        for x in [x for x in items if x.name == name]:
+            items.remove(x)
+
+
+def index_remove(item_list, names):
+    for name in names:
+        item_list.remove(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    items = [
+        UrlPattern(name=f"url_{i}", pattern=f"https://site{i}.example.com/{{q}}")
+        for i in range(args.size)
+    ]
+    names = random.Random(0).sample([x.name for x in items], args.lookups)
+
+    item_list = URLPatternList(items=[])
+    timings = {"create": timed(lambda: item_list.extend(items))}
+    timings["get"] = timed(lambda: [item_list.get(x) for x in names])
+    timings["contains"] = timed(lambda: [x in item_list for x in names])
+    timings["remove"] = timed(lambda: index_remove(item_list, names))
+    timings["append duplicates"] = timed(lambda: item_list.extend(items))
+
+    plain = list(items)
+    baseline = {
+        "create": timed(lambda: list(items)),
+        "get": timed(lambda: [next(y for y in plain if y.name == x) for x in names]),
+        "contains": timed(lambda: [any(y.name == x for y in plain) for x in names]),
+        "remove": timed(lambda: scan_remove(plain, names)),
+    }
+
+    print(f"{args.size} items, {args.lookups} names looked up or removed")
+    print(f"{'operation':<20}{'index ms':>12}{'list scan ms':>15}")
+    for operation, seconds in timings.items():
+        scan = f"{baseline[operation] * 1000:>15.1f}" if operation in baseline else ""
+        print(f"{operation:<20}{seconds * 1000:>12.1f}{scan}")
+
+    print(f"\n{'memory per item':<20}{'bytes':>12}")
+    for item_class in (UrlPattern, DictUrlPattern):
+        print(
+            f"{item_class.__name__:<20}{bytes_per_item(item_class, args.size):>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""How do yeahyeah operations scale with catalog size? Generates url_patterns.yaml
+and path_items.yaml catalogs of different sizes and times loading, creating
+commands, help, completion, a keyword launch and admin add and remove for each.
+Nothing is actually opened.
+
+Cold times are wall clock times of a fresh python interpreter doing the
+operation once, including interpreter start and imports. Warm times are median
+times of doing the operation again in a process that has done it before, each
+time with a fresh YeahYeah instance.
+
+usage:
+
+$ python benchmarks/bench_scaling.py                          # print results
+$ python benchmarks/bench_scaling.py --save baseline.json     # store baseline
+$ python benchmarks/bench_scaling.py --compare baseline.json  # flag regressions
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from click.shell_completion import ShellComplete
+
+from yeahyeah import __version__
+from yeahyeah.core import YeahYeah, YeahYeahSettings, YeahYeahSettingsFile
+from yeahyeah_plugins.path_item_plugin.core import (
+    PathItem,
+    PathItemList,
+    PathItemPlugin,
+)
+from yeahyeah_plugins.url_pattern_plugin.core import (
+    URLPatternList,
+    UrlPattern,
+    UrlPatternsPlugin,
+    WildCardUrlPattern,
+)
+
+PLUGIN_PATHS = [
+    "yeahyeah_plugins.url_pattern_plugin.core.UrlPatternsPlugin",
+    "yeahyeah_plugins.path_item_plugin.core.PathItemPlugin",
+]
+CATALOG_FILES = [
+    "url_patterns.yaml",
+    "path_items.yaml",
+    "command_index.json",
+    "command_index.keys",
+]
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+LAUNCHERS = [  # stubbed, so that nothing is actually opened
+    "click.launch",
+    "webbrowser.open_new",
+    "yeahyeah_plugins.path_item_plugin.core.open_terminal",
+]
+
+
+def create_catalog(folder, size):
+    """Write catalogs with size url patterns and size path items to folder, plus
+    yeahyeah settings and a valid command index. Url patterns are a mix of
+    plain, templated and wildcard patterns
+    """
+    url_patterns = []
+    for i in range(size):
+        if i % 3 == 0:
+            url_patterns.append(
+                UrlPattern(name=f"url_{i}", pattern=f"https://site{i}.example.com")
+            )
+        elif i % 3 == 1:
+            url_patterns.append(
+                UrlPattern(
+                    name=f"url_{i}",
+                    pattern=f"https://site{i}.example.com/{{query}}/page",
+                    help_text=f"Templated pattern number {i}",
+                )
+            )
+        else:
+            url_patterns.append(
+                WildCardUrlPattern(
+                    name=f"url_{i}", pattern=f"https://search{i}.example.com/?q={{q}}"
+                )
+            )
+    path_items = [
+        PathItem(name=f"path_{i}", path=f"/tmp/path/{i}") for i in range(size)
+    ]
+
+    folder.mkdir(parents=True, exist_ok=True)
+    with open(folder / "url_patterns.yaml", "w") as f:
+        URLPatternList(items=url_patterns).save(f)
+    with open(folder / "path_items.yaml", "w") as f:
+        PathItemList(items=path_items).save(f)
+    YeahYeahSettingsFile(folder / "yeahyeah_settings.json").save_settings(
+        YeahYeahSettings(PLUGIN_PATHS)
+    )
+    create_yeahyeah(folder).load_all_plugins()  # writes command index
+
+    pristine = folder / "pristine"
+    pristine.mkdir(exist_ok=True)
+    for name in CATALOG_FILES:
+        shutil.copy2(folder / name, pristine / name)
+
+
+def restore_catalog(folder):
+    """Undo any changes to catalog files. Keeps modification times, so that the
+    command index stays valid
+    """
+    for name in CATALOG_FILES:
+        shutil.copy2(folder / "pristine" / name, folder / name)
+    for journal in folder.glob("*.journal"):
+        journal.unlink()
+
+
+def create_yeahyeah(folder):
+    """Fresh YeahYeah instance, as created by the jj entry point"""
+    jj = YeahYeah(configuration_path=folder)
+    for path in PLUGIN_PATHS:
+        jj.add_lazy_plugin(path)
+    return jj
+
+
+def run_jj(folder, args):
+    """Run jj with args the way the entry point does, without exiting"""
+    jj = create_yeahyeah(folder)
+    if not jj.launch_plain(args):
+        jj.root_cli.main(args=args, prog_name="jj", standalone_mode=False)
+
+
+def load(folder):
+    with open(folder / "url_patterns.yaml") as f:
+        URLPatternList.load(f)
+    with open(folder / "path_items.yaml") as f:
+        PathItemList.load(f)
+
+
+def get_commands(folder):
+    context = create_yeahyeah(folder).context
+    for plugin_class in (UrlPatternsPlugin, PathItemPlugin):
+        plugin_class.init_from_context(context).get_commands()
+
+
+def help_text(folder):
+    run_jj(folder, ["--help"])
+
+
+def completion(folder):
+    jj = create_yeahyeah(folder)
+    completer = ShellComplete(jj.root_cli, {}, "jj", "_JJ_COMPLETE")
+    completer.get_completions(args=[], incomplete="url_1")
+
+
+def launch(folder):
+    run_jj(folder, ["url_1", "something"])
+
+
+def admin_add(folder):
+    run_jj(folder, ["admin", "url_patterns", "add", "new_one", "https://new/{q}"])
+
+
+def admin_remove(folder):
+    run_jj(folder, ["admin", "url_patterns", "remove", "url_1"])
+
+
+OPERATIONS = {
+    "load": load,
+    "get_commands": get_commands,
+    "help": help_text,
+    "completion": completion,
+    "launch": launch,
+    "admin_add": admin_add,
+    "admin_remove": admin_remove,
+}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Stub launchers and discard output"""
+    with contextlib.ExitStack() as stack:
+        for target in LAUNCHERS:
+            stack.enter_context(patch(target))
+        devnull = stack.enter_context(open(os.devnull, "w"))
+        stack.enter_context(contextlib.redirect_stdout(devnull))
+        yield
+
+
+def run_once(operation, folder):
+    """Restore catalog, then do operation once with launchers stubbed
+
+    Returns
+    -------
+    float
+        seconds the operation took
+    """
+    restore_catalog(folder)
+    with quiet():
+        start = time.perf_counter()
+        OPERATIONS[operation](folder)
+        return time.perf_counter() - start
+
+
+def time_cold(operation, folder):
+    """Wall clock seconds for a fresh interpreter to do operation once"""
+    restore_catalog(folder)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, __file__, "--run-once", operation, str(folder)], check=True
+    )
+    return time.perf_counter() - start
+
+
+def time_warm(operation, folder, repeat):
+    """Median seconds of doing operation repeat times, after one warm-up run"""
+    run_once(operation, folder)
+    return statistics.median(run_once(operation, folder) for _ in range(repeat))
+
+
+def run_benchmarks(sizes, operations, repeat, cold=True):
+    """
+
+    Returns
+    -------
+    Dict[str, Dict[str, Dict[str, float]]]
+        operation: size: {'cold': seconds, 'warm': seconds}
+    """
+    results = {x: {} for x in operations}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            print(f"Generating catalogs with {size} items..", file=sys.stderr)
+            folder = Path(tmp) / str(size)
+            create_catalog(folder, size)
+            for operation in operations:
+                print(f"  {operation}", file=sys.stderr)
+                timings = {"warm": time_warm(operation, folder, repeat)}
+                if cold:
+                    timings["cold"] = time_cold(operation, folder)
+                results[operation][str(size)] = timings
+    return results
+
+
+def scaling_exponent(results, operation, kind):
+    """Growth of time with catalog size, as exponent k in time ~ size^k, between
+    the two largest sizes. 1 is linear. None if not enough data
+    """
+    timings = sorted(
+        (int(size), x[kind]) for size, x in results[operation].items() if kind in x
+    )
+    if len(timings) < 2:
+        return None
+    (size_a, time_a), (size_b, time_b) = timings[-2:]
+    if time_a <= 0 or time_b <= 0:
+        return None
+    return math.log(time_b / time_a) / math.log(size_b / size_a)
+
+
+def format_results(results):
+    lines = [f"{'operation':<15}{'size':>8}{'warm ms':>12}{'cold ms':>12}"]
+    for operation, by_size in results.items():
+        for size, timings in by_size.items():
+            cold = f"{timings['cold'] * 1000:>12.1f}" if "cold" in timings else ""
+            lines.append(
+                f"{operation:<15}{size:>8}{timings['warm'] * 1000:>12.1f}{cold}"
+            )
+        exponent = scaling_exponent(results, operation, "warm")
+        if exponent is not None:
+            lines.append(f"{'':<15}{'scaling':>8}{f'n^{exponent:.2f}':>12}")
+    return "\n".join(lines)
+
+
+def compare(results, baseline, threshold, min_difference=0.001):
+    """Find operations that got slower than baseline
+
+    Parameters
+    ----------
+    results: Dict
+        As returned by run_benchmarks()
+    baseline: Dict
+        Results of an earlier run
+    threshold: float
+        Flag as regression when slower than this times the baseline
+    min_difference: float, optional
+        Ignore differences smaller than this many seconds. Defaults to 1 ms
+
+    Returns
+    -------
+    Tuple[List[str], List[str]]
+        Lines comparing all timings, descriptions of regressions
+    """
+    lines = [f"{'operation':<15}{'size':>8}{'kind':>6}{'base ms':>10}{'now ms':>10}"]
+    regressions = []
+    for operation, by_size in results.items():
+        for size, timings in by_size.items():
+            for kind, seconds in timings.items():
+                try:
+                    base = baseline[operation][size][kind]
+                except KeyError:
+                    continue
+                ratio = seconds / base if base else math.inf
+                flag = ""
+                if ratio > threshold and seconds - base > min_difference:
+                    flag = f"  REGRESSION x{ratio:.2f}"
+                    regressions.append(f"{operation} {size} {kind} x{ratio:.2f}")
+                lines.append(
+                    f"{operation:<15}{size:>8}{kind:>6}{base * 1000:>10.1f}"
+                    f"{seconds * 1000:>10.1f}{flag}"
+                )
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda x: [int(y) for y in x.split(",")],
+        default=DEFAULT_SIZES,
+        help="Comma-separated catalog sizes",
+    )
+    parser.add_argument(
+        "--operations",
+        type=lambda x: x.split(","),
+        default=list(OPERATIONS),
+        help=f"Comma-separated subset of {','.join(OPERATIONS)}",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Warm runs per timing")
+    parser.add_argument("--no-cold", action="store_true", help="Skip cold timings")
+    parser.add_argument("--save", type=Path, help="Write results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="Compare to this JSON baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="With --compare, flag timings slower than this times the baseline",
+    )
+    parser.add_argument("--run-once", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_once:  # child process for cold timing
+        operation, folder = args.run_once
+        with quiet():
+            OPERATIONS[operation](Path(folder))
+        return 0
+
+    unknown = set(args.operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"Unknown operations {', '.join(sorted(unknown))}")
+
+    results = run_benchmarks(
+        args.sizes, args.operations, args.repeat, cold=not args.no_cold
+    )
+    print(format_results(results))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "yeahyeah": __version__,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(results, baseline["results"], args.threshold)
+        print(f"\nCompared to {args.compare} ({baseline['created']}):")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
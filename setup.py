@@ -31,8 +31,8 @@ setup(
     "just do it come on move",
     entry_points={
         "console_scripts": [
-            "yeahyeah=yeahyeah.cli:yeahyeah",
-            "jj=yeahyeah.cli:yeahyeah",
+            "yeahyeah=yeahyeah.client:main",
+            "jj=yeahyeah.client:main",
         ]
     },
     install_requires=requirements,
@@ -1,4 +1,7 @@
 import importlib
+import os
+import subprocess
+import sys
 from pathlib import Path
 from unittest.mock import Mock
 
@@ -38,3 +41,39 @@ def test_cli_read_settings_corrupted(monkeypatch):
 
 
 #    assert 'Please check' in result.output
+
+
+def test_cli_import_is_lean(tmpdir):
+    """Launching should not import modules that only admin commands need"""
+    code = (
+        "import sys, yeahyeah.cli; "
+        "print(sorted(x for x in sys.modules if x in {"
+        "'yeahyeah.server', 'yeahyeah.profiling', 'yeahyeah.completion', "
+        "'yeahyeah.layers'}))"
+    )
+    (Path(str(tmpdir)) / ".config" / "yeahyeah").mkdir(parents=True)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "HOME": str(tmpdir)},
+        cwd=str(Path(__file__).parent.parent),
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_read_layers_corrupted(tmpdir):
+    """A layers file that cannot be read should be reported with its path"""
+    config_path = Path(str(tmpdir)) / ".config" / "yeahyeah"
+    config_path.mkdir(parents=True)
+    (config_path / "layers.json").write_text("{not json")
+    result = subprocess.run(
+        [sys.executable, "-c", "import yeahyeah.cli"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "HOME": str(tmpdir)},
+        cwd=str(Path(__file__).parent.parent),
+    )
+    assert result.returncode != 0
+    assert f"Please check {config_path / 'layers.json'}" in result.stdout
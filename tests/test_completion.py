@@ -0,0 +1,107 @@
+import subprocess
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from yeahyeah.completion import get_completion_nodes
+from yeahyeah.core import YeahYeah
+from yeahyeah.objects import MenuItemPluginMixin
+from yeahyeah.plugin_testing import MockContextCliRunner
+
+
+@pytest.fixture()
+def a_lazy_yeahyeah_instance(tmpdir):
+    jj = YeahYeah(configuration_path=Path(str(tmpdir)))
+    jj.add_lazy_plugin("yeahyeah_plugins.url_pattern_plugin.core.UrlPatternsPlugin")
+    jj.add_lazy_plugin("yeahyeah_plugins.path_item_plugin.core.PathItemPlugin")
+    return jj
+
+
+def bash_complete(script_path, words):
+    """Run bash completion for the given command line
+
+    Parameters
+    ----------
+    script_path: Pathlike
+        Bash completion script
+    words: List[str]
+        Words on the command line. Last word is the one being completed
+
+    Returns
+    -------
+    List[str]
+        Completion candidates
+    """
+    command = (
+        f"source {script_path}; "
+        f"COMP_WORDS=({' '.join(repr(x) for x in words)}); "
+        f"COMP_CWORD={len(words) - 1}; "
+        f"_jj_completion; "
+        f'echo "${{COMPREPLY[@]}}"'
+    )
+    result = subprocess.run(
+        ["bash", "-c", command], capture_output=True, text=True, check=True
+    )
+    return result.stdout.split()
+
+
+def test_completion_scripts(a_lazy_yeahyeah_instance):
+    jj = a_lazy_yeahyeah_instance
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args="admin yeahyeah completion-scripts".split(" ")
+    )
+    assert result.exit_code == 0
+
+    bash = jj.completion_scripts.path("bash")
+    assert bash_complete(bash, ["jj", "wi"]) == ["wiki"]
+    assert "admin" in bash_complete(bash, ["jj", ""])
+    assert bash_complete(bash, ["jj", "admin", "path"]) == ["path_items"]
+    assert "remove" in bash_complete(bash, ["jj", "admin", "path_items", ""])
+    assert "--print-only" in bash_complete(bash, ["jj", "home", "-"])
+    assert bash_complete(bash, ["jj", "wiki", "some", ""]) == []
+    assert bash_complete(bash, ["jj", "wiki", ""]) == ["<article_slug>"]
+    assert bash_complete(bash, ["jj", "search", "a", "b", ""]) == ["<query...>"]
+
+    zsh = jj.completion_scripts.path("zsh").read_text()
+    assert "_jj_args[jj wiki]=article_slug" in zsh.replace("'", "")
+    fish = jj.completion_scripts.path("fish").read_text()
+    assert "-n '__jj_at \\'jj\\'' -a 'search' -d 'launch search (url)'" in fish
+
+
+def test_completion_scripts_update(a_lazy_yeahyeah_instance):
+    """Adding an item should update completion scripts right away"""
+    jj = a_lazy_yeahyeah_instance
+    runner = MockContextCliRunner(mock_context=jj.context)
+    runner.invoke(jj.root_cli, args="admin yeahyeah completion-scripts".split(" "))
+    bash = jj.completion_scripts.path("bash")
+    assert bash_complete(bash, ["jj", "new"]) == []
+
+    result = runner.invoke(
+        jj.root_cli, args="admin path_items add new_path /tmp".split(" ")
+    )
+    assert result.exit_code == 0
+    assert bash_complete(bash, ["jj", "new"]) == ["new_path"]
+    assert jj.get_valid_command_index().owner("new_path")
+
+
+def test_completion_from_descriptions(a_lazy_yeahyeah_instance, monkeypatch):
+    """Completion for plugin items should not create their commands, but give
+    the same options and arguments as the commands themselves
+    """
+    jj = a_lazy_yeahyeah_instance
+    jj.load_all_plugins()
+    expected = get_completion_nodes(jj.root_cli, path="jj")
+
+    monkeypatch.setattr(
+        MenuItemPluginMixin,
+        "item_to_command",
+        Mock(side_effect=AssertionError("Command created")),
+    )
+    jj.refresh_commands()
+    nodes = get_completion_nodes(
+        jj.root_cli, path="jj", descriptions=jj.get_root_command_descriptions()
+    )
+    assert nodes.keys() == expected.keys()
+    for path, node in nodes.items():
+        assert vars(node) == vars(expected[path])
@@ -3,12 +3,21 @@
 from pathlib import Path
 from unittest.mock import Mock
 
+import click
 import pytest
 
+import yeahyeah.core
+import yeahyeah_plugins.path_item_plugin.core
 from yeahyeah.persistence import YeahYeahPersistenceException
 from yeahyeah_plugins.clockify_plugin.core import ClockifyPlugin
-from yeahyeah_plugins.path_item_plugin.core import PathItemPlugin
+from yeahyeah_plugins.path_item_plugin.core import (
+    PathItem,
+    PathItemList,
+    PathItemPlugin,
+)
 from yeahyeah_plugins.url_pattern_plugin.core import UrlPatternsPlugin
+from yeahyeah.index import CommandIndex, command_description
+from yeahyeah.objects import MenuItemPluginMixin
 from yeahyeah.plugin_testing import MockContextCliRunner
 
 from yeahyeah.core import (
@@ -62,6 +71,62 @@ def test_command_line_interface(a_yeahyeah_instance_with_plugins, mock_cli_runne
     assert result.exit_code == 0
 
 
+def test_plugin_commands_made_on_demand(
+    a_yeahyeah_instance_with_plugins, mock_cli_runner, monkeypatch
+):
+    """Launching should create a single command, listing should create none"""
+    jj = a_yeahyeah_instance_with_plugins
+    url_plugin = jj.plugins[-1]
+    make_command = Mock(wraps=url_plugin.item_to_command)
+    monkeypatch.setattr(url_plugin, "item_to_command", make_command)
+    launch = Mock()
+    monkeypatch.setattr("yeahyeah.core.click.launch", launch)
+
+    assert {"wiki", "search", "log"} <= set(jj.list_plugin_command_names())
+    assert not make_command.called
+
+    result = mock_cli_runner.invoke(jj.root_cli, args=["wiki", "Python"])
+    assert result.exit_code == 0
+    launch.assert_called_once_with("https://en.wikipedia.org/wiki/Python")
+    assert make_command.call_count == 1
+    assert jj.get_plugin_command("unknown") is None
+
+
+def test_prefix_dispatch(
+    a_yeahyeah_instance_with_plugins, mock_cli_runner, monkeypatch
+):
+    """Unique prefixes launch a command, ambiguous ones list the candidates.
+    Names are sorted once, and again when a catalog changes
+    """
+    jj = a_yeahyeah_instance_with_plugins
+    launch = Mock()
+    monkeypatch.setattr("yeahyeah.core.click.launch", launch)
+
+    result = mock_cli_runner.invoke(jj.root_cli, args=["wi", "Python"])
+    assert result.exit_code == 0
+    launch.assert_called_once_with("https://en.wikipedia.org/wiki/Python")
+    names = jj.root_cli.get_command_names()
+    assert jj.root_cli.get_command_names() is names
+    assert jj.root_cli.list_commands(None) == sorted(names.names)
+
+    add = "admin url_patterns add wikidata https://wikidata.org/{q}"
+    assert mock_cli_runner.invoke(jj.root_cli, args=add.split(" ")).exit_code == 0
+    assert "wikidata" in jj.root_cli.get_command_names()
+    result = mock_cli_runner.invoke(jj.root_cli, args=["wi", "Python"])
+    assert result.exit_code == 2
+    assert "Could be wiki, wikidata" in result.output
+    result = mock_cli_runner.invoke(jj.root_cli, args=["wikid", "Q42"])
+    assert result.exit_code == 0
+    launch.assert_called_with("https://wikidata.org/Q42")
+
+    remove = "admin url_patterns remove wikidata"
+    assert mock_cli_runner.invoke(jj.root_cli, args=remove.split(" ")).exit_code == 0
+    assert "wikidata" not in jj.root_cli.get_command_names()
+    result = mock_cli_runner.invoke(jj.root_cli, args=["wikid", "Q42"])
+    assert result.exit_code == 2
+    assert "No such command 'wikid'" in result.output
+
+
 def test_command_admin_status(a_yeahyeah_instance_with_plugins, mock_cli_runner):
     """Test the yeahyeah admin command"""
     result = mock_cli_runner.invoke(
@@ -147,3 +212,310 @@ def test_plugin_load_errors(a_yeahyeah_instance):
 
     with pytest.raises(AttributeError):
         a_yeahyeah_instance.add_plugin("tests.conftest.MockContextCliRunner")
+
+
+URL_PLUGIN_PATH = "yeahyeah_plugins.url_pattern_plugin.core.UrlPatternsPlugin"
+PATH_PLUGIN_PATH = "yeahyeah_plugins.path_item_plugin.core.PathItemPlugin"
+
+
+@pytest.fixture()
+def a_lazy_yeahyeah_instance(a_yeahyeah_instance):
+    """A YeahYeah instance with plugins added by path, but not imported yet"""
+    a_yeahyeah_instance.add_lazy_plugin(URL_PLUGIN_PATH)
+    a_yeahyeah_instance.add_lazy_plugin(PATH_PLUGIN_PATH)
+    return a_yeahyeah_instance
+
+
+def test_lazy_plugin_load(a_lazy_yeahyeah_instance):
+    """Plugins should only be loaded when a command is requested"""
+    jj = a_lazy_yeahyeah_instance
+    assert len(jj.plugins) == 0
+
+    # Without index, finding a command loads all plugins and writes index
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args=["home", "-p"]
+    )
+    assert result.exit_code == 0
+    assert len(jj.plugins) == 2
+    index = jj.command_index_file.load_index()
+    assert index.owner("home") == PATH_PLUGIN_PATH
+    assert index.owner("wiki") == URL_PLUGIN_PATH
+
+
+@pytest.fixture()
+def an_indexed_yeahyeah_instance(a_lazy_yeahyeah_instance):
+    """A fresh lazy YeahYeah instance for which a valid command index exists"""
+    a_lazy_yeahyeah_instance.load_all_plugins()
+    jj = YeahYeah(configuration_path=a_lazy_yeahyeah_instance.configuration_path)
+    jj.add_lazy_plugin(URL_PLUGIN_PATH)
+    jj.add_lazy_plugin(PATH_PLUGIN_PATH)
+    return jj
+
+
+def test_lazy_plugin_help_from_index(an_indexed_yeahyeah_instance):
+    """Listing commands should not require loading any plugin"""
+    jj = an_indexed_yeahyeah_instance
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args=["--help"]
+    )
+    assert result.exit_code == 0
+    assert "launch search (url)" in result.output
+    assert "home" in result.output
+    assert not jj.plugins
+
+
+def test_lazy_plugin_dispatch_from_index(an_indexed_yeahyeah_instance):
+    """Commands that can be created from index data should not load plugin"""
+    jj = an_indexed_yeahyeah_instance
+    runner = MockContextCliRunner(mock_context=jj.context)
+    result = runner.invoke(jj.root_cli, args=["home", "-p"])
+    assert result.exit_code == 0
+    assert not jj.plugins
+
+    result = runner.invoke(jj.root_cli, args=["wiki", "--help"])
+    assert result.exit_code == 0
+    assert "ARTICLE_SLUG" in result.output
+    assert not jj.plugins
+
+
+def test_lazy_plugin_prefix_dispatch_from_index(an_indexed_yeahyeah_instance):
+    """Prefixes should be resolved from the index, without loading plugins"""
+    jj = an_indexed_yeahyeah_instance
+    runner = MockContextCliRunner(mock_context=jj.context)
+    result = runner.invoke(jj.root_cli, args=["wik", "--help"])
+    assert result.exit_code == 0
+    assert "Usage: root-cli wiki [OPTIONS] ARTICLE_SLUG" in result.output
+    assert not jj.plugins
+
+
+def test_lazy_plugin_index_invalidated(an_indexed_yeahyeah_instance):
+    """Changing a plugin config file should invalidate the index. The new item
+    can be launched by name before the index is written again
+    """
+    jj = an_indexed_yeahyeah_instance
+    with open(jj.configuration_path / "path_items.yaml", "a") as f:
+        f.write("new_item:\n  path: /tmp/new\n")
+
+    assert jj.get_valid_command_index() is None
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args=["new_item", "-p"]
+    )
+    assert result.exit_code == 0
+    assert not jj.plugins
+
+    jj.load_all_plugins()
+    assert len(jj.plugins) == 2
+    assert jj.get_valid_command_index().owner("new_item") == PATH_PLUGIN_PATH
+
+
+def test_lazy_plugin_index_from_items(a_lazy_yeahyeah_instance, monkeypatch):
+    """Index entries should be made from items without creating commands, but
+    describe each command exactly like the command itself
+    """
+    jj = a_lazy_yeahyeah_instance
+    with monkeypatch.context() as m:
+        m.setattr(
+            MenuItemPluginMixin,
+            "item_to_command",
+            Mock(side_effect=AssertionError("Command created")),
+        )
+        jj.load_all_plugins()
+
+    entries = jj.get_valid_command_index().entries
+    assert entries
+    for name, entry in entries.items():
+        assert entry == CommandIndex.make_entry(
+            description=command_description(jj.get_plugin_command(name)),
+            plugin_path=entry["plugin"],
+            data=entry["data"],
+        )
+
+
+def test_lazy_plugin_index_saved_if_outdated(an_indexed_yeahyeah_instance):
+    """Loading all plugins should not write an index that is still valid"""
+    jj = an_indexed_yeahyeah_instance
+    jj.command_index_file.save_index = Mock()
+    jj.load_all_plugins()
+    assert len(jj.plugins) == 2
+    jj.command_index_file.save_index.assert_not_called()
+
+
+def test_lazy_plugin_admin_updates_index_once(a_lazy_yeahyeah_instance, monkeypatch):
+    """An admin command that adds an item should save the index once, and only
+    describe the command that changed
+    """
+    jj = a_lazy_yeahyeah_instance
+    jj.load_all_plugins()
+    jj = YeahYeah(configuration_path=jj.configuration_path)
+    jj.add_lazy_plugin(URL_PLUGIN_PATH)
+    jj.add_lazy_plugin(PATH_PLUGIN_PATH)
+    jj.save_command_index = Mock(wraps=jj.save_command_index)
+    describe = Mock(wraps=yeahyeah.core.get_command_description)
+    monkeypatch.setattr("yeahyeah.core.get_command_description", describe)
+
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args="admin path_items add new_path /tmp".split(" ")
+    )
+    assert result.exit_code == 0
+    assert jj.save_command_index.call_count == 1
+    assert describe.call_count == 1
+    index = jj.get_valid_command_index()
+    assert index.owner("new_path") == PATH_PLUGIN_PATH
+    assert index.owner("wiki") == URL_PLUGIN_PATH
+
+
+@pytest.mark.parametrize("size", [10, 1000])
+def test_lazy_plugin_admin_add_cost(a_lazy_yeahyeah_instance, monkeypatch, size):
+    """Adding an item should append it to the catalog and describe only that
+    item for the command index, however many items there are
+    """
+    jj = a_lazy_yeahyeah_instance
+    catalog = jj.configuration_path / "path_items.yaml"
+    items = [PathItem(name=f"path_{i}", path=f"/tmp/{i}") for i in range(size)]
+    with open(catalog, "w") as f:
+        PathItemList(items=items).save(f)
+    jj.load_all_plugins()
+    written = catalog.read_text()
+
+    jj = YeahYeah(configuration_path=jj.configuration_path)
+    jj.add_lazy_plugin(URL_PLUGIN_PATH)
+    jj.add_lazy_plugin(PATH_PLUGIN_PATH)
+    describe = Mock(wraps=yeahyeah.core.get_command_description)
+    monkeypatch.setattr("yeahyeah.core.get_command_description", describe)
+    monkeypatch.setattr(
+        MenuItemPluginMixin,
+        "item_to_command",
+        Mock(side_effect=AssertionError("Command created")),
+    )
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args="admin path_items add new_path /tmp".split(" ")
+    )
+    assert result.exit_code == 0
+    assert catalog.read_text() == written
+    assert describe.call_args_list == [
+        ((jj.command_groups[jj.plugins[1]], "new_path"),)
+    ]
+    assert len(jj.get_valid_command_index().entries) > size
+
+
+@pytest.mark.parametrize(
+    "backend, load",
+    [
+        ("yaml", "yeahyeah.journal.MenuItemJournal.load"),
+        ("sqlite", "yeahyeah.store.SQLiteMenuItemStore.load"),
+    ],
+)
+def test_lazy_plugin_launch_without_index(
+    a_lazy_yeahyeah_instance, monkeypatch, backend, load
+):
+    """Without a valid index, a command should be found by name in any storage,
+    without loading any catalog completely
+    """
+    jj = a_lazy_yeahyeah_instance
+    runner = MockContextCliRunner(mock_context=jj.context)
+    result = runner.invoke(
+        jj.root_cli, args=f"admin path_items storage {backend}".split()
+    )
+    assert result.exit_code == 0
+    jj.command_index_file.path.unlink()
+
+    jj = YeahYeah(configuration_path=jj.configuration_path)
+    jj.add_lazy_plugin(URL_PLUGIN_PATH)
+    jj.add_lazy_plugin(PATH_PLUGIN_PATH)
+    monkeypatch.setattr(load, Mock(side_effect=AssertionError("Loaded all items")))
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args=["home", "-p"]
+    )
+    assert result.exit_code == 0
+    assert not jj.plugins
+    assert jj.get_valid_command_index() is None
+
+
+def test_lazy_plugin_load_admin(a_lazy_yeahyeah_instance):
+    """Admin commands for lazy plugins should be available"""
+    jj = a_lazy_yeahyeah_instance
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args="admin path_items list".split(" ")
+    )
+    assert result.exit_code == 0
+    assert len(jj.plugins) == 2
+
+
+def test_lazy_plugin_admin_without_index(a_lazy_yeahyeah_instance):
+    """Admin commands on an empty settings folder should load plugins before
+    writing the command index
+    """
+    jj = a_lazy_yeahyeah_instance
+    result = MockContextCliRunner(mock_context=jj.context).invoke(
+        jj.root_cli, args="admin yeahyeah enable-autocompletion".split(" ")
+    )
+    assert result.exit_code == 0
+    assert jj.get_valid_command_index().owner("home") == PATH_PLUGIN_PATH
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["wiki", "an_article"], ["search", "a", "b"], ["search"], ["virus"], ["home"]],
+)
+def test_launch_plain(
+    an_indexed_yeahyeah_instance, monkeypatch, mock_web_browser, args
+):
+    """Launching directly should do exactly what the click command does"""
+    jj = an_indexed_yeahyeah_instance
+    monkeypatch.setattr("yeahyeah.core.click.launch", Mock())
+    monkeypatch.setattr("yeahyeah_plugins.path_item_plugin.core.open_terminal", Mock())
+    effects = [
+        click.echo,
+        click.launch,
+        mock_web_browser.open_new,
+        yeahyeah_plugins.path_item_plugin.core.open_terminal,
+    ]
+    click.echo.reset_mock()
+
+    assert jj.launch_plain(args)
+    launched = [x.call_args_list.copy() for x in effects]
+    for x in effects:
+        x.reset_mock()
+    result = MockContextCliRunner(mock_context=jj.context).invoke(jj.root_cli, args)
+    assert result.exit_code == 0
+    assert [x.call_args_list for x in effects] == launched
+    assert any(launched)
+    assert not jj.plugins
+
+
+def test_launch_plain_keyword_index(an_indexed_yeahyeah_instance, monkeypatch):
+    """Launching should only use the keyword index, and recreate that from the
+    full command index if it is missing
+    """
+    jj = an_indexed_yeahyeah_instance
+    monkeypatch.setattr("yeahyeah.core.click.launch", Mock())
+    load_index = Mock(wraps=jj.command_index_file.load_index)
+    monkeypatch.setattr(jj.command_index_file, "load_index", load_index)
+
+    assert jj.launch_plain(["virus"])
+    assert not load_index.called
+
+    jj.keyword_index_file.path.unlink()
+    assert jj.launch_plain(["virus"])
+    assert load_index.called
+    assert jj.keyword_index_file.path.exists()
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        [],
+        ["wiki"],
+        ["wiki", "--help"],
+        ["search", "-x"],
+        ["virus", "extra"],
+        ["home", "-p"],
+        ["unknown"],
+        ["admin", "yeahyeah", "status"],
+    ],
+)
+def test_launch_plain_fallback(an_indexed_yeahyeah_instance, args):
+    """Anything but plain arguments should be left to click"""
+    click.echo.reset_mock()
+    assert not an_indexed_yeahyeah_instance.launch_plain(args)
+    assert not click.echo.called
@@ -0,0 +1,149 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from yeahyeah.importing import (
+    ImportPlan,
+    format_for_path,
+    iter_records,
+    keyword_from_title,
+    plan_import,
+)
+from yeahyeah.exceptions import MenuItemLoadError
+from yeahyeah_plugins.url_pattern_plugin.core import (
+    URLPatternList,
+    UrlPattern,
+    WildCardUrlPattern,
+)
+
+BOOKMARKS = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks Menu</H1>
+<DL><p>
+    <DT><H3>Work</H3>
+    <DL><p>
+        <DT><A HREF="https://wiki.example.com/" ADD_DATE="1">Team Wiki</A>
+        <DT><A HREF="https://search.example.com/?q=%s" SHORTCUTURL="s">Search</A>
+        <DT><A HREF="place:sort=8&maxResults=10">Recent Tags</A>
+    </DL><p>
+</DL>
+"""
+
+
+@pytest.mark.parametrize(
+    "file_format, content",
+    [
+        ("csv", "name,url,help_text\nwiki,https://wiki,The wiki\nsearch,https://s,\n"),
+        (
+            "jsonl",
+            '{"name": "wiki", "pattern": "https://wiki", "text": "The wiki"}\n\n'
+            '{"keyword": "search", "url": "https://s"}\n',
+        ),
+        (
+            "yaml",
+            "wiki:\n  pattern: https://wiki\n  text: The wiki\n"
+            "search:\n  pattern: https://s\n",
+        ),
+    ],
+)
+def test_iter_records(file_format, content):
+    records = list(iter_records(io.StringIO(content), file_format, "pattern"))
+    assert [(name, values) for name, values, _ in records] == [
+        ("wiki", {"pattern": "https://wiki", "text": "The wiki"}),
+        ("search", {"pattern": "https://s"}),
+    ]
+
+
+def test_iter_records_bookmarks():
+    records = list(iter_records(io.StringIO(BOOKMARKS), "bookmarks", "pattern"))
+    assert records == [
+        ("team_wiki", {"pattern": "https://wiki.example.com/", "text": "Team Wiki"}, 8),
+        (
+            "s",
+            {"pattern": "https://search.example.com/?q={query}", "text": "Search"},
+            9,
+        ),
+    ]
+    assert keyword_from_title(" Über-cool  Site! ") == "über_cool_site"
+
+
+@pytest.mark.parametrize(
+    "file_format, content",
+    [
+        ("csv", "pattern,text\nhttps://wiki,The wiki\n"),
+        ("jsonl", '{"name": "wiki"}\n{"name": "broken"\n'),
+        ("jsonl", '["wiki", "https://wiki"]\n'),
+        ("yaml", "- a list\n"),
+        ("unknown", ""),
+    ],
+)
+def test_iter_records_errors(file_format, content):
+    with pytest.raises(MenuItemLoadError):
+        list(iter_records(io.StringIO(content), file_format, "pattern"))
+
+
+def test_format_for_path():
+    assert format_for_path("links.CSV") == "csv"
+    assert format_for_path("bookmarks.html") == "bookmarks"
+    with pytest.raises(MenuItemLoadError):
+        format_for_path("links.txt")
+
+
+def test_import_plan():
+    existing = [
+        UrlPattern(name="wiki", pattern="https://wiki"),
+        UrlPattern(name="virus", pattern="https://virus"),
+    ]
+    records = [
+        ("wiki", {"pattern": "https://wiki"}, 1),  # already present
+        ("virus", {"pattern": "https://other_virus"}, 2),  # conflict
+        ("search", {"pattern": "https://s/{q}", "capture_all_keywords": True}, 3),
+        ("search", {"pattern": "https://s/{q}", "capture_all_keywords": True}, 4),
+        ("search", {"pattern": "https://other_s"}, 5),  # conflict within file
+        ("broken", {"url": "https://broken"}, 6),  # error
+        (None, {"pattern": "https://no_name"}, 7),  # error
+    ]
+
+    plan = ImportPlan(URLPatternList, existing).add_records(records)
+    assert list(plan.added) == ["search"]
+    assert isinstance(plan.added["search"], WildCardUrlPattern)
+    assert plan.replaced == []
+    assert plan.unchanged == 2
+    assert len(plan.conflicts) == 2
+    assert len(plan.errors) == 2
+    assert plan.read == 7
+
+    plan = ImportPlan(URLPatternList, existing, replace=True).add_records(records)
+    assert plan.added["search"].pattern == "https://other_s"
+    assert plan.replaced == ["virus"]
+
+    item_list = URLPatternList(items=list(existing))
+    added, removed = plan.apply(item_list)
+    assert [x.name for x in added] == ["virus", "search"]
+    assert removed == ["virus"]
+    assert [str(x) for x in item_list] == [
+        "URLPattern wiki:https://wiki",
+        "URLPattern virus:https://other_virus",
+        "URLPattern search:https://other_s",
+    ]
+
+
+def test_plan_import_progress(tmpdir):
+    path = Path(str(tmpdir)) / "links.csv"
+    with open(path, "w") as f:
+        f.write("name,url\n")
+        f.writelines(f"link_{i},https://link/{i}\n" for i in range(2000))
+    progress = []
+
+    plan = plan_import(
+        path,
+        URLPatternList,
+        [],
+        value_field="pattern",
+        progress=lambda done, size: progress.append((done, size)),
+    )
+    assert len(plan.added) == 2000
+    assert len(progress) == 5
+    assert progress[-1] == (path.stat().st_size, path.stat().st_size)
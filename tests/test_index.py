@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+from yeahyeah.index import CommandIndex, CommandNames, KeywordIndexFile, fingerprint
+
+
+@pytest.fixture()
+def an_index(tmpdir):
+    """Command index with a few entries, for a config file that exists"""
+    config_file = Path(str(tmpdir)) / "config.yaml"
+    config_file.write_text("something")
+    names = ["wiki", "search", "a", "ääh", "home", "zz", "virus"]
+    return CommandIndex(
+        plugin_paths=["a.Plugin"],
+        fingerprints={str(config_file): fingerprint(config_file)},
+        entries={x: {"plugin": "a.Plugin", "data": {"name": x}} for x in names},
+    )
+
+
+def test_keyword_index(tmpdir, an_index):
+    index_file = KeywordIndexFile(Path(str(tmpdir)) / "index.keys")
+    assert index_file.lookup("wiki", ["a.Plugin"]) == (False, None)
+
+    index_file.write(an_index)
+    for name, entry in an_index.entries.items():
+        assert index_file.lookup(name, ["a.Plugin"]) == (True, entry)
+    assert index_file.lookup("unknown", ["a.Plugin"]) == (True, None)
+    assert index_file.lookup("wiki", ["b.Plugin"]) == (False, None)
+
+    config_file = Path(list(an_index.fingerprints)[0])
+    config_file.write_text("something else")
+    assert index_file.lookup("wiki", ["a.Plugin"]) == (False, None)
+
+
+def test_keyword_index_empty(tmpdir):
+    index_file = KeywordIndexFile(Path(str(tmpdir)) / "index.keys")
+    index_file.write(CommandIndex(plugin_paths=[], fingerprints={}, entries={}))
+    assert index_file.lookup("wiki", []) == (True, None)
+
+
+@pytest.mark.parametrize("content", [b"", b"yykidx01", b"garbage" * 10])
+def test_keyword_index_corrupt(tmpdir, an_index, content):
+    """Broken files should be treated as invalid, not raise"""
+    path = Path(str(tmpdir)) / "index.keys"
+    KeywordIndexFile(path).write(an_index)
+    path.write_bytes(content or path.read_bytes()[:30])
+    assert KeywordIndexFile(path).lookup("wiki", ["a.Plugin"]) == (False, None)
+    path.write_bytes(content)
+    assert KeywordIndexFile(path).lookup("wiki", ["a.Plugin"]) == (False, None)
+
+
+def test_command_names():
+    names = CommandNames(
+        ["wiki", "wikidata", "web", "a", "ääh", "wiki", "w\U0010ffffx"]
+    )
+    assert names.names == sorted(set(names.names))
+    assert len(names) == 6
+    assert "wiki" in names and "wik" not in names
+    assert names.with_prefix("wi") == ["wiki", "wikidata"]
+    assert names.with_prefix("w\U0010ffff") == ["w\U0010ffffx"]
+    assert names.with_prefix("") == names.names
+    assert names.with_prefix("x") == []
+    assert names.resolve("wiki") == ["wiki"]
+    assert names.resolve("wikid") == ["wikidata"]
+    assert names.resolve("ä") == ["ääh"]
@@ -0,0 +1,150 @@
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from yeahyeah.context import YeahYeahContext
+from yeahyeah.layers import CatalogLayers, LayerMirror, YeahYeahLayerException
+from yeahyeah.persistence import file_lock
+from yeahyeah_plugins.url_pattern_plugin.core import (
+    URLPatternList,
+    UrlPattern,
+    UrlPatternsPlugin,
+)
+
+
+def write_catalog(path, patterns):
+    """Write url patterns file with {name: pattern}"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        URLPatternList(
+            items=[UrlPattern(name=k, pattern=v) for k, v in patterns.items()]
+        ).save(f)
+
+
+@pytest.fixture()
+def share(tmpdir):
+    """A team folder with a catalog and a fragment"""
+    share = Path(str(tmpdir)) / "share"
+    write_catalog(share / "url_patterns.yaml", {"wiki": "https://team/wiki"})
+    write_catalog(share / "url_patterns.d" / "extra.yaml", {"extra": "https://e"})
+    return share
+
+
+def test_mirror_update(share, tmpdir):
+    mirror = LayerMirror(source=share, path=Path(str(tmpdir)) / "mirror")
+    assert mirror.is_stale()
+    assert mirror.update() == ["url_patterns.d/extra.yaml", "url_patterns.yaml"]
+    assert not mirror.is_stale()
+    assert (mirror.path / "url_patterns.yaml").read_text() == (
+        share / "url_patterns.yaml"
+    ).read_text()
+
+    # touched but unchanged files are not copied again
+    os.utime(share / "url_patterns.yaml", ns=(1, 1))
+    assert mirror.update() == []
+
+    write_catalog(share / "url_patterns.yaml", {"wiki": "https://other/wiki"})
+    (share / "url_patterns.d" / "extra.yaml").unlink()
+    (mirror.path / ".url_patterns.yaml.marshal").write_text("cache")
+    assert sorted(mirror.update()) == [
+        "url_patterns.d/extra.yaml",
+        "url_patterns.yaml",
+    ]
+    assert "other" in (mirror.path / "url_patterns.yaml").read_text()
+    assert not (mirror.path / "url_patterns.d" / "extra.yaml").exists()
+    assert (mirror.path / ".url_patterns.yaml.marshal").exists()
+
+    assert mirror.is_stale(now=mirror.read_manifest()["checked"] + 301)
+
+
+def test_mirror_unavailable_share(share, tmpdir):
+    """When the share is gone, the mirror keeps its last copy"""
+    mirror = LayerMirror(source=share, path=Path(str(tmpdir)) / "mirror")
+    mirror.update()
+    share.rename(share.with_name("gone"))
+    with pytest.raises(YeahYeahLayerException):
+        mirror.update()
+    assert (mirror.path / "url_patterns.yaml").exists()
+
+
+def test_mirror_revalidate_in_background(share, tmpdir):
+    mirror = LayerMirror(
+        source=share, path=Path(str(tmpdir)) / "mirror", max_staleness=60
+    )
+    with patch("subprocess.Popen") as popen:
+        assert mirror.revalidate_in_background()
+        assert not mirror.revalidate_in_background()  # already checked
+    assert popen.call_count == 1
+    assert popen.call_args[0][0][-3:] == [
+        "yeahyeah.layers",
+        str(share),
+        str(mirror.path),
+    ]
+
+
+def test_mirror_revalidate_while_locked(share, tmpdir):
+    """Revalidating should never wait for an update holding the lock"""
+    mirror = LayerMirror(source=share, path=Path(str(tmpdir)) / "mirror")
+    mirror.path.mkdir()
+    with patch("subprocess.Popen") as popen, file_lock(mirror.path):
+        assert not mirror.revalidate_in_background()
+    assert popen.call_count == 0
+    assert mirror.is_stale()
+
+
+def test_mirror_update_reads_share_unlocked(share, tmpdir, monkeypatch):
+    """The share should be read before the mirror is locked"""
+    mirror = LayerMirror(source=share, path=Path(str(tmpdir)) / "mirror")
+    mirror.path.mkdir()
+    list_source_files = mirror.list_source_files
+
+    def list_unlocked():
+        with file_lock(mirror.path, blocking=False):  # raises if locked
+            return list_source_files()
+
+    monkeypatch.setattr(mirror, "list_source_files", list_unlocked)
+    assert mirror.update() == ["url_patterns.d/extra.yaml", "url_patterns.yaml"]
+
+
+def test_catalog_layers_from_configuration_path(share, tmpdir):
+    configuration_path = Path(str(tmpdir)) / "config"
+    layers = CatalogLayers.from_configuration_path(configuration_path)
+    assert layers.mirror is None
+    assert layers.get_paths() == [Path("/etc/yeahyeah")]
+
+    configuration_path.mkdir()
+    with open(configuration_path / "layers.json", "w") as f:
+        json.dump({"system": None, "team": str(share), "max_staleness": 10}, f)
+    layers = CatalogLayers.from_configuration_path(configuration_path)
+    assert layers.get_paths() == [configuration_path / "layers" / "team"]
+    assert layers.mirror.max_staleness == 10
+
+
+def test_layered_catalogs(share, tmpdir, disable_click_echo):
+    """Own patterns take precedence over team patterns, and those over system
+    patterns. The team share is not needed to load
+    """
+    system = Path(str(tmpdir)) / "system"
+    write_catalog(
+        system / "url_patterns.yaml",
+        {"extra": "https://system/extra", "virus": "https://system/virus"},
+    )
+    write_catalog(system / "url_patterns.d" / "x.yaml", {"sys": "https://sys"})
+    mirror = LayerMirror(source=share, path=Path(str(tmpdir)) / "mirror")
+    mirror.update()
+    share.rename(share.with_name("gone"))
+
+    settings_path = Path(str(tmpdir)) / "own"
+    context = YeahYeahContext(settings_path, layer_paths=[system, mirror.path])
+    plugin = UrlPatternsPlugin.init_from_context(context)
+    data = plugin.get_command_data()
+    patterns = {k: v["item"][k]["pattern"] for k, v in data.items()}
+
+    assert patterns["sys"] == "https://sys"
+    assert patterns["extra"] == "https://e"
+    assert patterns["wiki"] == "https://en.wikipedia.org/wiki/{article_slug}"
+    assert patterns["virus"] == "https://www.virustotal.com"
+    assert mirror.path / "url_patterns.yaml" in plugin.get_config_files()
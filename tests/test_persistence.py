@@ -1,8 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import pytest
 
-from yeahyeah.persistence import JSONSettingsFile, YeahYeahPersistenceException
+from yeahyeah.persistence import (
+    CODECS,
+    Codec,
+    JSONSettingsFile,
+    SettingsFile,
+    YeahYeahPersistenceException,
+    codec_for_extension,
+    codec_for_path,
+)
 
 
 def test_persistence(tmpdir):
@@ -11,3 +20,105 @@ def test_persistence(tmpdir):
 
     with pytest.raises(YeahYeahPersistenceException):
         a_file.save(Path("not/serialisable!"))
+    assert a_file.load() == {"foo": "bar"}  # failed save leaves file intact
+    assert [x.name for x in Path(tmpdir).iterdir()] == ["some_file.json"]
+
+
+def test_persistence_skips_unchanged_write(tmpdir):
+    path = Path(tmpdir) / "some_file.json"
+    a_file = JSONSettingsFile(path=path)
+    assert a_file.save({"foo": "bar"})
+    written = path.stat().st_mtime_ns
+
+    assert not a_file.save({"foo": "bar"})
+    assert path.stat().st_mtime_ns == written
+    assert a_file.save({"foo": "baz"})
+    assert a_file.load() == {"foo": "baz"}
+
+
+def test_persistence_decode_error(tmpdir):
+    path = Path(tmpdir) / "some_file.json"
+    path.write_text("{not json")
+    with pytest.raises(YeahYeahPersistenceException):
+        JSONSettingsFile(path=path).load()
+
+
+def test_persistence_codecs(tmpdir):
+    json_codec = "orjson" if CODECS["orjson"].is_available() else "json"
+    assert codec_for_path("settings.json").name == json_codec
+    assert codec_for_path("settings.JSON").name == json_codec
+    assert codec_for_path("settings.unknown").name == "json"
+    if CODECS["msgpack"].is_available():
+        assert codec_for_path("settings.msgpack").name == "msgpack"
+
+    with pytest.raises(YeahYeahPersistenceException):
+        SettingsFile(path=Path(tmpdir) / "a.json", codec="unknown").save({})
+
+
+@pytest.mark.parametrize("codec", ["json", "orjson", "msgpack"])
+def test_persistence_codec_round_trip(tmpdir, codec):
+    if not CODECS[codec].is_available():
+        pytest.skip(f"{CODECS[codec].module} is not installed")
+    a_file = SettingsFile(path=Path(tmpdir) / "some_file", codec=codec)
+    data = {"foo": ["bar", 1, 2.5, None, True], "nested": {"a": {}}}
+    a_file.save(data)
+    assert a_file.load() == data
+    assert not a_file.save(data)
+
+
+def test_persistence_codec_orjson_not_installed(monkeypatch):
+    """Without orjson, .json files should fall back to the json module"""
+    monkeypatch.setattr(CODECS["orjson"], "module", "not_an_installed_module")
+    codec_for_extension.cache_clear()
+    try:
+        assert codec_for_path("settings.json").name == "json"
+    finally:
+        monkeypatch.undo()
+        codec_for_extension.cache_clear()
+
+
+def test_persistence_codec_not_installed(tmpdir, monkeypatch):
+    class MissingCodec(Codec):
+        name = "missing"
+        module = "not_an_installed_module"
+
+    monkeypatch.setitem(CODECS, "missing", MissingCodec())
+    with pytest.raises(YeahYeahPersistenceException, match="not installed"):
+        SettingsFile(path=Path(tmpdir) / "a.json", codec="missing").save({})
+
+
+def increment(path, count):
+    """Increment a counter in the file at path count times, with locking"""
+    settings_file = JSONSettingsFile(path=path)
+    for _ in range(count):
+        with settings_file.lock():
+            data = settings_file.load()
+            data["counter"] += 1
+            data["padding"] = "x" * (data["counter"] % 1000)
+            settings_file.save(data)
+
+
+def read(path, count):
+    """Load the file at path count times. Returns counters seen"""
+    return [JSONSettingsFile(path=path).load()["counter"] for _ in range(count)]
+
+
+def test_persistence_concurrent(tmpdir):
+    """Parallel locked updates should never be lost, and parallel readers that
+    do not lock should never see a partially written file
+    """
+    path = Path(tmpdir) / "counter.json"
+    JSONSettingsFile(path=path).save({"counter": 0})
+    with ProcessPoolExecutor(max_workers=8) as executor:
+        updates = [executor.submit(increment, path, 100) for _ in range(6)]
+        reads = [executor.submit(read, path, 500) for _ in range(2)]
+        for future in updates:
+            future.result()
+        for future in reads:
+            assert all(0 <= x <= 600 for x in future.result())
+
+    assert JSONSettingsFile(path=path).load()["counter"] == 600
+    assert sorted(x.name for x in Path(tmpdir).iterdir()) == [
+        ".counter.json.lock",
+        "counter.json",
+    ]
@@ -0,0 +1,62 @@
+import json
+from pathlib import Path
+
+import click
+import pytest
+
+from yeahyeah.core import YeahYeah
+from yeahyeah.plugin_testing import MockContextCliRunner
+from yeahyeah.profiling import PHASE_MARKER, parse_importtime
+
+URL_PLUGIN_PATH = "yeahyeah_plugins.url_pattern_plugin.core.UrlPatternsPlugin"
+
+
+@pytest.fixture()
+def a_yeahyeah_instance(tmpdir):
+    return YeahYeah(configuration_path=Path(str(tmpdir)))
+
+
+def test_parse_importtime():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 | site",
+            PHASE_MARKER + '["import", "some.Plugin"]',
+            "import time:        20 |         20 |   json.decoder",
+            "import time:        30 |         50 | json",
+            "some other output",
+        ]
+    )
+    imports = parse_importtime(stderr)
+    assert [x["module"] for x in imports] == ["site", "json.decoder", "json"]
+    assert imports[0]["phase"] == "interpreter start"
+    assert imports[2] == {
+        "module": "json",
+        "self_us": 30,
+        "cumulative_us": 50,
+        "phase": "import",
+        "plugin": "some.Plugin",
+    }
+
+
+def test_profile_startup(a_yeahyeah_instance):
+    jj = a_yeahyeah_instance
+    runner = MockContextCliRunner(mock_context=jj.context)
+    result = runner.invoke(
+        jj.root_cli, args="admin yeahyeah profile-startup --json".split(" ")
+    )
+    assert result.exit_code == 0
+    profile = json.loads(click.echo.call_args[0][0])
+
+    phases = {(x["name"], x["plugin"]) for x in profile["phases"]}
+    assert ("interpreter start", None) in phases
+    assert ("import", URL_PLUGIN_PATH) in phases
+    assert ("get_command_group", URL_PLUGIN_PATH) in phases
+    assert all(x["seconds"] >= 0 for x in profile["phases"])
+    assert len(profile["imports"]) == 15
+
+    result = runner.invoke(jj.root_cli, args="admin yeahyeah profile-startup")
+    assert result.exit_code == 0
+    assert (
+        "init_from_context             UrlPatternsPlugin" in click.echo.call_args[0][0]
+    )
@@ -0,0 +1,210 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from yeahyeah.client import default_socket_path, private_socket_dir, run_in_daemon
+from yeahyeah.server import (
+    YeahYeahServer,
+    YeahYeahServerException,
+    ensure_private_dir,
+)
+
+SERVER_SCRIPT = """
+import sys
+from pathlib import Path
+from yeahyeah.core import YeahYeah
+from yeahyeah.server import YeahYeahServer, YeahYeahForkServer
+
+def load_yeahyeah():
+    yeahyeah = YeahYeah(configuration_path=Path(sys.argv[1]))
+    yeahyeah.add_lazy_plugin(
+        "yeahyeah_plugins.path_item_plugin.core.PathItemPlugin"
+    )
+    yeahyeah.load_all_plugins()
+    return yeahyeah
+
+server_class = YeahYeahForkServer if sys.argv[3] == "fork" else YeahYeahServer
+server_class(load_yeahyeah, socket_path=sys.argv[2], idle_timeout=10).serve()
+"""
+
+
+def wait_for_listening(socket_path):
+    """Wait until a daemon accepts connections on socket_path. The socket file
+    exists a moment before the daemon listens on it
+    """
+    for _ in range(100):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                time.sleep(0.05)
+
+
+@pytest.fixture(params=["in_process", "fork"])
+def a_daemon(tmpdir, request):
+    """A yeahyeah daemon running in a separate process. Both as regular and as
+    fork server
+
+    Returns
+    -------
+    str
+        Path to socket the daemon is listening on
+    """
+    socket_path = str(Path(tmpdir) / "yeahyeah.sock")
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER_SCRIPT, str(tmpdir), socket_path, request.param]
+    )
+    wait_for_listening(socket_path)
+    yield socket_path
+    process.terminate()
+    process.wait()
+
+
+def run_with_files(args, socket_path, tmpdir):
+    """Run in daemon with temp files as stdin, stdout and stderr
+
+    Returns
+    -------
+    Tuple[int, str, str]
+        exit code, stdout, stderr
+    """
+    stdout_path, stderr_path = Path(tmpdir) / "stdout", Path(tmpdir) / "stderr"
+    with open(stdout_path, "w") as stdout, open(stderr_path, "w") as stderr:
+        exit_code = run_in_daemon(
+            args,
+            socket_path=socket_path,
+            fds=(sys.__stdin__.fileno(), stdout.fileno(), stderr.fileno()),
+        )
+    return exit_code, stdout_path.read_text(), stderr_path.read_text()
+
+
+def test_no_daemon(tmpdir):
+    """Without daemon, client should signal that command was not run"""
+    assert run_in_daemon(["--help"], socket_path=str(tmpdir / "nothing")) is None
+
+
+@pytest.mark.parametrize(
+    "socket_name",
+    ["a_file/yeahyeah.sock", "a_file", "no_permission/yeahyeah.sock", "x" * 200],
+    ids=["not_a_dir", "not_a_socket", "no_permission", "too_long"],
+)
+def test_no_usable_socket(tmpdir, socket_name):
+    """Any error connecting should make the client run the command in-process"""
+    (Path(tmpdir) / "a_file").write_text("not a socket")
+    (Path(tmpdir) / "no_permission").mkdir(mode=0)
+    socket_path = str(Path(tmpdir) / socket_name)
+    assert run_in_daemon(["--help"], socket_path=socket_path) is None
+
+
+def test_daemon(a_daemon, tmpdir):
+    exit_code, stdout, _ = run_with_files(["home", "-p"], a_daemon, tmpdir)
+    assert exit_code == 0
+    assert stdout == "/home/a_user/\n"
+
+    exit_code, _, stderr = run_with_files(["unknown_command"], a_daemon, tmpdir)
+    assert exit_code == 2
+    assert "No such command" in stderr
+
+
+def test_daemon_reload(a_daemon, tmpdir):
+    """Changes to plugin config files should be picked up by a running daemon"""
+    run_with_files(["--help"], a_daemon, tmpdir)
+    with open(Path(tmpdir) / "path_items.yaml", "a") as f:
+        f.write("new_item:\n  path: /tmp/new\n")
+
+    # Second call makes sure a re-executed fork server still listens
+    for _ in range(2):
+        exit_code, stdout, _ = run_with_files(["new_item", "-p"], a_daemon, tmpdir)
+        assert exit_code == 0
+        assert stdout == "/tmp/new\n"
+
+
+ACTIVATED_SCRIPT = """
+import os
+import socket
+import sys
+from yeahyeah.client import main
+
+listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+listener.bind(os.environ["YEAHYEAH_SOCKET"])
+listener.listen()
+os.dup2(listener.fileno(), 3)
+os.environ.update({"LISTEN_PID": str(os.getpid()), "LISTEN_FDS": "1"})
+sys.argv = ["jj"] + sys.argv[1:]
+main()
+"""
+
+
+def test_socket_activated_serve(tmpdir):
+    """Started by socket activation, 'jj' should serve on the activation socket
+    instead of sending its own serve command to it and waiting forever
+    """
+    (Path(tmpdir) / ".config" / "yeahyeah").mkdir(parents=True)
+    socket_path = str(Path(tmpdir) / "yeahyeah.sock")
+    env = {**os.environ, "HOME": str(tmpdir), "YEAHYEAH_SOCKET": socket_path}
+    env.pop("YEAHYEAH_NO_DAEMON", None)
+    process = subprocess.Popen(
+        [sys.executable, "-c", ACTIVATED_SCRIPT, "admin", "yeahyeah", "serve"]
+        + ["--idle-timeout", "2"],
+        env=env,
+    )
+    wait_for_listening(socket_path)
+
+    exit_code, stdout, _ = run_with_files(["--help"], socket_path, tmpdir)
+    assert exit_code == 0
+    assert "Usage" in stdout
+    assert process.wait(timeout=20) == 0
+
+
+def test_default_socket_path_is_private(monkeypatch):
+    """Without runtime dir, the socket should not be directly in /tmp"""
+    monkeypatch.delenv("YEAHYEAH_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    assert Path(default_socket_path()).parent == Path(private_socket_dir())
+
+
+def test_ensure_private_dir(tmpdir):
+    private = Path(tmpdir) / "private"
+    ensure_private_dir(str(private))
+    assert private.stat().st_mode & 0o777 == 0o700
+
+    shared = Path(tmpdir) / "shared"
+    shared.mkdir(mode=0o755)
+    shared.chmod(0o755)
+    with pytest.raises(YeahYeahServerException):
+        ensure_private_dir(str(shared))
+
+    link = Path(tmpdir) / "link"
+    link.symlink_to(private)
+    with pytest.raises(YeahYeahServerException):
+        ensure_private_dir(str(link))
+
+
+def test_refuse_daemon_of_other_user(a_daemon, tmpdir, monkeypatch):
+    """Client should not send anything to a daemon run by another user"""
+    uid = os.getuid()
+    monkeypatch.setattr("yeahyeah.client.os.getuid", lambda: uid + 1)
+    exit_code, stdout, _ = run_with_files(["home", "-p"], a_daemon, tmpdir)
+    assert exit_code is None
+    assert stdout == ""
+
+
+def test_stale_socket_of_other_user(tmpdir, monkeypatch):
+    """A stale socket that cannot be removed should give a clear error"""
+    socket_path = str(Path(tmpdir) / "yeahyeah.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(socket_path)
+
+    def unlink(path):
+        raise PermissionError(f"Operation not permitted: '{path}'")
+
+    monkeypatch.setattr("yeahyeah.server.os.unlink", unlink)
+    server = YeahYeahServer(load_yeahyeah=None, socket_path=socket_path)
+    with pytest.raises(YeahYeahServerException):
+        server.get_listening_socket()
@@ -0,0 +1,132 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from yeahyeah.exceptions import MenuItemLoadError
+from yeahyeah.store import SQLiteMenuItemStore
+from yeahyeah_plugins.url_pattern_plugin.core import (
+    URLPatternList,
+    UrlPattern,
+    WildCardUrlPattern,
+)
+
+
+@pytest.fixture()
+def yaml_path(tmpdir):
+    """A url pattern yaml file with some patterns"""
+    path = Path(str(tmpdir)) / "url_patterns.yaml"
+    with open(path, "w") as f:
+        URLPatternList(
+            items=[
+                UrlPattern(name="wiki", pattern="https://wiki/{article}"),
+                UrlPattern(name="virus", pattern="https://virus", help_text="Scan"),
+                WildCardUrlPattern(name="search", pattern="https://search?q={q}"),
+            ]
+        ).save(f)
+    return path
+
+
+@pytest.fixture(params=[True, False], ids=["fts", "no_fts"])
+def store(yaml_path, request):
+    store = SQLiteMenuItemStore(
+        yaml_path.with_suffix(".sqlite"),
+        yaml_path,
+        URLPatternList,
+        full_text_search=request.param,
+    )
+    yield store
+    store.close()
+
+
+def test_store_yaml_round_trip(store, yaml_path):
+    """Importing and exporting yaml should not lose anything"""
+    original = yaml_path.read_text()
+    loaded = store.load()
+    assert [(type(x), x.name) for x in loaded] == [
+        (WildCardUrlPattern, "search"),
+        (UrlPattern, "virus"),
+        (UrlPattern, "wiki"),
+    ]
+    yaml_path.unlink()
+    store.export(store.load())
+    assert yaml_path.read_text() == original
+
+
+def test_store_changes(store, yaml_path):
+    store.load()
+    store.record(added=[UrlPattern(name="new", pattern="https://new")])
+    store.record(removed=["wiki"])
+    assert not store.is_changed()
+    assert yaml_path.read_text().count("https://") == 3  # yaml is not rewritten
+
+    other = SQLiteMenuItemStore(store.path, yaml_path, URLPatternList)
+    assert [x.name for x in other.load()] == ["search", "virus", "new"]
+    other.record(
+        added=[UrlPattern(name="new", pattern="https://newer", help_text="Newer")]
+    )
+    other.close()
+    assert store.is_changed()
+
+    assert store.find("new").pattern == "https://newer"  # replaced in place
+    assert [x.name for x in store.load()] == ["search", "virus", "new"]
+    assert store.find("wiki") is None
+    assert [x.name for x in store.search("newer")] == ["new"]
+
+
+def test_store_search(store):
+    store.load()
+    assert [x.name for x in store.search("sca")] == ["virus"]
+    assert [x.name for x in store.search("se")] == ["search"]
+    assert [x.name for x in store.search("launch wiki")] == ["wiki"]
+    store.search('launch "wiki AND (')  # no query syntax errors
+    assert len(store.search("")) == 3
+
+
+def test_store_imports_edited_yaml(store, yaml_path):
+    """Editing the yaml file by hand should replace all items on next load"""
+    store.load()
+    store.record(added=[UrlPattern(name="new", pattern="https://new")])
+    with open(yaml_path, "w") as f:
+        f.write("edited:\n  pattern: https://edited\n")
+    assert store.is_changed()
+    assert [x.name for x in store.load()] == ["edited"]
+
+    with open(yaml_path, "w") as f:
+        f.write("edited:\n  pattern: https://edited\nbroken: [\n")
+    with pytest.raises(MenuItemLoadError):
+        store.load()
+    assert [x.name for x in store.search("")] == ["edited"]  # import failed
+
+
+def test_store_upgrade_unique_names(yaml_path):
+    """Databases from before names were unique should keep only the item added
+    last for each name
+    """
+    path = yaml_path.with_suffix(".sqlite")
+    store = SQLiteMenuItemStore(path, yaml_path, URLPatternList)
+    store.load()
+    with store.connection as connection:
+        connection.execute("DROP INDEX items_unique_name")
+        connection.execute("CREATE INDEX items_name ON items (name)")
+        connection.execute(
+            "INSERT INTO items (name, help_text, data) VALUES (?, ?, ?)",
+            (
+                "wiki",
+                "",
+                json.dumps(
+                    URLPatternList.item_to_data(
+                        UrlPattern(name="wiki", pattern="https://newer")
+                    )
+                ),
+            ),
+        )
+    store.close()
+
+    store = SQLiteMenuItemStore(path, yaml_path, URLPatternList)
+    assert [(x.name, x.pattern) for x in store.load()] == [
+        ("search", "https://search?q={q}"),
+        ("virus", "https://virus"),
+        ("wiki", "https://newer"),
+    ]
+    store.close()
@@ -0,0 +1,222 @@
+"""Caches that make loading menu item files fast. ParseCache keeps a binary
+copy of a parsed yaml file next to it. MenuItemFragments keeps parsed fragments
+in memory and only parses fragments that changed since
+"""
+import marshal
+import os
+import sys
+from pathlib import Path
+
+from yeahyeah.exceptions import MenuItemLoadError
+from yeahyeah.parsing import iter_yaml_items
+from yeahyeah.persistence import fingerprint
+
+
+class ParseCache:
+    """Binary copy of the parsed contents of a yaml file, stored next to it.
+    Loading this is much faster than parsing yaml. Only used while the yaml
+    file's modification time and size are unchanged
+    """
+
+    # Change this when the cache contents change
+    FORMAT = f"yeahyeah-2-py{sys.version_info[0]}.{sys.version_info[1]}"
+
+    def __init__(self, path):
+        """
+
+        Parameters
+        ----------
+        path: Pathlike
+            Path to the yaml file
+        """
+        self.path = Path(path)
+        self.cache_path = self.path.with_name(f".{self.path.name}.marshal")
+
+    def load(self):
+        """Parsed items of the yaml file, as iter_yaml_items() yields them. From
+        cache if possible, otherwise parse and try to write cache
+
+        Returns
+        -------
+        List[Tuple[object, object, int]]
+
+        Raises
+        ------
+        MenuItemLoadError
+            When file is not valid yaml
+        """
+        key = self.get_key()
+        loaded = self.read(key)
+        if loaded is None:
+            with open(self.path, "r") as f:
+                loaded = list(iter_yaml_items(f))
+            self.write(key, loaded)
+        return loaded
+
+    def get_key(self):
+        """Identifies the yaml file contents that a cache is valid for"""
+        stat = os.stat(self.path)
+        return [self.FORMAT, stat.st_mtime_ns, stat.st_size]
+
+    def read(self, key=None):
+        """Parsed items from cache, without parsing the yaml file
+
+        Parameters
+        ----------
+        key: List, optional
+            As returned by get_key(). Defaults to None, meaning get it now
+
+        Returns
+        -------
+        List[Tuple[object, object, int]] or None
+            None if there is no cache for the current yaml file
+        """
+        try:
+            with open(self.cache_path, "rb") as f:
+                cached_key, loaded = marshal.load(f)
+            if cached_key == (key or self.get_key()):
+                return [tuple(x) for x in loaded]
+        except (OSError, EOFError, ValueError, TypeError):
+            pass  # no usable cache
+        return None
+
+    def write(self, key, loaded):
+        """Write cache. Never fails, as the cache is optional. The yaml file might
+        be in a read-only location for example
+        """
+        temp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}")
+        try:
+            with open(temp_path, "wb") as f:
+                marshal.dump((key, loaded), f)
+            os.replace(temp_path, self.cache_path)  # never leave a partial cache
+        except (OSError, ValueError):  # ValueError: data contains unmarshallable types
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+
+class MenuItemFragments:
+    """Yaml menu item files that are loaded in addition to a plugin's own menu
+    item file: directories of fragments like url_patterns.d/, and catalog files
+    from shared layers (see yeahyeah.layers). Fragments are read-only for
+    yeahyeah, admin commands only change the plugin's own file
+
+    Fragments are loaded in the order of paths, and files in a directory in file
+    name order. Each fragment's items are cached in memory and on disk (see
+    ParseCache) by modification time and size, so that loading again only parses
+    fragments that changed. Many changed fragments are parsed in parallel
+    processes
+    """
+
+    # Parse in parallel processes when at least this many fragments need parsing
+    PARALLEL_MIN = 8
+
+    def __init__(self, paths, list_class, max_workers=None):
+        """
+
+        Parameters
+        ----------
+        paths: List[Pathlike]
+            Yaml files and directories of yaml files, in the order to load them.
+            Do not need to exist
+        list_class: Type[MenuItemList]
+            List class that reads the fragments
+        max_workers: int, optional
+            Maximum number of processes for parsing. Defaults to None, meaning
+            the number of processors
+        """
+        self.paths = [Path(x) for x in paths]
+        self.list_class = list_class
+        self.max_workers = max_workers
+        self.cache = {}  # fragment path: (fingerprint, items)
+        self.loaded = None  # fingerprints at last load
+
+    def fragment_paths(self):
+        """Paths of all existing fragments, in the order they are loaded"""
+        found = []
+        for path in self.paths:
+            if path.is_dir():
+                found += sorted(path.glob("*.yaml"))
+            elif path.exists():
+                found.append(path)
+        return found
+
+    def files(self):
+        """paths and all fragments in directories. Adding or removing a fragment
+        changes its directory's fingerprint, editing one changes the fragment's
+        """
+        return self.paths + [x for x in self.fragment_paths() if x not in self.paths]
+
+    def fingerprints(self):
+        """Fingerprint of each fragment by path. Not of the directory, as writing
+        ParseCaches changes that
+        """
+        return {x: fingerprint(x) for x in self.fragment_paths()}
+
+    def is_changed(self):
+        """True if any fragment was added, removed or changed since last load()"""
+        return self.fingerprints() != self.loaded
+
+    def load(self):
+        """Items of all fragments. Only parses fragments that changed since
+        they were last parsed
+
+        Returns
+        -------
+        MenuItemList
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When a fragment or an item in it could not be loaded
+        """
+        self.loaded = fingerprints = self.fingerprints()
+        paths = list(fingerprints)
+        cache = {x: self.cache[x] for x in paths if x in self.cache}
+        changed = [x for x in paths if cache.get(x, [None])[0] != fingerprints[x]]
+
+        to_parse = []
+        for path in changed:
+            parse_cache = ParseCache(path)
+            raw = parse_cache.read()
+            if raw is None:
+                to_parse.append(path)
+            else:
+                cache[path] = (fingerprints[path], self.items_from_raw(path, raw))
+        for path, raw in zip(to_parse, self.parse(to_parse)):
+            cache[path] = (fingerprints[path], self.items_from_raw(path, raw))
+
+        self.cache = cache
+        return self.list_class(items=[x for path in paths for x in cache[path][1]])
+
+    def parse(self, paths):
+        """Parse the yaml fragments at paths and write their ParseCaches
+
+        Returns
+        -------
+        List[List[Tuple[object, object, int]]]
+            Parsed items of each fragment, as iter_yaml_items() yields them
+        """
+        if len(paths) < self.PARALLEL_MIN or self.max_workers == 1:
+            return [parse_fragment(x) for x in paths]
+        from concurrent.futures import ProcessPoolExecutor  # slow import
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(parse_fragment, paths))
+
+    def items_from_raw(self, path, raw):
+        try:
+            return [self.list_class.item_from_raw(*x) for x in raw]
+        except MenuItemLoadError as e:
+            raise MenuItemLoadError(f"In fragment {path}: {e}")
+
+
+def parse_fragment(path):
+    """Parsed items of the yaml file at path, writing its ParseCache. Runs in
+    worker processes, see MenuItemFragments.parse()
+    """
+    try:
+        return ParseCache(path).load()
+    except MenuItemLoadError as e:
+        raise MenuItemLoadError(f"In fragment {path}: {e}")
@@ -10,6 +10,8 @@ $ yeahyeah
 
 """
 
+import sys
+
 import click
 
 from yeahyeah.config import CORE_CONFIG_PATH
@@ -29,6 +31,22 @@ except YeahYeahPersistenceException as e:
 
 else:
     for class_ref in settings.plugin_paths:
-        jj.add_plugin(class_ref)
+        jj.add_lazy_plugin(class_ref)  # import plugins only when needed
+    try:
+        jj.revalidate_layers()  # never wait for a network share
+    except YeahYeahPersistenceException as e:
+        click.echo(
+            f"Error: Could not read layers file. Please"
+            f" check {jj.layers_file_path}. Original error: {e}"
+        )
+        raise
 
 yeahyeah = jj.root_cli  # base click command line entry point
+
+
+def main():
+    """Launch plain '<keyword> <args..>' calls directly. Anything else goes
+    through click
+    """
+    if not jj.launch_plain(sys.argv[1:]):
+        yeahyeah()
@@ -0,0 +1,133 @@
+"""Thin client that asks a running yeahyeah daemon to execute a command.
+
+Only imports standard library modules, so that starting the client is fast. The
+terminal streams of the client are passed to the daemon, which writes to them
+directly. See yeahyeah.server for the daemon side.
+
+Set the environment variable YEAHYEAH_NO_DAEMON to always run in-process.
+"""
+import array
+import json
+import os
+import socket
+import struct
+import sys
+
+
+def default_socket_path():
+    """Per-user location of the yeahyeah daemon socket. Can be overridden by
+    setting the YEAHYEAH_SOCKET environment variable
+    """
+    if "YEAHYEAH_SOCKET" in os.environ:
+        return os.environ["YEAHYEAH_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "yeahyeah.sock")
+    return os.path.join(private_socket_dir(), "yeahyeah.sock")
+
+
+def private_socket_dir():
+    """Folder for the daemon socket when there is no XDG_RUNTIME_DIR. The
+    daemon creates it, accessible to the current user only
+    """
+    return os.path.join("/tmp", f"yeahyeah-{os.getuid()}")
+
+
+def peer_uid(sock):
+    """User id of the process at the other end of connected unix socket sock.
+    Falls back to the owner of the socket file where SO_PEERCRED is not
+    available
+    """
+    if hasattr(socket, "SO_PEERCRED"):
+        credentials = sock.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        _, uid, _ = struct.unpack("3i", credentials)
+        return uid
+    return os.stat(sock.getpeername()).st_uid
+
+
+def run_in_daemon(args, prog_name="jj", socket_path=None, fds=(0, 1, 2)):
+    """Have a running daemon execute the given command line
+
+    Parameters
+    ----------
+    args: List[str]
+        Command line arguments, without program name
+    prog_name: str, optional
+        Program name to use in help and for shell completion. Defaults to 'jj'
+    socket_path: str, optional
+        Connect to this socket. Defaults to default_socket_path()
+    fds: Tuple[int, int, int], optional
+        stdin, stdout and stderr file descriptors for the daemon to use.
+        Defaults to the streams of this process
+
+    Returns
+    -------
+    int or None
+        Exit code of the command, or None if no daemon of this user is listening
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    request = {
+        "args": list(args),
+        "prog_name": prog_name,
+        "env": dict(os.environ),
+        "cwd": os.getcwd(),
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path or default_socket_path())
+        except OSError:  # no daemon, or no usable socket at this path
+            return None
+        if peer_uid(sock) != os.getuid():
+            # Never send environment and terminal to another user's process
+            print(
+                "Warning: ignoring yeahyeah daemon of another user at "
+                f"{sock.getpeername()}",
+                file=sys.stderr,
+            )
+            return None
+        sock.sendmsg(
+            [json.dumps(request).encode() + b"\n"],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))],
+        )
+        response = b""
+        while not response.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                # Do not retry in-process. The command might have run already
+                print("Error: yeahyeah daemon closed connection", file=sys.stderr)
+                return 1
+            response += chunk
+
+    return json.loads(response)["exit_code"]
+
+
+def use_daemon(args):
+    """False if args should never be passed to a daemon: when disabled with
+    YEAHYEAH_NO_DAEMON, when this process was started by socket activation,
+    and when starting a daemon. Otherwise these would connect to themselves
+    """
+    if os.environ.get("YEAHYEAH_NO_DAEMON"):
+        return False
+    if os.environ.get("LISTEN_PID") == str(os.getpid()):
+        return False
+    return list(args[:3]) != ["admin", "yeahyeah", "serve"]
+
+
+def main():
+    """Entry point for 'jj'. Executes in a yeahyeah daemon if one is running,
+    otherwise in this process
+    """
+    exit_code = None
+    if use_daemon(sys.argv[1:]):
+        exit_code = run_in_daemon(
+            sys.argv[1:], prog_name=os.path.basename(sys.argv[0]) or "jj"
+        )
+    if exit_code is None:
+        from yeahyeah.cli import main as run_in_process
+
+        run_in_process()
+    else:
+        sys.exit(exit_code)
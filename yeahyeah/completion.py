@@ -0,0 +1,380 @@
+"""Standalone shell completion scripts for yeahyeah.
+
+Click's own completion starts python and loads all plugins on each TAB press.
+These scripts contain all command names, options and argument names, so
+completion does not run python at all. They need to be regenerated whenever
+commands change. YeahYeah does this each time it updates its command index.
+"""
+import shlex
+from pathlib import Path
+
+import click
+from click.utils import make_default_short_help
+
+from yeahyeah.index import param_signature
+from yeahyeah.persistence import atomic_write
+
+PROG_NAMES = ["jj", "yeahyeah"]  # complete for these names. First is canonical
+
+
+class CompletionNode:
+    """Completion info for a single command or group"""
+
+    def __init__(self, subcommands, options, args):
+        """
+
+        Parameters
+        ----------
+        subcommands: List[Tuple[str, str]]
+            (name, short help) for each subcommand. Empty for commands
+        options: List[str]
+            All option strings for this command, like '-p' and '--print-only'
+        args: List[str]
+            Names of positional arguments in order. Names of arguments that take
+            any number of values end in '...'
+        """
+        self.subcommands = subcommands
+        self.options = options
+        self.args = args
+
+
+def get_completion_nodes(command, path, descriptions=None):
+    """Completion info for command and all its subcommands, recursively
+
+    Parameters
+    ----------
+    command: click.Command
+        Command to describe
+    path: str
+        Space-separated command names leading up to and including this command,
+        for example 'jj admin'
+    descriptions: Dict[str, Dict], optional
+        subcommand name: command_description() of that subcommand. Subcommands
+        that are not groups are completed from these, without getting the
+        subcommand itself. Defaults to None, meaning get all subcommands
+
+    Returns
+    -------
+    Dict[str, CompletionNode]
+        path: info for the command at that path
+    """
+    descriptions = descriptions or {}
+    subcommands = {}  # name: subcommand or description of subcommand
+    if isinstance(command, click.MultiCommand):
+        ctx = click.Context(command)
+        own_commands = getattr(command, "commands", {})
+        for name in command.list_commands(ctx):
+            sub = descriptions.get(name)
+            if sub is None or sub["is_group"] or name in own_commands:
+                sub = command.get_command(ctx, name)
+            if sub is not None:
+                subcommands[name] = sub
+    subcommands = {x: y for x, y in subcommands.items() if not is_hidden(y)}
+    nodes = {
+        path: CompletionNode(
+            subcommands=[(x, short_help(y)) for x, y in sorted(subcommands.items())],
+            **completion_params([param_signature(x) for x in command.params]),
+        )
+    }
+    for name, sub in subcommands.items():
+        if isinstance(sub, click.Command):
+            nodes.update(get_completion_nodes(sub, f"{path} {name}"))
+        else:
+            nodes[f"{path} {name}"] = CompletionNode(
+                subcommands=[], **completion_params(sub["params"])
+            )
+    return nodes
+
+
+def completion_params(params):
+    """Options and argument names for completing a command
+
+    Parameters
+    ----------
+    params: List[Dict]
+        Parameters of the command, as param_signature() describes them
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        options and args, as CompletionNode takes them
+    """
+    options, args = ["--help"], []
+    for param in params:
+        if param["kind"] == "option":
+            options += param["opts"] + param.get("secondary_opts", [])
+        elif param["nargs"] == -1:
+            args.append(f"{param['name']}...")
+        else:
+            args += [param["name"]] * param["nargs"]
+    return {"options": options, "args": args}
+
+
+def is_hidden(command):
+    """True if command, or its command_description(), is hidden from listings"""
+    if isinstance(command, click.Command):
+        return command.hidden
+    return command.get("hidden", False)
+
+
+def short_help(command, limit=60):
+    """Short help for command, or for its command_description(). Made from the
+    description like click.Command.get_short_help_str() makes it
+    """
+    if isinstance(command, click.Command):
+        return command.get_short_help_str(limit=limit)
+    text = command["short_help"] or ""
+    if not text and command["help"]:
+        text = make_default_short_help(command["help"], limit)
+    return text.strip()
+
+
+def bash_assignments(array_name, values):
+    """Lines that fill a bash/zsh associative array
+
+    Parameters
+    ----------
+    array_name: str
+    values: Dict[str, str]
+    """
+    return "\n".join(
+        f"{array_name}[{shlex.quote(key)}]={shlex.quote(value)}"
+        for key, value in values.items()
+    )
+
+
+def to_bash(nodes):
+    """Bash completion script for the given nodes
+
+    Parameters
+    ----------
+    nodes: Dict[str, CompletionNode]
+        As returned by get_completion_nodes()
+
+    Returns
+    -------
+    str
+    """
+    subcommands = {
+        path: " ".join(name for name, _ in node.subcommands)
+        for path, node in nodes.items()
+        if node.subcommands
+    }
+    options = {path: " ".join(node.options) for path, node in nodes.items()}
+    args = {path: " ".join(node.args) for path, node in nodes.items() if node.args}
+    return BASH_TEMPLATE.format(
+        subcommands=bash_assignments("_jj_subcommands", subcommands),
+        options=bash_assignments("_jj_options", options),
+        args=bash_assignments("_jj_args", args),
+        prog_names=" ".join(PROG_NAMES),
+    )
+
+
+BASH_TEMPLATE = """\
+# yeahyeah bash completion. Generated by 'jj admin yeahyeah completion-scripts'
+# Do not edit, changes will be overwritten.
+declare -gA _jj_subcommands _jj_options _jj_args
+{subcommands}
+{options}
+{args}
+
+_jj_completion() {{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}" cmd_path=jj word i n count
+    local -a positional arg_names
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        word="${{COMP_WORDS[i]}}"
+        [[ $word == -* ]] && continue
+        if ((${{#positional[@]}} == 0)) && [[ -n "${{_jj_options[$cmd_path $word]+x}}" ]]; then
+            cmd_path="$cmd_path $word"
+        else
+            positional+=("$word")
+        fi
+    done
+    if [[ $cur == -* ]]; then
+        COMPREPLY=($(compgen -W "${{_jj_options[$cmd_path]}}" -- "$cur"))
+    elif ((${{#positional[@]}} == 0)) && [[ -n "${{_jj_subcommands[$cmd_path]+x}}" ]]; then
+        COMPREPLY=($(compgen -W "${{_jj_subcommands[$cmd_path]}}" -- "$cur"))
+    else
+        arg_names=(${{_jj_args[$cmd_path]}})
+        n=${{#positional[@]}} count=${{#arg_names[@]}}
+        if ((count > 0 && n >= count)) && [[ ${{arg_names[count - 1]}} == *... ]]; then
+            n=$((count - 1))  # last argument takes any number of values
+        fi
+        if ((n >= count)); then
+            compopt +o default 2>/dev/null  # all arguments given. No file names
+        elif [[ -z $cur ]]; then
+            COMPREPLY=("<${{arg_names[n]}}>" "")  # lists the name, inserts nothing
+        fi
+    fi
+}}
+complete -o default -F _jj_completion {prog_names}
+"""
+
+
+def to_zsh(nodes):
+    """Zsh completion script for the given nodes. Shows help for each
+    subcommand and the name of the argument being completed
+
+    Parameters
+    ----------
+    nodes: Dict[str, CompletionNode]
+        As returned by get_completion_nodes()
+
+    Returns
+    -------
+    str
+    """
+    descriptions = {
+        path: "\n".join(
+            f"{name.replace(':', '_')}:{text}" for name, text in node.subcommands
+        )
+        for path, node in nodes.items()
+        if node.subcommands
+    }
+    options = {path: " ".join(node.options) for path, node in nodes.items()}
+    args = {path: " ".join(node.args) for path, node in nodes.items() if node.args}
+    return ZSH_TEMPLATE.format(
+        descriptions=bash_assignments("_jj_descriptions", descriptions),
+        options=bash_assignments("_jj_options", options),
+        args=bash_assignments("_jj_args", args),
+        prog_names=" ".join(PROG_NAMES),
+    )
+
+
+ZSH_TEMPLATE = """\
+#compdef {prog_names}
+# yeahyeah zsh completion. Generated by 'jj admin yeahyeah completion-scripts'
+# Do not edit, changes will be overwritten.
+typeset -gA _jj_descriptions _jj_options _jj_args
+{descriptions}
+{options}
+{args}
+
+_jj() {{
+    local cmd_path=jj word i
+    local -a positional arg_names
+    for ((i = 2; i < CURRENT; i++)); do
+        word=${{words[i]}}
+        [[ $word == -* ]] && continue
+        if ((${{#positional}} == 0)) && ((${{+_jj_options[$cmd_path $word]}})); then
+            cmd_path="$cmd_path $word"
+        else
+            positional+=($word)
+        fi
+    done
+    if [[ ${{words[CURRENT]}} == -* ]]; then
+        compadd -- ${{=_jj_options[$cmd_path]}}
+    elif ((${{#positional}} == 0)) && ((${{+_jj_descriptions[$cmd_path]}})); then
+        local -a described
+        described=("${{(@f)_jj_descriptions[$cmd_path]}}")
+        _describe -t commands command described
+    elif ((${{+_jj_args[$cmd_path]}})); then
+        arg_names=(${{=_jj_args[$cmd_path]}})
+        if ((${{#positional}} < ${{#arg_names}})); then
+            _message "${{arg_names[${{#positional}} + 1]}}"
+        elif [[ ${{arg_names[-1]}} == *... ]]; then
+            _message "${{arg_names[-1]}}"
+        fi
+    fi
+}}
+compdef _jj {prog_names}
+"""
+
+
+def to_fish(nodes):
+    """Fish completion script for the given nodes
+
+    Parameters
+    ----------
+    nodes: Dict[str, CompletionNode]
+        As returned by get_completion_nodes()
+
+    Returns
+    -------
+    str
+    """
+    prog = PROG_NAMES[0]
+    lines = [
+        f"set -g __jj_paths {' '.join(fish_quote(x) for x in nodes)}",
+        FISH_FUNCTIONS,
+        f"complete -c {prog} -f",
+    ]
+    for alias in PROG_NAMES[1:]:
+        lines.append(f"complete -c {alias} -w {prog}")
+    for path, node in nodes.items():
+        condition = fish_quote(f"__jj_at {fish_quote(path)}")
+        for name, text in node.subcommands:
+            lines.append(
+                f"complete -c {prog} -n {condition} -a {fish_quote(name)}"
+                f" -d {fish_quote(text)}"
+            )
+        for option in node.options:
+            flag = "-l" if option.startswith("--") else "-s"
+            lines.append(
+                f"complete -c {prog} -n {condition} {flag} {option.lstrip('-')}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def fish_quote(value):
+    """Quote value as a single-quoted fish string"""
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+FISH_FUNCTIONS = """\
+# yeahyeah fish completion. Generated by 'jj admin yeahyeah completion-scripts'
+# Do not edit, changes will be overwritten.
+function __jj_at --description 'Is the command line at this command path?'
+    set -l path jj
+    for word in (commandline -opc)[2..-1]
+        string match -q -- '-*' $word; and continue
+        contains -- "$path $word" $__jj_paths; or break
+        set path "$path $word"
+    end
+    test "$path" = "$argv[1]"
+end"""
+
+
+SHELLS = {"bash": to_bash, "zsh": to_zsh, "fish": to_fish}
+
+
+class CompletionScripts:
+    """Completion scripts for all shells, stored in a single folder"""
+
+    def __init__(self, folder):
+        """
+
+        Parameters
+        ----------
+        folder: Pathlike
+            Folder to write scripts to
+        """
+        self.folder = Path(folder)
+
+    def path(self, shell):
+        """Path to script for the given shell"""
+        return self.folder / f"{PROG_NAMES[0]}.{shell}"
+
+    def exist(self):
+        """True if scripts have been written before"""
+        return any(self.path(x).exists() for x in SHELLS)
+
+    def write(self, root_cli, descriptions=None):
+        """Write scripts for all shells
+
+        Parameters
+        ----------
+        root_cli: click.Command
+            Root yeahyeah command with all plugin commands added
+        descriptions: Dict[str, Dict], optional
+            root command name: command_description() of that command, for
+            completing commands without getting them from root_cli. Defaults to
+            None
+        """
+        nodes = get_completion_nodes(
+            root_cli, path=PROG_NAMES[0], descriptions=descriptions
+        )
+        self.folder.mkdir(parents=True, exist_ok=True)
+        for shell, generate in SHELLS.items():
+            with atomic_write(self.path(shell)) as f:
+                f.write(generate(nodes))
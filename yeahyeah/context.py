@@ -3,12 +3,24 @@ class YeahYeahContext:
     init() and to any method call
     """
 
-    def __init__(self, settings_path):
+    def __init__(self, settings_path, layer_paths=None):
         """
 
         Parameters
         ----------
         settings_path: Pathlike
             Path to the folder where any context can be stored
+        layer_paths: List[Pathlike] or Callable[[], List[Pathlike]], optional
+            Folders with shared read-only catalogs that plugins load before their
+            own, lowest precedence first. See yeahyeah.layers. Can be a function
+            that returns these, to read layer settings only when a plugin needs
+            them. Defaults to none
         """
         self.settings_path = settings_path
+        self._layer_paths = layer_paths or []
+
+    @property
+    def layer_paths(self):
+        if callable(self._layer_paths):
+            self._layer_paths = self._layer_paths() or []
+        return self._layer_paths
@@ -1,4 +1,5 @@
 import importlib
+import json
 from pathlib import Path
 
 import click
@@ -6,6 +7,15 @@ import click
 from yeahyeah.context import YeahYeahContext
 from yeahyeah.decorators import pass_yeahyeah_context
 from yeahyeah.exceptions import YeahYeahException
+from yeahyeah.index import (
+    CommandIndex,
+    CommandIndexFile,
+    CommandNames,
+    IndexedCommand,
+    KeywordIndexFile,
+    command_description,
+    fingerprint,
+)
 from yeahyeah.persistence import JSONSettingsFile
 
 
@@ -22,25 +32,99 @@ class YeahYeah:
         """
         self.configuration_path = configuration_path
         self.settings_file_path = configuration_path / "yeahyeah_settings.json"
+        self.command_index_file = CommandIndexFile(
+            configuration_path / "command_index.json"
+        )
+        self.command_index = None  # loaded on first use
+        self.keyword_index_file = KeywordIndexFile(
+            configuration_path / "command_index.keys"
+        )
+        self._completion_scripts = None  # created on first use
+        self.layers_file_path = configuration_path / "layers.json"
+        self._layers = None  # read on first use
         self.plugins = []
+        self.command_groups = {}  # plugin instance: group with its commands
+        self.lazy_plugin_paths = []  # import paths of plugins to load when needed
+        self.loaded_plugin_paths = {}  # import path: plugin instance
 
         self.root_cli = self.get_root_cli()
         self.admin_cli = self.get_admin_group()
         self.root_cli.add_command(self.admin_cli)
 
-        self.context = YeahYeahContext(settings_path=self.configuration_path)
+        self.context = YeahYeahContext(
+            settings_path=self.configuration_path,
+            layer_paths=lambda: self.layers.get_paths(),  # only when plugins load
+        )
+
+    # Modules for completion scripts, layers, the daemon and profiling are only
+    # imported when needed. Launching a command needs none of them
+
+    @property
+    def completion_scripts(self):
+        if self._completion_scripts is None:
+            from yeahyeah.completion import CompletionScripts
+
+            self._completion_scripts = CompletionScripts(
+                self.configuration_path / "completion"
+            )
+        return self._completion_scripts
+
+    @property
+    def layers(self):
+        """Shared catalog layers, as configured in layers.json"""
+        if self._layers is None:
+            from yeahyeah.layers import CatalogLayers
+
+            self._layers = CatalogLayers.from_configuration_path(
+                self.configuration_path
+            )
+        return self._layers
+
+    def revalidate_layers(self):
+        """Start updating the team layer mirror in the background if it is stale.
+        Without layers.json there is no team layer, and nothing is imported
+
+        Returns
+        -------
+        bool
+            True if an update was started
+        """
+        if not self.layers_file_path.exists():
+            return False
+        return self.layers.revalidate_in_background()
+
+    @classmethod
+    def init_from_settings(cls, configuration_path):
+        """Create instance and add all plugins in the settings file as lazy
+        plugins
+
+        Parameters
+        ----------
+        configuration_path: Pathlike
+            Path to a location where yeahyeah can read and write settings
+
+        Raises
+        ------
+        YeahYeahPersistenceException
+            If settings file exists but cannot be parsed
+        """
+        yeahyeah = cls(configuration_path=configuration_path)
+        for class_ref in yeahyeah.get_settings().plugin_paths:
+            yeahyeah.add_lazy_plugin(class_ref)
+        return yeahyeah
 
     def add_plugin_instance(self, plugin):
         """Add this plugin to yeahyeah
 
-        This will add all its actions to root_cli directly and all admin actions to
-        root_cli/admin
+        This will make all its actions available in root_cli directly and all
+        admin actions in root_cli/admin. Actions are only created when they are
+        asked for by name, see YeahYeahPlugin.get_command_group()
 
         Notes
         -----
-        Because all actions are added to root_cli directly, actions from different
+        Because all actions are in root_cli directly, actions from different
         yeahyeah_plugins can overwrite each other. YeahYeah does not check this.
-        New actions will overwrite old actions.
+        Actions of plugins added later overwrite those of earlier plugins.
 
         Parameters
         ----------
@@ -49,8 +133,7 @@ class YeahYeah:
 
         """
         self.plugins.append(plugin)
-        for command in plugin.get_commands():
-            self.root_cli.add_command(command)
+        self.add_plugin_commands(plugin)
 
         @click.group(name=plugin.slug, help=f"Admin for {plugin.slug}")
         @click.pass_context
@@ -61,6 +144,38 @@ class YeahYeah:
             plugin_admin.add_command(command)
         self.admin_cli.add_command(plugin_admin)
 
+    def add_plugin_commands(self, plugin):
+        """Make the commands of plugin available in root_cli"""
+        self.command_groups[plugin] = plugin.get_command_group()
+
+    def refresh_commands(self):
+        """Get the commands of all plugins again. For when plugins have changed
+        their commands, for example by adding an item
+        """
+        for plugin in self.plugins:
+            self.add_plugin_commands(plugin)
+
+    def get_plugin_command(self, command_name):
+        """Command with this name from one of the loaded plugins. Plugins added
+        later take precedence
+
+        Returns
+        -------
+        click.Command or None
+        """
+        for plugin in reversed(self.plugins):
+            command = self.command_groups[plugin].get_command(None, command_name)
+            if command is not None:
+                return command
+        return None
+
+    def list_plugin_command_names(self):
+        """Names of all commands of loaded plugins. Does not create commands"""
+        names = []
+        for plugin in self.plugins:
+            names += self.command_groups[plugin].list_commands(None)
+        return names
+
     def add_plugin(self, plugin):
         """Create an instance of this class and add to yeahyeah. Hides some
         details over add_plugin_instance
@@ -81,9 +196,9 @@ class YeahYeah:
             When plugin is neither a string nor a type
 
         """
-        if type(plugin) == str:
+        if type(plugin) is str:
             self.add_plugin_by_path(class_import_path=plugin)
-        elif type(plugin) == type:
+        elif type(plugin) is type:
             self.add_plugin_class(plugin_class=plugin)
         else:
             msg = (
@@ -100,8 +215,15 @@ class YeahYeah:
         ----------
         plugin_class: class extending yeahyeah.core.YeahYeahPlugin
             Plugin class to add
+
+        Returns
+        -------
+        YeahYeahPlugin:
+            The plugin instance that was added
         """
-        self.add_plugin_instance(plugin_class.init_from_context(context=self.context))
+        plugin = plugin_class.init_from_context(context=self.context)
+        self.add_plugin_instance(plugin)
+        return plugin
 
     def add_plugin_by_path(self, class_import_path):
         """Add a plugin by giving the python object import path
@@ -114,18 +236,349 @@ class YeahYeah:
 
         Returns
         -------
-        class:
-            loaded from class_import path
+        YeahYeahPlugin:
+            Instance of the class loaded from class_import path
+
+        """
+        return self.add_plugin_class(import_class(class_import_path))
+
+    def add_lazy_plugin(self, class_import_path):
+        """Add a plugin by import path, but do not import it until one of its
+        commands is actually needed
+
+        Parameters
+        ----------
+        class_import_path: str
+            Full import path to a YeahYeahPlugin class. For example
+            'myplugin.core.YeahYeahPluginClass'
+        """
+        self.lazy_plugin_paths.append(class_import_path)
+
+    @property
+    def unloaded_plugin_paths(self):
+        """Import paths of lazy plugins that have not been loaded yet"""
+        return [x for x in self.lazy_plugin_paths if x not in self.loaded_plugin_paths]
+
+    def load_lazy_plugin(self, class_import_path):
+        """Import and add a plugin that was added with add_lazy_plugin()"""
+        plugin = self.add_plugin_by_path(class_import_path)
+        self.loaded_plugin_paths[class_import_path] = plugin
 
+    def load_all_plugins(self, update_index=True):
+        """Import all lazy plugins
+
+        Parameters
+        ----------
+        update_index: bool, optional
+            Save the command index if it is outdated, so that next time plugins
+            do not have to be loaded to list or find commands. Defaults to True
         """
-        module, classname = class_import_path.rsplit(".", 1)
-        class_def = getattr(importlib.import_module(module), classname)
-        self.add_plugin_class(class_def)
+        if not self.unloaded_plugin_paths:
+            return
+        for class_import_path in self.unloaded_plugin_paths:
+            self.load_lazy_plugin(class_import_path)
+        if update_index and self.get_valid_command_index() is None:
+            self.save_command_index()
+
+    def update_command_index(self):
+        """Get commands of all plugins again and save the command index, if the
+        index is outdated. For after plugins have changed their commands. Saving
+        also updates completion scripts
+
+        Returns
+        -------
+        bool
+            True if the index was saved
+        """
+        if not self.lazy_plugin_paths or self.get_valid_command_index():
+            return False
+        self.load_all_plugins(update_index=False)
+        self.refresh_commands()
+        self.save_command_index()
+        return True
+
+    def save_command_index(self):
+        """Write name, help and owning plugin of each command in root_cli that
+        was added by a lazy plugin to the command index file. Entries of
+        commands that have not changed since the last index are kept
+        """
+        fingerprints = {
+            str(x): fingerprint(x)
+            for x in [self.settings_file_path, self.layers_file_path]
+        }
+        previous = self.command_index
+        if not previous or previous.plugin_paths != self.lazy_plugin_paths:
+            previous = None
+        elif any(previous.fingerprints.get(x) != y for x, y in fingerprints.items()):
+            previous = None  # settings or layers changed. Describe everything
+        entries = {}
+        for class_import_path in self.lazy_plugin_paths:
+            plugin = self.loaded_plugin_paths[class_import_path]
+            plugin_fingerprints = {
+                str(x): fingerprint(x) for x in plugin.get_config_files()
+            }
+            unchanged = previous and all(
+                previous.fingerprints.get(x) == y
+                for x, y in plugin_fingerprints.items()
+            )
+            fingerprints.update(plugin_fingerprints)
+            entries.update(
+                self.get_plugin_index_entries(
+                    class_import_path, previous=previous, unchanged=unchanged
+                )
+            )
+
+        self.command_index = CommandIndex(
+            plugin_paths=list(self.lazy_plugin_paths),
+            fingerprints=fingerprints,
+            entries=entries,
+        )
+        self.command_index_file.save_index(self.command_index)
+        self.keyword_index_file.write(self.command_index)
+        if self.completion_scripts.exist():
+            self.write_completion_scripts()
+
+    def get_plugin_index_entries(
+        self, class_import_path, previous=None, unchanged=False
+    ):
+        """Command index entries for all commands of a loaded lazy plugin
+
+        Parameters
+        ----------
+        class_import_path: str
+            Import path of the plugin
+        previous: CommandIndex, optional
+            An earlier index. Entries of this plugin's commands are taken from it
+            if their command data has not changed. Defaults to None, meaning
+            describe all commands
+        unchanged: bool, optional
+            If True, the config files of the plugin have not changed since
+            previous was made. All entries are then taken from previous if
+            possible, without getting command data. Defaults to False
+
+        Returns
+        -------
+        Dict[str, Dict]
+            command name: index entry
+        """
+        plugin = self.loaded_plugin_paths[class_import_path]
+        group = self.command_groups[plugin]
+        names = group.list_commands(None)
+        old = previous.entries if previous else {}
+        if unchanged:
+            entries = {x: old.get(x) for x in names}
+            if all(x and x["plugin"] == class_import_path for x in entries.values()):
+                return entries
+        data = plugin.get_command_data()
+        entries = {}
+        for name in names:
+            entry = old.get(name)
+            if (
+                not entry
+                or entry["plugin"] != class_import_path
+                or entry["data"] is None
+                or entry["data"] != data.get(name)
+            ):
+                entry = CommandIndex.make_entry(
+                    description=get_command_description(group, name),
+                    plugin_path=class_import_path,
+                    data=data.get(name),
+                )
+            entries[name] = entry
+        return entries
+
+    def get_root_command_descriptions(self):
+        """command name: command_description() of each root command added by a
+        plugin. Read from the command index for lazy plugins if it is valid.
+        Does not create commands for plugins that can describe them without
+
+        Returns
+        -------
+        Dict[str, Dict]
+        """
+        index = self.get_valid_command_index() if self.lazy_plugin_paths else None
+        descriptions = dict(index.entries) if index else {}
+        indexed = set(self.loaded_plugin_paths.values()) if index else set()
+        for plugin in self.plugins:
+            if plugin not in indexed:
+                group = self.command_groups[plugin]
+                descriptions.update(list_command_descriptions(group))
+        return descriptions
+
+    def write_completion_scripts(self):
+        """Write completion scripts for all root commands"""
+        self.completion_scripts.write(
+            self.root_cli, descriptions=self.get_root_command_descriptions()
+        )
+
+    def get_valid_command_index(self):
+        """The command index, if it is still valid for the current plugins and
+        their config files
+
+        Returns
+        -------
+        CommandIndex or None
+            None if there is no index or if it is outdated
+        """
+        if self.command_index is None:
+            self.command_index = self.command_index_file.load_index()
+        if self.command_index.is_valid(self.lazy_plugin_paths):
+            return self.command_index
+        else:
+            return None
+
+    def find_root_command(self, command_name):
+        """Find command that has not been added to root_cli yet.
+
+        Looks in loaded plugins first. If the command index is valid, returns a
+        stand-in for the command without loading any more plugins. The index
+        lists all commands of lazy plugins, so there is no need to load these
+        when the command is not in it. Otherwise loads all plugins
+
+        Parameters
+        ----------
+        command_name: str
+            Name of a command in root_cli
+
+        Returns
+        -------
+        click.Command or None
+            The command or a stand-in, or None if not found
+        """
+        if not self.unloaded_plugin_paths:
+            return self.get_plugin_command(command_name)
+        index = self.get_valid_command_index()
+        if index and command_name in index.entries:
+            return IndexedCommand(
+                name=command_name,
+                entry=index.entries[command_name],
+                resolve=self.resolve_indexed_command,
+            )
+        if index is None:
+            command = self.find_unindexed_command(command_name)
+            if command is not None:
+                return command
+            self.load_all_plugins()
+        return self.get_plugin_command(command_name)
+
+    def find_unindexed_command(self, command_name):
+        """Look a command up in lazy plugins that have not been loaded, without
+        loading them completely. For launching a command when there is no valid
+        command index. Plugins added later take precedence, so this stops at the
+        first plugin that cannot look the command up this way
+
+        Returns
+        -------
+        click.Command or None
+            None if the command was not found this way
+        """
+        if self.plugins:
+            return None
+        for class_import_path in reversed(self.lazy_plugin_paths):
+            looked_up, command = import_class(class_import_path).command_from_name(
+                context=self.context, command_name=command_name
+            )
+            if not looked_up or command is not None:
+                return command
+        return None
+
+    def list_root_command_names(self):
+        """Names of all commands, including those of lazy plugins. Reads names
+        from the command index if possible, otherwise loads all plugins
+        """
+        index = self.get_valid_command_index()
+        if index and self.unloaded_plugin_paths:
+            return list(index.entries) + self.list_plugin_command_names()
+        self.load_all_plugins()
+        return self.list_plugin_command_names()
+
+    def get_catalog_version(self):
+        """Changes whenever the names of root commands might have changed: when
+        another command index is used, plugins are added or their commands are
+        refreshed, or items are added to or removed from plugin catalogs
+
+        Returns
+        -------
+        Tuple
+            Only meaningful for comparing with ==
+        """
+        index = self.get_valid_command_index() if self.unloaded_plugin_paths else None
+        return (
+            tuple(self.root_cli.commands),
+            index,
+            [(x, getattr(x, "version", None)) for x in self.command_groups.values()],
+        )
+
+    def resolve_indexed_command(self, command_name):
+        """Get the actual command for an entry in the command index. Asks the
+        owning plugin to create only this command if possible. Otherwise loads the
+        owning plugin, or all plugins if this command cannot be found there
+
+        Parameters
+        ----------
+        command_name: str
+            Name of a command in the command index
+
+        Returns
+        -------
+        click.Command
+        """
+        entry = self.command_index.entries[command_name]
+        plugin_path = entry["plugin"]
+        if plugin_path not in self.loaded_plugin_paths:
+            if entry["data"] is not None:
+                command = import_class(plugin_path).command_from_data(
+                    context=self.context, data=entry["data"]
+                )
+                if command is not None:
+                    return command
+            self.load_lazy_plugin(plugin_path)
+        command = self.get_plugin_command(command_name)
+        if command is None:
+            self.load_all_plugins()
+            command = self.get_plugin_command(command_name)
+        return command
+
+    def launch_plain(self, args):
+        """Launch a plugin command directly, bypassing click, if args are just a
+        command name from the command index followed by plain arguments
+
+        Parameters
+        ----------
+        args: List[str]
+            Command line arguments, without program name
+
+        Returns
+        -------
+        bool
+            True if launched. False if nothing was done and args should be passed
+            to root_cli instead
+        """
+        if not args:
+            return False
+        valid, entry = self.keyword_index_file.lookup(args[0], self.lazy_plugin_paths)
+        if not valid:  # keyword index missing or outdated. Try the full index
+            index = self.get_valid_command_index()
+            if index is None:
+                return False
+            self.keyword_index_file.write(index)
+            entry = index.entries.get(args[0])
+        if entry is None or entry["data"] is None:
+            return False
+        return import_class(entry["plugin"]).launch_from_data(
+            context=self.context, data=entry["data"], args=args[1:]
+        )
 
     def get_root_cli(self):
         """Create yeahyeah root group"""
 
-        @click.group()
+        @click.group(
+            cls=PluginLoadingGroup,
+            find_command=self.find_root_command,
+            list_command_names=self.list_root_command_names,
+            get_version=self.get_catalog_version,
+            match_prefixes=True,
+        )
         @click.pass_context
         def root_cli(ctx):
             """Yeahyeah launch things"""
@@ -136,11 +589,33 @@ class YeahYeah:
         return root_cli
 
     def get_admin_group(self):
-        @click.group(name="admin")
+        def find_admin_command(_):
+            """Admin commands are added by plugins, so all need to be loaded. The
+            command index is updated once the admin command has finished
+            """
+            self.load_all_plugins(update_index=False)
+
+        def list_admin_command_names():
+            self.load_all_plugins(update_index=False)
+            return []
+
+        @click.group(
+            name="admin",
+            cls=PluginLoadingGroup,
+            find_command=find_admin_command,
+            list_command_names=list_admin_command_names,
+        )
         def admin_group():
             """Admin options for yeahyeah and yeahyeah_plugins"""
             pass
 
+        @admin_group.result_callback()
+        def update_command_index(*_, **__):
+            """Admin commands can change plugin items. Update cached commands and
+            completion scripts right away
+            """
+            self.update_command_index()
+
         @click.group(name="yeahyeah")
         def yeahyeah_group():
             """Admin options for yeahyeah itsel"""
@@ -150,6 +625,10 @@ class YeahYeah:
         yeahyeah_group.add_command(self.enable_autocompletion)
         yeahyeah_group.add_command(self.get_status_command())
         yeahyeah_group.add_command(self.get_edit_plugins_command())
+        yeahyeah_group.add_command(self.get_serve_command())
+        yeahyeah_group.add_command(self.get_completion_scripts_command())
+        yeahyeah_group.add_command(self.get_profile_startup_command())
+        yeahyeah_group.add_command(self.get_layers_command())
 
         return admin_group
 
@@ -167,12 +646,14 @@ class YeahYeah:
         @pass_yeahyeah_context
         def status(ctx: YeahYeahContext):
             """Configuration and status"""
+            self.load_all_plugins()
             click.echo("YeahYeah launch status:")
             click.echo(f"settings folder: '{self.configuration_path}'")
             click.echo(
                 f"{len(self.plugins)} yeahyeah_plugins activated: [{', '.join([x.slug for x in self.plugins])}]"
             )
-            click.echo(f"{len(self.root_cli.commands)} commands in main menu")
+            names = set(self.root_cli.commands) | set(self.list_plugin_command_names())
+            click.echo(f"{len(names)} commands in main menu")
 
         return status
 
@@ -186,6 +667,126 @@ class YeahYeah:
 
         return edit_plugins
 
+    def get_serve_command(self):
+        """Run yeahyeah as a daemon that the 'jj' client can hand commands to"""
+
+        def load_yeahyeah():
+            yeahyeah = YeahYeah.init_from_settings(self.configuration_path)
+            yeahyeah.load_all_plugins()
+            return yeahyeah
+
+        @click.command()
+        @click.option(
+            "--idle-timeout",
+            type=int,
+            default=3600,
+            show_default=True,
+            help="Stop after this many seconds without requests. 0 for never",
+        )
+        @click.option("--socket-path", type=str, help="Listen on this unix socket")
+        @click.option(
+            "--fork",
+            is_flag=True,
+            help="Run each command in a fresh child process. Isolates commands "
+            "from each other",
+        )
+        def serve(idle_timeout, socket_path, fork):
+            """Keep plugins loaded and run commands for 'jj'"""
+            from yeahyeah.server import (
+                YeahYeahForkServer,
+                YeahYeahServer,
+                YeahYeahServerException,
+            )
+
+            server_class = YeahYeahForkServer if fork else YeahYeahServer
+            server = server_class(
+                load_yeahyeah=load_yeahyeah,
+                socket_path=socket_path,
+                idle_timeout=idle_timeout or None,
+            )
+            click.echo(f"Serving yeahyeah on {server.socket_path}")
+            try:
+                server.serve()
+            except YeahYeahServerException as e:
+                raise click.ClickException(str(e))
+
+        return serve
+
+    def get_completion_scripts_command(self):
+        """Write completion scripts that do not need to start python"""
+
+        @click.command()
+        def completion_scripts():
+            """Write fast shell completion scripts"""
+            from yeahyeah.completion import SHELLS
+
+            existed = self.completion_scripts.exist()
+            if not (self.update_command_index() and existed):
+                self.write_completion_scripts()
+            bash, zsh, fish = (self.completion_scripts.path(x) for x in SHELLS)
+            click.echo(
+                f"Wrote completion scripts to '{self.completion_scripts.folder}'. "
+                f"These are updated automatically when commands change. "
+                f"To enable, run one of these:\n"
+                f"\n"
+                f"    $ echo 'source {bash}' >> ~/.bashrc\n"
+                f"    $ echo 'source {zsh}' >> ~/.zshrc\n"
+                f"    $ ln -s {fish} ~/.config/fish/completions/jj.fish\n"
+            )
+
+        return completion_scripts
+
+    def get_profile_startup_command(self):
+        """Show how long each phase of starting yeahyeah takes"""
+
+        @click.command(name="profile-startup")
+        @click.option("--json", "as_json", is_flag=True, help="Output as JSON")
+        @click.option(
+            "--top", default=15, show_default=True, help="Number of imports to show"
+        )
+        def profile_startup_command(as_json, top):
+            """Time each phase of a cold start, and the slowest imports"""
+            from yeahyeah.profiling import YeahYeahProfilingException, profile_startup
+
+            try:
+                profile = profile_startup(self.configuration_path)
+            except YeahYeahProfilingException as e:
+                raise click.ClickException(str(e))
+            if as_json:
+                click.echo(json.dumps(profile.to_dict(top=top), indent=2))
+            else:
+                click.echo(profile.to_table(top=top))
+
+        return profile_startup_command
+
+    def get_layers_command(self):
+        """Show shared catalog layers, and update the team layer's mirror"""
+
+        @click.command()
+        @click.option(
+            "--update", is_flag=True, help="Update the team mirror now and wait"
+        )
+        def layers(update):
+            """Shared catalog folders, lowest precedence first"""
+            from yeahyeah.layers import YeahYeahLayerException
+
+            for path in self.layers.get_paths():
+                exists = "" if path.exists() else " (does not exist)"
+                click.echo(f"{path}{exists}")
+            click.echo(f"{self.configuration_path} (own)")
+            mirror = self.layers.mirror
+            if not mirror:
+                return
+            click.echo(f"Team layer {mirror.source} is mirrored to {mirror.path}")
+            if update:
+                try:
+                    changed = mirror.update()
+                except YeahYeahLayerException as e:
+                    raise click.ClickException(str(e))
+                click.echo(f"Updated {len(changed)} files")
+
+        return layers
+
     @staticmethod
     @click.command()
     def enable_autocompletion():
@@ -198,6 +799,10 @@ class YeahYeah:
             "To enable auto completion permanently, run this\n"
             "\n"
             "    $ echo 'eval \"$(_JJ_COMPLETE=bash_source jj)\"' >> ~/.bashrc\n"
+            "\n"
+            "For faster completion that does not start python on each TAB, run\n"
+            "\n"
+            "    $ jj admin yeahyeah completion-scripts\n"
         )
 
     def get_settings(self):
@@ -212,6 +817,280 @@ class YeahYeah:
         return assert_yeahyeah_settings(self.settings_file_path)
 
 
+class PluginLoadingGroup(click.Group):
+    """A click group that can load plugins on demand when a command is requested
+    that has not been added yet. Can also find commands by a unique prefix of
+    their name, like 'wi' for 'wiki'
+    """
+
+    # Most candidates to list when a prefix is ambiguous
+    MAX_CANDIDATES = 10
+
+    def __init__(
+        self,
+        *args,
+        find_command,
+        list_command_names,
+        get_version=None,
+        match_prefixes=False,
+        **kwargs,
+    ):
+        """
+
+        Parameters
+        ----------
+        find_command: Callable[[str], Optional[click.Command]]
+            Called with a command name when that command is not in this group. Can
+            load plugins that add the command, or return a command directly
+        list_command_names: Callable[[], List[str]]
+            Called when listing commands. Returns names of commands that have not
+            been added yet. Can also load plugins that add commands
+        get_version: Callable[[], object], optional
+            Returns something that changes whenever the command names might
+            have changed. Names are listed and sorted once per version. Defaults
+            to None, meaning list and sort names each time
+        match_prefixes: bool, optional
+            Find commands by a prefix of their name if that prefix is not a
+            command name itself and only one command starts with it. Defaults to
+            False
+        """
+        super().__init__(*args, **kwargs)
+        self.find_command = find_command
+        self.list_command_names = list_command_names
+        self.get_version = get_version
+        self.match_prefixes = match_prefixes
+        self.command_names = None  # CommandNames, for the version they hold
+
+    def get_command_names(self):
+        """Names of all commands, sorted
+
+        Returns
+        -------
+        CommandNames
+        """
+        names = self.command_names
+        if names is None or not self.get_version or names.version != self.get_version():
+            not_added = self.list_command_names()  # might add commands
+            self.command_names = CommandNames(
+                names=list(self.commands) + list(not_added),
+                version=self.get_version() if self.get_version else None,
+            )
+        return self.command_names
+
+    def get_command(self, ctx, cmd_name):
+        command = self.get_named_command(cmd_name)
+        if command is None and self.match_prefixes:
+            candidates = self.get_command_names().with_prefix(cmd_name)
+            if len(candidates) == 1:
+                command = self.get_named_command(candidates[0])
+            elif candidates and ctx is not None and not ctx.resilient_parsing:
+                shown = ", ".join(candidates[: self.MAX_CANDIDATES])
+                if len(candidates) > self.MAX_CANDIDATES:
+                    shown += f" and {len(candidates) - self.MAX_CANDIDATES} more"
+                ctx.fail(f"Ambiguous command '{cmd_name}'. Could be {shown}")
+        return command
+
+    def get_named_command(self, cmd_name):
+        """The command with exactly this name, or None"""
+        if cmd_name not in self.commands:
+            command = self.find_command(cmd_name)
+            if command is not None:
+                return command
+        return self.commands.get(cmd_name)
+
+    def resolve_command(self, ctx, args):
+        """Like click does, but returns the full name of a command found by
+        prefix, for usage and error messages
+        """
+        cmd_name, command, args = super().resolve_command(ctx, args)
+        return (command.name if command else cmd_name), command, args
+
+    def list_commands(self, ctx):
+        return list(self.get_command_names().names)
+
+    def shell_complete(self, ctx, incomplete):
+        """Complete command names with a binary search in the sorted names,
+        instead of checking each name
+        """
+        from click.shell_completion import CompletionItem
+
+        results = []
+        for name in self.get_command_names().with_prefix(incomplete):
+            command = self.get_named_command(name)
+            if command is not None and not command.hidden:
+                results.append(CompletionItem(name, help=command.get_short_help_str()))
+        # options of this group
+        results.extend(click.Command.shell_complete(self, ctx, incomplete))
+        return results
+
+
+class PluginCommandGroup(click.MultiCommand):
+    """The commands of a single plugin. Lists command names without creating
+    any commands, and creates each command only when it is asked for by name.
+    For plugins with many commands, of which a single launch needs just one
+    """
+
+    def __init__(
+        self,
+        name,
+        list_names,
+        make_command,
+        get_version=None,
+        help=None,
+        describe_command=None,
+    ):
+        """
+
+        Parameters
+        ----------
+        name: str
+            Name of the group
+        list_names: Callable[[], List[str]]
+            Returns the names of all commands
+        make_command: Callable[[str], Optional[click.Command]]
+            Creates the command with the given name. Returns None if there is no
+            such command
+        get_version: Callable[[], object], optional
+            Returns something that changes whenever commands change, for example
+            when an item was added. Commands are made again after that. Defaults
+            to None, meaning commands never change
+        help: str, optional
+            Help text for the group
+        describe_command: Callable[[str], Optional[Dict]], optional
+            Describes the command with the given name like command_description()
+            does, without making it. Returns None if there is no such command.
+            Defaults to None, meaning commands are made to describe them
+        """
+        super().__init__(name=name, help=help)
+        self.list_names = list_names
+        self.make_command = make_command
+        self.get_version = get_version
+        self.describe_command = describe_command
+        self.made = {}  # command name: command. Each command is made once
+        self.made_version = self.version  # version of the commands in made
+
+    @property
+    def version(self):
+        return self.get_version() if self.get_version else None
+
+    def get_command(self, ctx, cmd_name):
+        version = self.version
+        if version != self.made_version:
+            self.made, self.made_version = {}, version
+        if cmd_name not in self.made:
+            command = self.make_command(cmd_name)
+            if command is None:
+                return None
+            self.made[cmd_name] = command
+        return self.made[cmd_name]
+
+    def list_commands(self, ctx):
+        return list(self.list_names())
+
+    def get_description(self, cmd_name):
+        """Help, parameters and so on of a command, as command_description() gives
+        them. Does not make the command if this group can describe it without
+
+        Returns
+        -------
+        Dict or None
+            None if there is no such command
+        """
+        if self.describe_command:
+            return self.describe_command(cmd_name)
+        command = self.get_command(None, cmd_name)
+        return command_description(command) if command else None
+
+    def list_descriptions(self):
+        """command name: get_description() for all commands
+
+        Returns
+        -------
+        Dict[str, Dict]
+        """
+        return {x: self.get_description(x) for x in self.list_names()}
+
+
+def list_command_descriptions(group):
+    """command name: command_description() for all commands in group. Does not
+    make the commands of a PluginCommandGroup that can describe them without
+
+    Parameters
+    ----------
+    group: click.MultiCommand
+
+    Returns
+    -------
+    Dict[str, Dict]
+    """
+    if isinstance(group, PluginCommandGroup):
+        return group.list_descriptions()
+    return {x: get_command_description(group, x) for x in group.list_commands(None)}
+
+
+def get_command_description(group, cmd_name):
+    """command_description() of a command in group. Does not make the command
+    if group is a PluginCommandGroup that can describe it without
+
+    Parameters
+    ----------
+    group: click.MultiCommand
+    cmd_name: str
+
+    Returns
+    -------
+    Dict or None
+        None if there is no such command
+    """
+    if isinstance(group, PluginCommandGroup):
+        return group.get_description(cmd_name)
+    command = group.get_command(None, cmd_name)
+    return command_description(command) if command else None
+
+
+class LazyGroup(click.MultiCommand):
+    """Stand-in for a click group in a module that is slow to import. Imports
+    the actual group only when it is invoked or its subcommands are needed
+    """
+
+    def __init__(self, name, import_path, help=None, short_help=None):
+        """
+
+        Parameters
+        ----------
+        name: str
+            Name of the group
+        import_path: str
+            Full import path to the actual group. For example 'myplugin.cli.main'
+        help: str, optional
+            Help text to show without importing the actual group
+        short_help: str, optional
+            Short help to show without importing the actual group
+        """
+        super().__init__(name=name, help=help, short_help=short_help)
+        self.import_path = import_path
+
+    def get_group(self):
+        """The actual group. Imported on first call"""
+        return import_class(self.import_path)
+
+    @property
+    def commands(self):
+        return self.get_group().commands
+
+    def get_command(self, ctx, cmd_name):
+        return self.get_group().get_command(ctx, cmd_name)
+
+    def list_commands(self, ctx):
+        return self.get_group().list_commands(ctx)
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        """Parse arguments with the actual group. Invoking the context this
+        returns will invoke the actual group
+        """
+        return self.get_group().make_context(info_name, args, parent=parent, **extra)
+
+
 class YeahYeahPlugin:
     """Some named thing that adds launchable commands to yeahyeah"""
 
@@ -242,6 +1121,18 @@ class YeahYeahPlugin:
         """
         raise NotImplementedError()
 
+    def get_command_group(self):
+        """All commands of this plugin as a single click group. YeahYeah gets
+        commands from this by name. By default a group with all of
+        get_commands(). Return a PluginCommandGroup instead to create commands
+        only when they are needed
+
+        Returns
+        -------
+        click.MultiCommand
+        """
+        return click.Group(name=self.slug, commands=self.get_commands())
+
     def get_admin_commands(self):
         """Action to do admin tasks for this plugin, if any
 
@@ -253,6 +1144,88 @@ class YeahYeahPlugin:
         """
         raise NotImplementedError()
 
+    def get_config_files(self):
+        """Files that determine which commands this plugin provides. When any of
+        these change, the cached command index is no longer valid
+
+        Returns
+        -------
+        List[Pathlike]
+        """
+        return []
+
+    def get_command_data(self):
+        """Data from which command_from_data() can create single commands without
+        initialising this plugin. Stored in the command index
+
+        Returns
+        -------
+        Dict[str, object]
+            command name: JSON-serialisable data for that command
+        """
+        return {}
+
+    @classmethod
+    def command_from_data(cls, context: YeahYeahContext, data):
+        """Create a single command from data returned by get_command_data()
+
+        Parameters
+        ----------
+        context: YeahYeahContext
+            Context of the root yeahyeah module
+        data: object
+            Data for a single command as returned by get_command_data()
+
+        Returns
+        -------
+        click.Command or None
+            The command, or None if this plugin cannot create single commands
+        """
+        return None
+
+    @classmethod
+    def command_from_name(cls, context: YeahYeahContext, command_name):
+        """Create a single command by name, without loading this plugin
+        completely. For launching a command that is not in the command index
+
+        Parameters
+        ----------
+        context: YeahYeahContext
+            Context of the root yeahyeah module
+        command_name: str
+            Name of the command
+
+        Returns
+        -------
+        Tuple[bool, click.Command or None]
+            Whether this plugin could look the command up this way, and the
+            command, or None if this plugin does not have it
+        """
+        return False, None
+
+    @classmethod
+    def launch_from_data(cls, context: YeahYeahContext, data, args):
+        """Launch the command described by data directly, without click. For
+        fast dispatch of the most common calls. Must behave exactly like invoking
+        the click command would
+
+        Parameters
+        ----------
+        context: YeahYeahContext
+            Context of the root yeahyeah module
+        data: object
+            Data for a single command as returned by get_command_data()
+        args: List[str]
+            Command line arguments after the command name
+
+        Returns
+        -------
+        bool
+            True if launched. False if nothing was done and the command should be
+            invoked through click instead
+        """
+        return False
+
 
 class YeahYeahSettings:
     """Settings for the core yeahyeah module"""
@@ -324,5 +1297,24 @@ class YeahYeahSettingsFile(JSONSettingsFile):
         return Path(self.path).exists()
 
 
+def import_class(class_import_path):
+    """Import the class at the given import path
+
+    Parameters
+    ----------
+    class_import_path: str
+        Full import path to a class. For example 'myplugin.core.MyClass'
+
+    Raises
+    ------
+    ModuleNotFoundError
+        When given import path does not exist
+    AttributeError:
+        When the module does not contain the class
+    """
+    module, classname = class_import_path.rsplit(".", 1)
+    return getattr(importlib.import_module(module), classname)
+
+
 class YeahYeahPluginImportException(YeahYeahException):
     pass
@@ -2,3 +2,15 @@ class YeahYeahException(Exception):
     """'Something' has gone wrong in yeahyeah"""
 
     pass
+
+
+class MenuItemLoadError(Exception):
+    pass
+
+
+class MenuItemDuplicateError(MenuItemLoadError):
+    pass
+
+
+class MenuItemExportError(Exception):
+    pass
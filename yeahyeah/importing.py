@@ -0,0 +1,371 @@
+"""Adding many menu items at once from files in other formats: CSV, JSON lines,
+yaml as written by MenuItemList.save(), or a browser bookmarks HTML export.
+
+Files are read one record at a time. Records are checked against the existing
+items by name first, so that a plugin can write its catalog once at the end.
+See ImportPlan
+"""
+import csv
+import json
+import os
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+
+from yeahyeah.exceptions import MenuItemLoadError
+from yeahyeah.parsing import iter_yaml_items
+
+FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".html": "bookmarks",
+    ".htm": "bookmarks",
+}
+
+
+def format_for_path(path):
+    """Import format for the extension of path
+
+    Raises
+    ------
+    MenuItemLoadError
+        If the extension is not one of FORMATS
+    """
+    try:
+        return FORMATS[Path(path).suffix.lower()]
+    except KeyError:
+        raise MenuItemLoadError(
+            f"Cannot tell the format of '{path}' from its extension. Expected "
+            f"one of {sorted(FORMATS)}"
+        )
+
+
+def iter_records(file, file_format, value_field):
+    """Read raw items from file one at a time
+
+    Parameters
+    ----------
+    file: open file handle
+    file_format: str
+        One of the values in FORMATS
+    value_field: str
+        Parameter that holds the url or path of an item, like 'pattern'. Bookmark
+        urls and 'url' columns go here
+
+    Returns
+    -------
+    Iterator[Tuple[str, Dict, int]]
+        name, parameters and line number of each item, as accepted by
+        MenuItemList.item_from_raw()
+
+    Raises
+    ------
+    MenuItemLoadError
+        If the file as a whole cannot be read in this format
+    """
+    if file_format == "csv":
+        return iter_csv_records(file, value_field)
+    elif file_format == "jsonl":
+        return iter_jsonl_records(file, value_field)
+    elif file_format == "yaml":
+        return iter_yaml_items(file)
+    elif file_format == "bookmarks":
+        return iter_bookmark_records(file, value_field)
+    raise MenuItemLoadError(
+        f"Unknown import format '{file_format}'. Expected one of "
+        f"{sorted(set(FORMATS.values()))}"
+    )
+
+
+def record_from_fields(fields, value_field, line):
+    """Name, parameters and line from a flat dict of fields, as in CSV and JSON
+    lines files. The name is in 'name' or 'keyword', the help text in 'text' or
+    'help_text'. Empty fields are left out
+    """
+    values = {k: v for k, v in fields.items() if k and v not in (None, "")}
+    name = values.pop("name", None) or values.pop("keyword", None)
+    if "help_text" in values:
+        values["text"] = values.pop("help_text")
+    if "url" in values and value_field not in values:
+        values[value_field] = values.pop("url")
+    return name, values, line
+
+
+def iter_csv_records(file, value_field):
+    """Rows of a CSV file with a header row"""
+    reader = csv.DictReader(file)
+    if reader.fieldnames is None:
+        return
+    if not {"name", "keyword"}.intersection(reader.fieldnames):
+        raise MenuItemLoadError(
+            f"Expected a 'name' or 'keyword' column in CSV header, but found "
+            f"{reader.fieldnames}"
+        )
+    for row in reader:
+        yield record_from_fields(row, value_field, reader.line_num)
+
+
+def iter_jsonl_records(file, value_field):
+    """One JSON object per line. Empty lines are skipped"""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            raise MenuItemLoadError(f"Invalid JSON at line {line_number}: {e}")
+        if type(fields) is not dict:
+            raise MenuItemLoadError(
+                f"Expected a JSON object at line {line_number}, but found "
+                f"{type(fields)} instead"
+            )
+        yield record_from_fields(fields, value_field, line_number)
+
+
+def iter_bookmark_records(file, value_field, chunk_size=64 * 1024):
+    """Links in a Netscape bookmark file, as exported by all major browsers. The
+    name is the bookmark's keyword if it has one, or else its title made into a
+    keyword. Firefox '%s' keyword placeholders become a '{query}' field
+    """
+    parser = BookmarkParser(value_field)
+    for chunk in iter(lambda: file.read(chunk_size), ""):
+        parser.feed(chunk)
+        yield from parser.take_bookmarks()
+    parser.close()
+    yield from parser.take_bookmarks()
+
+
+class BookmarkParser(HTMLParser):
+    """Collects links from a Netscape bookmark file as it is fed. Bookmarks are
+    handed out as (name, parameters, line) by take_bookmarks()
+    """
+
+    def __init__(self, value_field):
+        super().__init__()
+        self.value_field = value_field
+        self.bookmarks = []
+        self.link = None  # (href, keyword, line) of the link being read
+        self.title = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "a":
+            return
+        attrs = dict(attrs)
+        href = attrs.get("href") or ""
+        if href.startswith(("place:", "javascript:")):
+            return  # browser internal queries and bookmarklets
+        self.link = (href, attrs.get("shortcuturl"), self.getpos()[0])
+        self.title = []
+
+    def handle_data(self, data):
+        if self.link:
+            self.title.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != "a" or not self.link:
+            return
+        href, keyword, line = self.link
+        title = "".join(self.title).strip()
+        values = {self.value_field: href.replace("%s", "{query}")}
+        if title:
+            values["text"] = title
+        self.bookmarks.append((keyword or keyword_from_title(title), values, line))
+        self.link = None
+
+    def take_bookmarks(self):
+        """Bookmarks read since the last call"""
+        bookmarks, self.bookmarks = self.bookmarks, []
+        return bookmarks
+
+
+def keyword_from_title(title):
+    """Title as a lowercase keyword of letters, digits and underscores"""
+    return re.sub(r"\W+", "_", title.lower()).strip("_")
+
+
+class ImportPlan:
+    """What importing records into a list of existing items would change.
+    Nothing is changed until a plugin applies the plan, so a plan doubles as a
+    dry run
+
+    Records are matched against existing items by name in a dict, so planning is
+    linear in the number of records plus existing items. An item that is
+    already present with exactly the same parameters is skipped. A different
+    item with the same name is a conflict. It is reported and left out, or
+    replaces the existing item if replace is set. Within the imported records,
+    the same applies to later records with the name of an earlier one
+    """
+
+    def __init__(self, list_class, existing, replace=False):
+        """
+
+        Parameters
+        ----------
+        list_class: Type[MenuItemList]
+            List class of the items to import
+        existing: Iterable[SerialisableMenuItem]
+            Items already in the catalog
+        replace: bool, optional
+            Replace existing items with the same name instead of leaving out
+            the imported one. Defaults to False
+        """
+        self.list_class = list_class
+        self.replace = replace
+        self.existing = {}  # name: set of serialised items with that name
+        for item in existing:
+            self.existing.setdefault(item.name, set()).add(self.serialise(item))
+        self.added = {}  # name: item to add, in the order read
+        self.replaced = []  # names of existing items to remove
+        self.unchanged = 0  # records that were already present
+        self.conflicts = []  # messages
+        self.errors = []  # messages
+        self.read = 0  # number of records read
+
+    def serialise(self, item):
+        return json.dumps(self.list_class.item_to_data(item), sort_keys=True)
+
+    def add_records(self, records, progress=None, progress_every=500):
+        """Plan the import of each record
+
+        Parameters
+        ----------
+        records: Iterable[Tuple[str, Dict, int]]
+            name, parameters and line number of each item, as from
+            iter_records()
+        progress: Callable[[], None], optional
+            Called every progress_every records and when done. Defaults to None
+        progress_every: int, optional
+            Defaults to 500
+
+        Returns
+        -------
+        ImportPlan
+            This plan
+
+        Raises
+        ------
+        MenuItemLoadError
+            If records cannot be read at all. Single records that do not make a
+            valid item are collected in errors instead
+        """
+        for name, values, line in records:
+            self.read += 1
+            if progress and self.read % progress_every == 0:
+                progress()
+            if not name:
+                self.errors.append(f"Item without a name at line {line}")
+                continue
+            try:
+                item = self.list_class.item_from_raw(name, values, line)
+            except MenuItemLoadError as e:
+                self.errors.append(str(e))
+                continue
+            self.add_item(item, line)
+        if progress:
+            progress()
+        return self
+
+    def add_item(self, item, line=None):
+        location = f" at line {line}" if line is not None else ""
+        serialised = self.serialise(item)
+        if item.name in self.added:
+            if self.serialise(self.added[item.name]) == serialised:
+                self.unchanged += 1
+            elif self.replace:
+                self.conflicts.append(f"{item}{location} replaces an earlier record")
+                self.added[item.name] = item
+            else:
+                self.conflicts.append(
+                    f"{item}{location} left out, an earlier record has this name"
+                )
+            return
+        if item.name in self.existing:
+            if self.existing[item.name] == {serialised}:
+                self.unchanged += 1
+                return
+            elif not self.replace:
+                self.conflicts.append(
+                    f"{item}{location} left out, an existing item has this name"
+                )
+                return
+            self.conflicts.append(f"{item}{location} replaces an existing item")
+            self.replaced.append(item.name)
+        self.added[item.name] = item
+
+    def has_changes(self):
+        return bool(self.added or self.replaced)
+
+    def apply(self, item_list):
+        """Make the planned changes to item_list in place
+
+        Returns
+        -------
+        Tuple[List[SerialisableMenuItem], List[str]]
+            Items added and names of items removed, to save
+        """
+        for name in self.replaced:
+            item_list.remove(name)
+        added = list(self.added.values())
+        item_list.extend(added)
+        return added, self.replaced
+
+    def summary(self, dry_run=False):
+        """One line saying what was or would be changed"""
+        verb = "Would import" if dry_run else "Imported"
+        return (
+            f"{verb} {len(self.added)} of {self.read} items, replacing "
+            f"{len(self.replaced)} existing items. {self.unchanged} were already "
+            f"present. {len(self.conflicts)} conflicts, {len(self.errors)} errors"
+        )
+
+
+def plan_import(
+    path,
+    list_class,
+    existing,
+    value_field,
+    file_format=None,
+    replace=False,
+    progress=None,
+):
+    """Read the items in the file at path and plan adding them to existing
+
+    Parameters
+    ----------
+    path: Pathlike
+        File to import
+    list_class: Type[MenuItemList]
+        List class of the items to import
+    existing: Iterable[SerialisableMenuItem]
+        Items already in the catalog
+    value_field: str
+        Parameter that holds the url or path of an item. See iter_records()
+    file_format: str, optional
+        One of the values in FORMATS. Defaults to None, meaning choose by
+        extension of path
+    replace: bool, optional
+        Replace existing items with the same name. Defaults to False
+    progress: Callable[[int, int], None], optional
+        Called now and then with the number of bytes read so far and the file
+        size. Defaults to None
+
+    Returns
+    -------
+    ImportPlan
+
+    Raises
+    ------
+    MenuItemLoadError
+        If the file cannot be read in this format
+    """
+    file_format = file_format or format_for_path(path)
+    plan = ImportPlan(list_class, existing, replace=replace)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        size = os.fstat(f.fileno()).st_size
+        report = (lambda: progress(f.buffer.tell(), size)) if progress else None
+        return plan.add_records(
+            iter_records(f, file_format, value_field), progress=report
+        )
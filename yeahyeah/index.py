@@ -0,0 +1,373 @@
+"""Cached information on all root commands, so that help, completion and dispatch
+do not require importing and initialising every plugin on each call
+"""
+import bisect
+import json
+import mmap
+import struct
+import sys
+
+import click
+
+from yeahyeah.persistence import (
+    JSONSettingsFile,
+    YeahYeahPersistenceException,
+    atomic_write,
+    fingerprint,
+)
+
+
+def param_signature(param):
+    """Describe a click parameter as a JSON-serialisable dict
+
+    Parameters
+    ----------
+    param: click.Parameter
+
+    Returns
+    -------
+    Dict
+    """
+    return {
+        "kind": param.param_type_name,
+        "name": param.name,
+        "opts": param.opts,
+        "secondary_opts": param.secondary_opts,
+        "nargs": param.nargs,
+        "is_flag": getattr(param, "is_flag", False),
+    }
+
+
+def argument_signature(declaration, nargs=1):
+    """param_signature() of click.argument(declaration, nargs=nargs), without
+    creating the argument
+    """
+    return {
+        "kind": "argument",
+        "name": declaration.replace("-", "_").lower(),
+        "opts": [declaration],
+        "secondary_opts": [],
+        "nargs": nargs,
+        "is_flag": False,
+    }
+
+
+def command_description(command):
+    """Describe a click command as a JSON-serialisable dict, for listing it in
+    help and completion without the command itself
+
+    Parameters
+    ----------
+    command: click.Command
+
+    Returns
+    -------
+    Dict
+    """
+    return {
+        "help": command.help,
+        "short_help": command.short_help,
+        "is_group": isinstance(command, click.MultiCommand),
+        "hidden": command.hidden,
+        "params": [param_signature(x) for x in command.params],
+    }
+
+
+class CommandNames:
+    """Command names in sorted order. Finds all names that start with a prefix
+    with a binary search, for dispatching and completing by prefix
+    """
+
+    def __init__(self, names, version=None):
+        """
+
+        Parameters
+        ----------
+        names: Iterable[str]
+            Command names. Duplicates are left out
+        version: object, optional
+            Version of whatever names were read from. Defaults to None
+        """
+        self.names = sorted(set(names))
+        self.version = version
+
+    def __contains__(self, name):
+        position = bisect.bisect_left(self.names, name)
+        return position < len(self.names) and self.names[position] == name
+
+    def __len__(self):
+        return len(self.names)
+
+    def with_prefix(self, prefix):
+        """All names that start with prefix, sorted
+
+        Returns
+        -------
+        List[str]
+        """
+        start = bisect.bisect_left(self.names, prefix)
+        if not prefix or ord(prefix[-1]) == sys.maxunicode:
+            end = start
+            while end < len(self.names) and self.names[end].startswith(prefix):
+                end += 1
+        else:  # first name after all names with this prefix
+            after = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            end = bisect.bisect_left(self.names, after, lo=start)
+        return self.names[start:end]
+
+    def resolve(self, name):
+        """Names that name could refer to: name itself if it is a command name,
+        otherwise all names it is a prefix of
+
+        Returns
+        -------
+        List[str]
+            A single name if name is unambiguous
+        """
+        if name in self:
+            return [name]
+        return self.with_prefix(name)
+
+
+class CommandIndex:
+    """Name, help text, parameters and owning plugin of each root command, plus
+    fingerprints of the files these were read from
+    """
+
+    def __init__(self, plugin_paths, fingerprints, entries):
+        """
+
+        Parameters
+        ----------
+        plugin_paths: List[str]
+            Import paths of all plugins in this index, in load order
+        fingerprints: Dict[str, List[int]]
+            file path: fingerprint() of that file when this index was created
+        entries: Dict[str, Dict]
+            command name: entry as created by make_entry()
+        """
+        self.plugin_paths = plugin_paths
+        self.fingerprints = fingerprints
+        self.entries = entries
+
+    def is_valid(self, plugin_paths):
+        """True if this index was created for the given plugins and none of the
+        files it was read from have changed since
+        """
+        if plugin_paths != self.plugin_paths:
+            return False
+        return all(fingerprint(path) == x for path, x in self.fingerprints.items())
+
+    def owner(self, command_name):
+        """Import path of the plugin that provided command_name, or None"""
+        entry = self.entries.get(command_name)
+        return entry["plugin"] if entry else None
+
+    @staticmethod
+    def make_entry(description, plugin_path, data=None):
+        """Index entry for a command
+
+        Parameters
+        ----------
+        description: Dict
+            The command, as described by command_description()
+        plugin_path: str
+            Import path of the plugin that provided this command
+        data: JSON-serialisable, optional
+            Anything the plugin needs to recreate this command without loading
+            completely. See YeahYeahPlugin.get_command_data(). Defaults to None
+
+        Returns
+        -------
+        Dict
+        """
+        return {"plugin": plugin_path, **description, "data": data}
+
+    def to_dict(self):
+        return {
+            "plugin_paths": self.plugin_paths,
+            "fingerprints": self.fingerprints,
+            "entries": self.entries,
+        }
+
+    @classmethod
+    def from_dict(cls, dict_in):
+        return cls(
+            plugin_paths=dict_in["plugin_paths"],
+            fingerprints=dict_in["fingerprints"],
+            entries=dict_in["entries"],
+        )
+
+
+EMPTY_INDEX = CommandIndex(plugin_paths=None, fingerprints={}, entries={})
+
+
+class KeywordIndexFile:
+    """Compact, read-only copy of a CommandIndex for finding a single command
+    without reading the whole index. The file is memory-mapped and searched
+    in place, so a lookup only touches the few pages it needs.
+
+    Layout, all integers little-endian:
+
+    * MAGIC, header length (uint32), number of commands (uint32)
+    * header: JSON with plugin_paths and fingerprints, as in CommandIndex
+    * table: per command, sorted by utf-8 name: name offset (uint64), name
+      length (uint32), record offset (uint64), record length (uint32)
+    * names and records: utf-8 names and JSON index entries
+
+    Files are replaced atomically, never changed in place. A process that has
+    the file mapped keeps reading the version it opened
+    """
+
+    MAGIC = b"yykidx01"
+    HEAD = struct.Struct("<8sII")
+    ROW = struct.Struct("<QIQI")
+
+    def __init__(self, path):
+        """
+
+        Parameters
+        ----------
+        path: Pathlike
+            Path to the index file
+        """
+        self.path = path
+
+    def write(self, index):
+        """Write index to this file
+
+        Parameters
+        ----------
+        index: CommandIndex
+        """
+        header = json.dumps(
+            {"plugin_paths": index.plugin_paths, "fingerprints": index.fingerprints}
+        ).encode()
+        entries = sorted(
+            (name.encode(), json.dumps(entry).encode())
+            for name, entry in index.entries.items()
+        )
+        offset = self.HEAD.size + len(header) + self.ROW.size * len(entries)
+        table, packed = [], []
+        for name, record in entries:
+            table.append(
+                self.ROW.pack(offset, len(name), offset + len(name), len(record))
+            )
+            packed += [name, record]
+            offset += len(name) + len(record)
+
+        with atomic_write(self.path, mode="wb") as f:
+            f.write(self.HEAD.pack(self.MAGIC, len(header), len(entries)))
+            f.write(header)
+            f.write(b"".join(table))
+            f.write(b"".join(packed))
+
+    def lookup(self, name, plugin_paths):
+        """Find the index entry for a single command
+
+        Parameters
+        ----------
+        name: str
+            Command name
+        plugin_paths: List[str]
+            Import paths of the current plugins, in load order
+
+        Returns
+        -------
+        Tuple[bool, Dict or None]
+            Whether this file is a valid index for plugin_paths and the
+            current config files, and the entry for name. Entry is None if
+            the index is invalid or does not contain name
+        """
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                return self.lookup_mapped(mapped, name.encode(), plugin_paths)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):  # corrupt
+            return False, None
+
+    def lookup_mapped(self, mapped, name, plugin_paths):
+        magic, header_length, count = self.HEAD.unpack_from(mapped, 0)
+        if magic != self.MAGIC:
+            return False, None
+        header = json.loads(mapped[self.HEAD.size : self.HEAD.size + header_length])
+        if header["plugin_paths"] != plugin_paths or not all(
+            fingerprint(path) == x for path, x in header["fingerprints"].items()
+        ):
+            return False, None
+
+        table = self.HEAD.size + header_length
+        low, high = 0, count
+        while low < high:  # binary search over sorted names
+            middle = (low + high) // 2
+            (
+                name_offset,
+                name_length,
+                record_offset,
+                record_length,
+            ) = self.ROW.unpack_from(mapped, table + middle * self.ROW.size)
+            found = mapped[name_offset : name_offset + name_length]
+            if found < name:
+                low = middle + 1
+            elif found > name:
+                high = middle
+            else:
+                record = mapped[record_offset : record_offset + record_length]
+                return True, json.loads(record)
+        return True, None
+
+
+class IndexedCommand(click.Command):
+    """Stand-in for a command that has not been loaded yet. Can show help text
+    in listings. Hands over to the actual command as soon as it is invoked
+    """
+
+    def __init__(self, name, entry, resolve):
+        """
+
+        Parameters
+        ----------
+        name: str
+            Name of the command
+        entry: Dict
+            Index entry for this command, as created by make_entry()
+        resolve: Callable[[str], click.Command]
+            Returns the actual command for the given command name
+        """
+        super().__init__(name=name, help=entry["help"], short_help=entry["short_help"])
+        self.resolve = resolve
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        """Parse arguments with the actual command. Invoking the context this
+        returns will invoke the actual command
+        """
+        return self.resolve(self.name).make_context(
+            info_name, args, parent=parent, **extra
+        )
+
+
+class CommandIndexFile(JSONSettingsFile):
+    """File that holds a CommandIndex"""
+
+    def load_index(self):
+        """Load index from this file
+
+        Returns
+        -------
+        CommandIndex
+            Empty, invalid index if the file does not exist or cannot be parsed
+        """
+        try:
+            return CommandIndex.from_dict(self.load())
+        except (FileNotFoundError, YeahYeahPersistenceException, KeyError, TypeError):
+            return EMPTY_INDEX
+
+    def save_index(self, index):
+        """
+
+        Parameters
+        ----------
+        index: CommandIndex
+        """
+        self.save(index.to_dict())
@@ -0,0 +1,201 @@
+"""Append-only journal of changes to a menu item file. Default storage for menu
+item plugins, see MenuItemPluginMixin.get_storage()
+"""
+import json
+from pathlib import Path
+
+from yeahyeah.caches import ParseCache
+from yeahyeah.persistence import atomic_write, fingerprint
+
+
+class MenuItemJournal:
+    """Append-only record of changes to a menu item file, stored next to it.
+    Saving an added or removed item costs one small append instead of rewriting
+    the whole file. Loading replays the journal on top of the file. Saving the
+    full list folds the journal back into the file, see save()
+
+    One JSON object per line: {"add": item data} or {"remove": item name}
+    """
+
+    # Fold the journal back into the file when it grows beyond this many bytes
+    COMPACT_SIZE = 64 * 1024
+
+    def __init__(self, path, list_class):
+        """
+
+        Parameters
+        ----------
+        path: Pathlike
+            Path to the menu item file that this journal records changes to
+        list_class: Type[MenuItemList]
+            List class that reads the menu item file
+        """
+        self.path = Path(path)
+        self.list_class = list_class
+        self.journal_path = self.path.with_name(f"{self.path.name}.journal")
+        self.loaded = None  # fingerprints of file and journal at last load
+
+    def fingerprints(self):
+        return [fingerprint(self.path), fingerprint(self.journal_path)]
+
+    def is_changed(self):
+        """True if file or journal were changed by anything other than this
+        object since the last load()
+        """
+        return self.fingerprints() != self.loaded
+
+    def exists(self):
+        return self.journal_path.exists()
+
+    def load(self):
+        """Items in the menu item file, with all changes in the journal applied
+
+        Returns
+        -------
+        MenuItemList
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When the file or an item in the journal could not be loaded
+        """
+        self.loaded = self.fingerprints()
+        return self.replay(self.list_class.load_cached(self.path))
+
+    def replay(self, item_list):
+        """Apply all changes in the journal to item_list, in order
+
+        Adding an item replaces any item with the same name in its position, so
+        that replaying on a file that the journal was already folded into is
+        harmless
+
+        Parameters
+        ----------
+        item_list: MenuItemList
+
+        Returns
+        -------
+        MenuItemList
+            item_list, changed in place
+        """
+        for change in self.changes():
+            if "add" in change:
+                item_list.append(self.list_class.item_from_data(change["add"]))
+            elif "remove" in change and change["remove"] in item_list:
+                item_list.remove(change["remove"])
+        return item_list
+
+    def changes(self):
+        """All changes in the journal, in order. Skips a partial line left by an
+        interrupted append
+
+        Returns
+        -------
+        List[Dict]
+        """
+        try:
+            with open(self.journal_path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+
+        changes = []
+        for line in lines:
+            try:
+                changes.append(json.loads(line))
+            except ValueError:
+                continue
+        return changes
+
+    def find(self, name):
+        """The item with this name, without loading all items. Reads the parse
+        cache of the menu item file if it is valid, otherwise parses the file only
+        up to the item. Then applies the changes in the journal to that item only
+
+        Returns
+        -------
+        SerialisableMenuItem or None
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When the item could not be loaded
+        """
+        item = None
+        cached = ParseCache(self.path).read()
+        if cached is not None:
+            raw = next((x for x in cached if x[0] == name), None)
+            item = raw and self.list_class.item_from_raw(*raw)
+        elif self.path.exists():
+            with open(self.path, "r") as f:
+                item = self.list_class.find(f, name)
+
+        for change in self.changes():
+            if "add" in change:
+                added = self.list_class.item_from_data(change["add"])
+                item = added if added.name == name else item
+            elif change.get("remove") == name:
+                item = None
+        return item
+
+    def record(self, added=(), removed=()):
+        """Append changes to the journal, in a single write
+
+        Parameters
+        ----------
+        added: List[SerialisableMenuItem], optional
+            Items that were added. Defaults to none
+        removed: List[str], optional
+            Names of items that were removed. Removes all items with that name
+            when replayed. Defaults to none
+        """
+        changes = [{"remove": x} for x in removed]
+        changes += [{"add": self.list_class.item_to_data(x)} for x in added]
+        unchanged = not self.is_changed()
+        with open(self.journal_path, "a") as f:
+            f.write("".join(json.dumps(x) + "\n" for x in changes))
+        if unchanged:
+            self.loaded = self.fingerprints()
+
+    def needs_compaction(self):
+        """True if the journal has grown so large that the menu item file should
+        be rewritten
+        """
+        try:
+            return self.journal_path.stat().st_size > self.COMPACT_SIZE
+        except FileNotFoundError:
+            return False
+
+    def files(self):
+        """Files that items are read from"""
+        return [self.path, self.journal_path]
+
+    def search(self, query):
+        """Items with all words in query in their name or help text
+
+        Returns
+        -------
+        MenuItemList
+        """
+        return self.replay(self.list_class.load_cached(self.path)).search(query)
+
+    def save(self, item_list):
+        """Write item_list to the menu item file and remove the journal"""
+        with atomic_write(self.path) as f:
+            item_list.save(file=f)
+        self.clear()
+
+    def export(self, item_list):
+        """Make the menu item file show all items, for editing by hand"""
+        if self.exists():
+            self.save(item_list)
+
+    def clear(self):
+        """Remove the journal. Call this after writing the full list to the menu
+        item file. The list written is now what was last loaded
+        """
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
+        self.loaded = self.fingerprints()
@@ -0,0 +1,318 @@
+"""Shared catalogs in layers. Plugins load catalog files from a system folder,
+then from a team folder, then from the user's own configuration folder. Later
+layers take precedence: an item replaces items with the same name from earlier
+layers.
+
+The team folder is typically on a network share. It is never read while
+launching. Instead it is mirrored to a local folder, and the mirror is brought
+up to date in a background process once it is older than max_staleness. Changed
+files are found by modification time and size, and only replaced when their
+checksum changed.
+
+Layers are configured in 'layers.json' in the configuration folder, for example
+{"team": "/mnt/share/yeahyeah", "max_staleness": 300}
+
+Run as a script to update a mirror: python -m yeahyeah.layers SOURCE MIRROR
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+from yeahyeah.exceptions import YeahYeahException
+from yeahyeah.persistence import (
+    JSONSettingsFile,
+    YeahYeahPersistenceException,
+    atomic_write,
+    file_lock,
+    fingerprint,
+)
+
+SYSTEM_LAYER_PATH = Path("/etc/yeahyeah")
+DEFAULT_MAX_STALENESS = 300  # seconds
+
+
+class CatalogLayers:
+    """Folders with shared catalogs that plugins load before the user's own"""
+
+    def __init__(
+        self,
+        system_path=SYSTEM_LAYER_PATH,
+        team_path=None,
+        mirror_path=None,
+        max_staleness=DEFAULT_MAX_STALENESS,
+    ):
+        """
+
+        Parameters
+        ----------
+        system_path: Pathlike, optional
+            Folder with catalogs for all users. Defaults to SYSTEM_LAYER_PATH
+        team_path: Pathlike, optional
+            Folder with catalogs shared by a team, often on a network share.
+            Defaults to None, meaning no team layer
+        mirror_path: Pathlike, optional
+            Local copy of team_path that catalogs are actually read from.
+            Required when team_path is given
+        max_staleness: float, optional
+            Update the mirror in the background when it was last checked more
+            than this many seconds ago. Defaults to DEFAULT_MAX_STALENESS
+        """
+        self.system_path = Path(system_path) if system_path else None
+        self.mirror = None
+        if team_path:
+            self.mirror = LayerMirror(
+                source=team_path, path=mirror_path, max_staleness=max_staleness
+            )
+
+    @classmethod
+    def from_configuration_path(cls, configuration_path):
+        """Layers as configured in layers.json in configuration_path. Only the
+        system layer if that file does not exist
+
+        Raises
+        ------
+        YeahYeahPersistenceException
+            If layers.json exists but cannot be parsed
+        """
+        settings_file = JSONSettingsFile(Path(configuration_path) / "layers.json")
+        try:
+            settings = settings_file.load()
+        except FileNotFoundError:
+            return cls()
+        if type(settings) is not dict:
+            raise YeahYeahPersistenceException(
+                f"Expected a dictionary in {settings_file.path}, but found "
+                f"{type(settings)} instead"
+            )
+        return cls(
+            system_path=settings.get("system", SYSTEM_LAYER_PATH),
+            team_path=settings.get("team"),
+            mirror_path=Path(configuration_path) / "layers" / "team",
+            max_staleness=settings.get("max_staleness", DEFAULT_MAX_STALENESS),
+        )
+
+    def get_paths(self):
+        """Folders to load catalogs from, lowest precedence first. The user's
+        own configuration folder comes after these. Folders might not exist
+
+        Returns
+        -------
+        List[Path]
+        """
+        paths = [self.system_path] if self.system_path else []
+        if self.mirror:
+            paths.append(self.mirror.path)
+        return paths
+
+    def revalidate_in_background(self):
+        """Start updating the team mirror in a background process if it is
+        stale. Returns right away
+
+        Returns
+        -------
+        bool
+            True if an update was started
+        """
+        return bool(self.mirror) and self.mirror.revalidate_in_background()
+
+
+class LayerMirror:
+    """Local copy of a folder of catalogs on a network share. A manifest in the
+    copy records the modification time, size and checksum of each file in the
+    source at the last update
+    """
+
+    def __init__(self, source, path, max_staleness=DEFAULT_MAX_STALENESS):
+        """
+
+        Parameters
+        ----------
+        source: Pathlike
+            Folder to copy
+        path: Pathlike
+            Local folder to copy to. Created if needed
+        max_staleness: float, optional
+            Seconds after which the copy should be checked against source again.
+            Defaults to DEFAULT_MAX_STALENESS
+        """
+        self.source = Path(source)
+        self.path = Path(path)
+        self.max_staleness = max_staleness
+        self.manifest_file = JSONSettingsFile(self.path / ".yeahyeah_mirror.json")
+
+    def read_manifest(self):
+        """{'source': str, 'checked': time of last check,
+        'files': {relative path: [mtime_ns, size, sha256]}}, or an empty
+        manifest if there is none for this source
+        """
+        try:
+            manifest = self.manifest_file.load()
+        except (FileNotFoundError, YeahYeahPersistenceException):
+            manifest = {}
+        if manifest.get("source") != str(self.source):
+            manifest = {"source": str(self.source), "checked": 0, "files": {}}
+        return manifest
+
+    def is_stale(self, now=None):
+        """True if source was last checked more than max_staleness ago"""
+        now = time.time() if now is None else now
+        return now - self.read_manifest()["checked"] > self.max_staleness
+
+    def revalidate_in_background(self):
+        """If stale, start a process that runs update(). Marks the mirror as
+        checked first, so that other calls do not start another process. Never
+        waits: if the mirror is locked, an update is already running
+
+        Returns
+        -------
+        bool
+            True if a process was started
+        """
+        if not self.is_stale():
+            return False
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            with file_lock(self.path, blocking=False):
+                manifest = self.read_manifest()
+                manifest["checked"] = time.time()
+                self.manifest_file.save(manifest)
+        except BlockingIOError:
+            return False
+
+        import subprocess  # only needed now and then
+
+        subprocess.Popen(
+            [sys.executable, "-m", "yeahyeah.layers", str(self.source), str(self.path)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,  # survive jj exiting
+        )
+        return True
+
+    def update(self):
+        """Make the mirror match source. Only copies files whose checksum
+        changed, and only reads files whose modification time or size changed.
+        Files in the mirror that yeahyeah wrote itself, like parse caches, are
+        left alone. Source is read before locking the mirror, so that a slow
+        share never keeps others waiting for the lock
+
+        Returns
+        -------
+        List[str]
+            Relative paths of files that were copied or removed
+
+        Raises
+        ------
+        YeahYeahLayerException
+            If source cannot be read. The mirror is left as it was
+        """
+        try:
+            source_files = self.read_source(self.read_manifest()["files"])
+        except OSError as e:
+            raise YeahYeahLayerException(f"Could not read {self.source}: {e}")
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path):
+            manifest = self.read_manifest()
+            changed = self.replace_files(manifest["files"], source_files)
+            for relative in set(manifest["files"]) - set(source_files):
+                try:
+                    (self.path / relative).unlink()
+                    changed.append(relative)
+                except FileNotFoundError:
+                    pass
+            files = {k: entry for k, (entry, _) in source_files.items()}
+            manifest.update(checked=time.time(), files=files)
+            self.manifest_file.save(manifest)
+        return changed
+
+    def read_source(self, known_files):
+        """Fingerprint and checksum of each file in source. Reads the contents
+        of files whose modification time or size differ from known_files
+
+        Parameters
+        ----------
+        known_files: Dict[str, List]
+            Manifest entries from the last update
+
+        Returns
+        -------
+        Dict[str, Tuple[List, bytes or None]]
+            relative path: manifest entry, and contents if the file was read
+
+        Raises
+        ------
+        OSError
+            If source cannot be read
+        """
+        import hashlib  # not needed when only reading layers
+
+        found = {}
+        for relative in self.list_source_files():
+            current = fingerprint(self.source / relative)
+            if current is None:
+                continue  # removed while updating
+            known = known_files.get(relative)
+            if known and known[:2] == current:
+                found[relative] = (known, None)
+                continue
+            content = (self.source / relative).read_bytes()
+            checksum = hashlib.sha256(content).hexdigest()
+            found[relative] = (current + [checksum], content)
+        return found
+
+    def replace_files(self, known_files, source_files):
+        """Write files that were read from source to the mirror, unless the
+        mirror already has a copy with the same checksum
+
+        Returns
+        -------
+        List[str]
+            Relative paths of files that were written
+        """
+        changed = []
+        for relative, (entry, content) in source_files.items():
+            if content is None:
+                continue
+            known = known_files.get(relative)
+            target = self.path / relative
+            if known and known[2] == entry[2] and target.exists():
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(target, mode="wb") as f:
+                f.write(content)
+            changed.append(relative)
+        return changed
+
+    def list_source_files(self):
+        """Relative paths of all files in source, except hidden files
+
+        Raises
+        ------
+        OSError
+            If source cannot be read
+        """
+        if not self.source.is_dir():
+            raise FileNotFoundError(f"No such folder: '{self.source}'")
+        found = []
+        for folder, folders, file_names in os.walk(self.source, onerror=raise_error):
+            folders[:] = [x for x in folders if not x.startswith(".")]
+            for name in file_names:
+                if not name.startswith("."):
+                    path = Path(folder) / name
+                    found.append(path.relative_to(self.source).as_posix())
+        return sorted(found)
+
+
+def raise_error(error):
+    raise error
+
+
+class YeahYeahLayerException(YeahYeahException):
+    pass
+
+
+if __name__ == "__main__":
+    LayerMirror(source=sys.argv[1], path=sys.argv[2]).update()
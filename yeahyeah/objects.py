@@ -3,12 +3,35 @@ these lists
 
 Anything above core yeahyeah functionality that can potentially be used by multiple yeahyeah_plugins
 """
-import collections
+import collections.abc
+import contextlib
+import itertools
+import os
+import sys
+from pathlib import Path
+
+import click
 import yaml
 
+from yeahyeah.caches import MenuItemFragments, ParseCache
+from yeahyeah.core import PluginCommandGroup
+from yeahyeah.exceptions import MenuItemDuplicateError, MenuItemLoadError
+from yeahyeah.index import param_signature
+from yeahyeah.journal import MenuItemJournal
+from yeahyeah.parsing import YAML_DUMPER, iter_yaml_items
+from yeahyeah.persistence import file_lock
+from yeahyeah.shell_export import ShellFunctionExport
+from yeahyeah.usage import UsageLog, record_usage
+
 
 class YeahYeahMenuItem:
-    """Something you can add to the base yeahyeah menu and then launch"""
+    """Something you can add to the base yeahyeah menu and then launch
+
+    Items have __slots__ instead of a __dict__, as large catalogs hold many of
+    them. Subclasses should declare __slots__ for their own attributes too
+    """
+
+    __slots__ = ("name", "_help_text")
 
     def __init__(self, name, help_text=None):
         """
@@ -42,10 +65,73 @@ class YeahYeahMenuItem:
         """
         raise NotImplementedError()
 
+    def get_param_signatures(self):
+        """Parameters of the click command, as param_signature() describes them.
+        Creates the command. Override this if parameters are known without it
+
+        Returns
+        -------
+        List[Dict]
+        """
+        return [param_signature(x) for x in self.to_click_command().params]
+
+    def parse_plain_args(self, args):
+        """Parse command line arguments without click, if they are plain enough.
+        For launching this item quickly. See launch()
+
+        Parameters
+        ----------
+        args: List[str]
+            Command line arguments after the name of this item
+
+        Returns
+        -------
+        Dict[str, object] or None
+            Keyword arguments for launch(), or None if args contain options,
+            help or anything else that requires the click command
+        """
+        return None
+
+    def launch(self, **kwargs):
+        """Launch this item, exactly like its click command would
+
+        Parameters
+        ----------
+        kwargs:
+            Parsed command line parameters, as passed to the click command
+        """
+        raise NotImplementedError()
+
+    def to_shell_function(self, function_name):
+        """Body of a shell function that launches this item the way its click
+        command would, but without starting python
+
+        Parameters
+        ----------
+        function_name: str
+            Name of the shell function. For usage messages
+
+        Returns
+        -------
+        str
+            Shell commands, one per line
+
+        Raises
+        ------
+        MenuItemExportError
+            If this item cannot be expressed as a shell function
+        """
+        raise NotImplementedError()
+
 
 class SerialisableMenuItem(YeahYeahMenuItem):
     """A menu item that you can serialise to and from a dict"""
 
+    __slots__ = ()
+
+    # Keys of get_parameters(). Loading recognises this class by these
+    parameter_names = ()
+
     def get_parameters(self):
         """Any extra parameters as dict. These are saved along with item name and
         help_text. Overwrite this in child classes
@@ -81,26 +167,224 @@ class SerialisableMenuItem(YeahYeahMenuItem):
         return cls(name=name, help_text=help_text, **values)
 
 
-class MenuItemList(collections.UserList):
-    """A list-like list of menu items that can be saved to and loaded from a file"""
+class MenuItemList(collections.abc.MutableSequence):
+    """A list-like list of menu items that can be saved to and loaded from a file
+
+    Items are kept in order in a dict by name, so that getting, removing and
+    checking for an item by name take constant time. Names are unique. Adding an
+    item with a name that is already in the list follows the duplicates policy:
+    'replace' the existing item in its position, which is what saving and loading
+    always did, or raise an 'error'. Access by position takes linear time
+
+    items and data are read-only tuples. Change the list itself instead, or
+    assign to data to replace all items
+    """
 
     # The type of objects that this list can contain
     item_classes = [SerialisableMenuItem]
 
-    def __init__(self, items):
+    # What to do when adding an item with a name already in the list. See append()
+    duplicates = "replace"
+
+    # Source of version numbers. Shared by all lists, so that a list that
+    # replaces another never has the same version
+    versions = itertools.count()
+
+    def __init__(self, items, duplicates=None):
         """
 
         Parameters
         ----------
-        items: List[SerialisableMenuItem]
+        items: Iterable[SerialisableMenuItem]
             The items to put in this list
+        duplicates: str, optional
+            'replace' or 'error'. Defaults to None, meaning the class attribute
+
+        Raises
+        ------
+        MenuItemDuplicateError:
+            When items has duplicate names and duplicates is 'error'
         """
-        self.data = items
+        if duplicates is not None:
+            self.duplicates = duplicates
+        self.index = {}  # name: item, in order
+        self.version = next(self.versions)  # changes with each change of items
+        self.extend(items)
 
     @property
     def items(self):
-        """I find 'items' more descriptive then 'data'"""
-        return self.data
+        """All items, as a tuple. Changing this list does not change the tuple"""
+        return tuple(self.index.values())
+
+    @property
+    def data(self):
+        """All items, as a tuple. Assign to replace all items"""
+        return tuple(self.index.values())
+
+    @data.setter
+    def data(self, items):
+        previous, self.index = self.index, {}
+        try:
+            self.extend(items)
+        except MenuItemDuplicateError:
+            self.index = previous
+            self.version = next(self.versions)
+            raise
+
+    def get(self, name, default=None):
+        """The item with this name, or default if there is none"""
+        return self.index.get(name, default)
+
+    def names(self):
+        """Names of all items, in order"""
+        return list(self.index)
+
+    def append(self, item):
+        """Add item at the end. If an item with the same name is in the list
+        already, replace that in its position or raise, depending on duplicates
+
+        Raises
+        ------
+        MenuItemDuplicateError:
+            When the name is in the list already and duplicates is 'error'
+        """
+        self.check_duplicate(item)
+        self.index[item.name] = item
+        self.version = next(self.versions)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def remove(self, name):
+        """Remove and return the item with this name
+
+        Parameters
+        ----------
+        name: str or SerialisableMenuItem
+            Name of the item, or the item itself
+
+        Raises
+        ------
+        ValueError:
+            When there is no item with this name
+        """
+        if isinstance(name, YeahYeahMenuItem):
+            name = name.name
+        try:
+            item = self.index.pop(name)
+        except KeyError:
+            raise ValueError(f"No item with name '{name}' in list")
+        self.version = next(self.versions)
+        return item
+
+    def clear(self):
+        self.index.clear()
+        self.version = next(self.versions)
+
+    def __contains__(self, name):
+        """True if an item with this name, or this item, is in the list"""
+        if isinstance(name, YeahYeahMenuItem):
+            return self.index.get(name.name) is name
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.index.values())
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return type(self)(items=self.items[position])
+        return self.index[self.name_at(position)]
+
+    def __setitem__(self, position, item):
+        """Replace the item at position. An item with the same name is replaced
+        in place without touching the rest of the list
+        """
+        if isinstance(position, slice):
+            items = list(self.items)
+            items[position] = item
+            self.data = items
+            return
+        name = self.name_at(position)
+        if item.name == name:
+            self.index[name] = item
+            self.version = next(self.versions)
+        else:
+            self.check_duplicate(item)
+            del self[position]
+            self.insert(position % (len(self) + 1), item)
+
+    def __delitem__(self, position):
+        if isinstance(position, slice):
+            names = list(self.index)[position]
+        else:
+            names = [self.name_at(position)]
+        for name in names:
+            del self.index[name]
+        self.version = next(self.versions)
+
+    def insert(self, position, item):
+        """Add item at position. With duplicates 'replace', an item with the same
+        name is removed first
+        """
+        if position >= len(self.index):
+            return self.append(item)
+        self.check_duplicate(item)
+        tail = self.pop_from(position)
+        self.index.pop(item.name, None)
+        self.index[item.name] = item
+        self.index.update((x.name, x) for x in tail if x.name != item.name)
+        self.version = next(self.versions)
+
+    def name_at(self, position):
+        """Name of the item at position. Takes time proportional to position
+
+        Raises
+        ------
+        IndexError:
+            When there is no item at position
+        """
+        if position < 0:
+            position += len(self.index)
+        if not 0 <= position < len(self.index):
+            raise IndexError("MenuItemList index out of range")
+        return next(itertools.islice(self.index, position, None))
+
+    def pop_from(self, position):
+        """Remove and return all items from position to the end, so that items
+        can be put in before them without rebuilding the whole index
+        """
+        if position < 0:
+            position = max(position + len(self.index), 0)
+        names = list(itertools.islice(self.index, position, None))
+        return [self.index.pop(x) for x in names]
+
+    def check_duplicate(self, item):
+        """Raise if item's name is in the list already and duplicates is 'error'
+
+        Raises
+        ------
+        MenuItemDuplicateError
+        """
+        if item.name in self.index and self.duplicates == "error":
+            raise MenuItemDuplicateError(
+                f"Cannot add {item}. Name '{item.name}' is already used by "
+                f"{self.index[item.name]}"
+            )
+
+    def __add__(self, other):
+        return type(self)(items=self.items + tuple(other))
+
+    def __eq__(self, other):
+        if isinstance(other, MenuItemList):
+            return self.items == other.items
+        return list(self.items) == other
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self.items)!r})"
 
     def save(self, file):
         """Save list to file
@@ -111,15 +395,16 @@ class MenuItemList(collections.UserList):
             save to this file
 
         """
-        yaml.dump(self.to_dict(), file, default_flow_style=False)
+        yaml.dump(self.to_dict(), file, Dumper=YAML_DUMPER, default_flow_style=False)
 
     @classmethod
     def load(cls, file):
-        """Try to parse the given file's content into any of the classes in cls.item_classes.
+        """Parse the given file's content into items of the classes in cls.item_classes.
+        Parses one item at a time, see iter_load()
 
         Parameters
         ----------
-        file: open file handle
+        file: open file handle or str
 
         Returns
         -------
@@ -129,30 +414,196 @@ class MenuItemList(collections.UserList):
         Raises
         ------
         MenuItemLoadError:
-            When object loaded is not a list or when contents could not be parsed as any of the item_classes
+            When file is not a yaml dictionary or when an item could not be parsed as any of the item_classes
+
+
+        """
+        return cls(items=list(cls.iter_load(file)))
+
+    @classmethod
+    def iter_load(cls, file):
+        """Yield the items in file one at a time, without parsing the whole file
+        first. Only a single item is held in memory at any time
+
+        Parameters
+        ----------
+        file: open file handle or str
+
+        Returns
+        -------
+        Iterator[SerialisableMenuItem]
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When file is not a yaml dictionary or when an item could not be parsed as any of the item_classes
+        """
+        for name, values, line in iter_yaml_items(file):
+            yield cls.item_from_raw(name, values, line)
+
+    @classmethod
+    def find(cls, file, name):
+        """Load only the item with the given name. Stops reading file as soon as
+        it is found
+
+        Parameters
+        ----------
+        file: open file handle or str
+        name: str
+            Name of the item to find
+
+        Returns
+        -------
+        SerialisableMenuItem or None
+            The first item with this name, None if there is none
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When file is not a yaml dictionary or when the item could not be parsed as any of the item_classes
+        """
+        for key, values, line in iter_yaml_items(file):
+            if key == name:
+                return cls.item_from_raw(key, values, line)
+        return None
+
+    @classmethod
+    def load_cached(cls, path):
+        """Load from the yaml file at path. Keeps a binary copy of the parsed
+        contents next to it, so that unchanged files do not need to be parsed again
 
+        Parameters
+        ----------
+        path: Pathlike
+            Path to a yaml file as written by save()
+
+        Returns
+        -------
+        MenuItemList
+            List of items represented in file
 
+        Raises
+        ------
+        MenuItemLoadError:
+            When file is not a yaml dictionary or when an item could not be parsed as any of the item_classes
         """
+        return cls(items=[cls.item_from_raw(*raw) for raw in ParseCache(path).load()])
+
+    @classmethod
+    def from_loaded(cls, loaded):
+        """Create list from the parsed contents of a file written by save()
+
+        Parameters
+        ----------
+        loaded: object
+            Parsed yaml
 
-        loaded = yaml.load(file, Loader=yaml.loader.Loader)
+        Returns
+        -------
+        MenuItemList
 
+        Raises
+        ------
+        MenuItemLoadError:
+            When object loaded is not a dict or when an item could not be parsed as any of the item_classes
+        """
         if type(loaded) is not dict:
             msg = f"Expected to load a dictionary, but found {type(loaded)} instead"
             raise MenuItemLoadError(msg)
-        # flatten to list of dicts
-        item_list = []
-        for key, values in loaded.items():
-            item_as_dict = {key: values}
-            for item_class in cls.item_classes:
-                try:
-                    item_list.append(item_class.from_dict(item_as_dict))
-                except TypeError:
-                    MenuItemLoadError(
-                        f"Could not create any object from {item_as_dict}. "
-                        f"Tried {[str(x) for x in cls.item_classes]}.."
-                    )
+        return cls(items=[cls.item_from_raw(k, v) for k, v in loaded.items()])
+
+    @classmethod
+    def item_from_raw(cls, name, values, line=None):
+        """Create a single item from its name and parameters as saved. The item
+        class is the one in item_classes whose parameter_names match the keys
+        of values
+
+        Parameters
+        ----------
+        name: str
+        values: object
+            Parsed parameters of the item. Should be a dict
+        line: int, optional
+            Line number of the item in the file it was read from. For error
+            messages. Defaults to None
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When values do not match the parameters of any of the item_classes
+        """
+        location = f" at line {line}" if line is not None else ""
+        if type(values) is not dict:
+            raise MenuItemLoadError(
+                f"Expected parameters of item '{name}'{location} to be a "
+                f"dictionary, but found {type(values)} instead"
+            )
+        item_classes = cls.get_item_classes_by_parameters()
+        try:
+            item_class = item_classes[frozenset(values).difference(["text"])]
+        except KeyError:
+            expected = [sorted(x) for x in item_classes]
+            raise MenuItemLoadError(
+                f"Could not create any object from item '{name}'{location}. "
+                f"Parameters {sorted(values)} do not match any of {expected}"
+            )
+        return item_class.from_dict({name: dict(values)})
+
+    @classmethod
+    def get_item_classes_by_parameters(cls):
+        """Each of item_classes by the set of its parameter names"""
+        return {frozenset(x.parameter_names): x for x in cls.item_classes}
 
-        return cls(items=item_list)
+    def search(self, query):
+        """Items with all words in query in their name or help text, ignoring case
+
+        Returns
+        -------
+        MenuItemList
+        """
+        words = query.lower().split()
+        return type(self)(
+            items=[
+                x
+                for x in self
+                if all(w in f"{x.name} {x.help_text}".lower() for w in words)
+            ]
+        )
+
+    @staticmethod
+    def item_to_data(item):
+        """Serialise a single item, including its type
+
+        Parameters
+        ----------
+        item: SerialisableMenuItem
+            Item of one of the types in item_classes
+
+        Returns
+        -------
+        Dict
+            JSON-serialisable dict that item_from_data() can read
+        """
+        return {"type": type(item).__name__, "item": item.to_dict()}
+
+    @classmethod
+    def item_from_data(cls, data):
+        """Create a single item from the output of item_to_data()
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When the item type is not one of the item_classes
+        """
+        item_classes = {x.__name__: x for x in cls.item_classes}
+        try:
+            item_class = item_classes[data["type"]]
+        except KeyError:
+            raise MenuItemLoadError(
+                f"Could not create any object from {data}. "
+                f"Expected one of {list(item_classes)}"
+            )
+        return item_class.from_dict(data["item"])
 
     def to_dict(self):
         """As dict, as terse as possible:
@@ -166,12 +617,540 @@ class MenuItemList(collections.UserList):
         of dict renders quite well
         """
         result = {}
-        for item in self.data:
+        for item in self:
             pattern_dict = item.to_dict()
             result.update(pattern_dict)
 
         return result
 
 
-class MenuItemLoadError(Exception):
-    pass
+def is_plain_argument(value):
+    """True if click would never parse this command line value as an option"""
+    return not value.startswith("-")
+
+
+class MenuItemPluginMixin:
+    """Everything a yeahyeah plugin needs to hold a list of menu items that are
+    stored in a yaml config file: loading from storage, fragments and layers,
+    commands for each item, and admin commands to add, remove, import and
+    export items. Use as first base class, before YeahYeahPlugin.
+
+    Subclasses set list_class and value_field, and implement
+    assert_config_file() to write an example config file
+    """
+
+    list_class = MenuItemList  # MenuItemList subclass holding this plugin's items
+    value_field = None  # Name of the parameter given when adding an item
+    config_file_name = None  # Name of the config file in the settings folder
+
+    def __init__(self, item_list):
+        """
+
+        Parameters
+        ----------
+        item_list: MenuItemList
+            This plugin's own items, not those from fragments
+        """
+        self.item_list = item_list
+        self.fragment_list = self.list_class(items=[])
+        self.config_file_path = None
+        self.storage = None
+        self.fragments = None
+        self.usage_log = None
+
+    @classmethod
+    def init_from_file_path(cls, config_file_path, layer_paths=()):
+        """
+        Parameters
+        ----------
+        config_file_path: Pathlike
+            path to config file
+        layer_paths: List[Pathlike], optional
+            Folders of shared layers to load items from as well. Defaults to none
+
+        Returns
+        -------
+        MenuItemPluginMixin
+        """
+        config_file_path = Path(config_file_path)
+        cls.assert_config_file(config_file_path)
+        storage = cls.get_storage(config_file_path)
+
+        obj = cls(storage.load())
+        obj.config_file_path = config_file_path
+        obj.storage = storage
+        obj.fragments = cls.get_fragments(config_file_path, layer_paths)
+        obj.fragment_list = obj.fragments.load()
+        obj.usage_log = cls.get_usage_log(config_file_path.parent)
+        shell_export = obj.get_shell_export()
+        if shell_export.exists() and shell_export.is_outdated(*obj.get_config_files()):
+            shell_export.update(obj.get_all_items(), usage_log=obj.usage_log)
+        return obj
+
+    @classmethod
+    def get_config_file_path(cls, context):
+        """Path to this plugin's config file for the given YeahYeahContext"""
+        return Path(context.settings_path) / cls.config_file_name
+
+    @staticmethod
+    def assert_config_file(config_file_path):
+        """Make sure config file exists. If not, create an example config file"""
+        raise NotImplementedError()
+
+    @property
+    def item_description(self):
+        """What this plugin's items are called in messages, like 'url patterns'"""
+        return self.slug.replace("_", " ")
+
+    @classmethod
+    def get_usage_log(cls, settings_path):
+        """Log of launches of this plugin's items, in given settings folder"""
+        return UsageLog(Path(settings_path) / f"{cls.slug}_usage.log")
+
+    def get_shell_export(self):
+        """Shell functions file for this plugin's items, next to config file"""
+        return ShellFunctionExport(Path(self.config_file_path).with_suffix(".sh"))
+
+    @classmethod
+    def get_storage(cls, config_file_path, backend=None):
+        """Where items are stored: the yaml config file with a journal of
+        changes, or a SQLite database next to it, if that exists. The config
+        file can be edited by hand either way
+
+        Parameters
+        ----------
+        config_file_path: Path
+            Path to yaml config file
+        backend: str, optional
+            'yaml' or 'sqlite'. Defaults to None, meaning sqlite if the
+            database exists
+
+        Returns
+        -------
+        MenuItemJournal or SQLiteMenuItemStore
+        """
+        database_path = config_file_path.with_suffix(".sqlite")
+        if backend == "sqlite" or (backend is None and database_path.exists()):
+            from yeahyeah.store import SQLiteMenuItemStore  # imports sqlite3
+
+            return SQLiteMenuItemStore(database_path, config_file_path, cls.list_class)
+        return MenuItemJournal(config_file_path, cls.list_class)
+
+    @classmethod
+    def get_fragments(cls, config_file_path, layer_paths=()):
+        """Extra read-only item files: catalogs in shared layers, then fragments
+        next to the config file, like url_patterns.d/*.yaml. Each layer folder
+        can hold a catalog file with the config file's name, and fragments
+
+        Parameters
+        ----------
+        config_file_path: Path
+            Path to yaml config file
+        layer_paths: List[Pathlike], optional
+            Folders of shared layers, lowest precedence first. Defaults to none
+        """
+        config_file_path = Path(config_file_path)
+        paths = []
+        for folder in layer_paths:
+            layer_file = Path(folder) / config_file_path.name
+            paths += [layer_file, layer_file.with_suffix(".d")]
+        paths.append(config_file_path.with_suffix(".d"))
+        return MenuItemFragments(paths, cls.list_class)
+
+    def get_all_items(self):
+        """Items from fragments, then this plugin's own items. Own items come last,
+        so that their commands replace fragment items with the same name
+
+        Returns
+        -------
+        MenuItemList
+        """
+        return self.list_class(items=self.fragment_list.items + self.item_list.items)
+
+    def save(self):
+        """Save current items to disk if possible"""
+        if self.storage:
+            self.storage.save(self.item_list)
+            self.get_shell_export().update(
+                self.get_all_items(), usage_log=self.usage_log
+            )
+
+    def lock(self):
+        """Lock config file for a read-modify-write change. Call reload() first
+        thing within the lock
+        """
+        if not self.config_file_path:
+            return contextlib.nullcontext()
+        return file_lock(self.config_file_path)
+
+    def reload(self):
+        """Load items again if another process changed them since loading"""
+        if self.storage and self.storage.is_changed():
+            self.item_list = self.storage.load()
+        if self.fragments and self.fragments.is_changed():
+            self.fragment_list = self.fragments.load()
+
+    def save_change(self, added=(), removed=()):
+        """Save added items and names of removed items. Appends to the journal
+        or changes single database rows, instead of rewriting the config file
+
+        Parameters
+        ----------
+        added: List[SerialisableMenuItem], optional
+            Items that were added to the list. Defaults to none
+        removed: List[str], optional
+            Names of items that were removed from the list. Defaults to none
+        """
+        if not self.storage:
+            return self.save()
+        self.storage.record(added=added, removed=removed)
+        if self.storage.needs_compaction():
+            self.save()
+        else:
+            self.get_shell_export().update(
+                self.get_all_items(), usage_log=self.usage_log
+            )
+
+    def get_commands(self):
+        """
+
+        Returns
+        -------
+        List[click.Command]
+        """
+        return [
+            self.item_to_command(item, self.usage_log) for item in self.get_all_items()
+        ]
+
+    def get_command_group(self):
+        """Commands for all items, created only when asked for by name
+
+        Returns
+        -------
+        PluginCommandGroup
+        """
+        return PluginCommandGroup(
+            name=self.slug,
+            list_names=self.get_item_names,
+            make_command=self.get_command,
+            get_version=self.get_items_version,
+            describe_command=self.describe_command,
+        )
+
+    def get_item_names(self):
+        """Names of all items, from fragments and this plugin's own, without
+        creating a combined list
+        """
+        return list(dict.fromkeys(self.fragment_list.names() + self.item_list.names()))
+
+    def get_items_version(self):
+        """Changes whenever items are added, removed or loaded again"""
+        return self.fragment_list.version, self.item_list.version
+
+    def get_item(self, name):
+        """The item with this name. Own items take precedence over those from
+        fragments
+
+        Returns
+        -------
+        YeahYeahMenuItem or None
+        """
+        item = self.item_list.get(name)
+        return self.fragment_list.get(name) if item is None else item
+
+    def get_command(self, name):
+        """Click command for the item with this name
+
+        Returns
+        -------
+        click.Command or None
+        """
+        item = self.get_item(name)
+        if item is None:
+            return None
+        return self.item_to_command(item, self.usage_log)
+
+    def describe_command(self, name):
+        """Description of the command for the item with this name, as
+        command_description() would give it, without creating the command
+
+        Returns
+        -------
+        Dict or None
+        """
+        item = self.get_item(name)
+        if item is None:
+            return None
+        return {
+            "help": f"{item.help_text} ({self.short_slug})",
+            "short_help": None,
+            "is_group": False,
+            "hidden": False,
+            "params": item.get_param_signatures(),
+        }
+
+    @classmethod
+    def item_to_command(cls, item, usage_log=None):
+        """Click command for a single item, marked with this plugin's short slug
+
+        Parameters
+        ----------
+        item: YeahYeahMenuItem
+        usage_log: UsageLog, optional
+            Record each launch of the command here. Defaults to None
+
+        Returns
+        -------
+        click.Command
+        """
+        command = item.to_click_command()
+        command.help += f" ({cls.short_slug})"
+        if usage_log:
+            record_usage(command, usage_log, item.name)
+        return command
+
+    def get_config_files(self):
+        files = self.storage.files() if self.storage else []
+        return files + (self.fragments.files() if self.fragments else [])
+
+    def get_command_data(self):
+        return {x.name: self.list_class.item_to_data(x) for x in self.get_all_items()}
+
+    @classmethod
+    def command_from_data(cls, context, data):
+        return cls.item_to_command(
+            cls.list_class.item_from_data(data),
+            cls.get_usage_log(context.settings_path),
+        )
+
+    @classmethod
+    def command_from_name(cls, context, command_name):
+        """Looks the item up in storage by name, without loading all items. Only
+        possible if no fragments or layers could hold an item with this name
+        """
+        config_file_path = cls.get_config_file_path(context)
+        if not config_file_path.exists():
+            return False, None
+        fragments = cls.get_fragments(config_file_path, context.layer_paths)
+        storage = cls.get_storage(config_file_path)
+        if fragments.fragment_paths():
+            return False, None
+        item = storage.find(command_name)
+        if item is None:
+            return True, None
+        return True, cls.item_to_command(item, cls.get_usage_log(context.settings_path))
+
+    @classmethod
+    def launch_from_data(cls, context, data, args):
+        item = cls.list_class.item_from_data(data)
+        kwargs = item.parse_plain_args(args)
+        if kwargs is None:
+            return False
+        cls.get_usage_log(context.settings_path).record(item.name)
+        item.launch(**kwargs)
+        return True
+
+    def get_admin_commands(self):
+        """
+
+        Returns
+        -------
+        List[click.Command]
+            list of click commands that can be used to admin this plugin
+
+        """
+        return [
+            self.get_status_command(),
+            self.get_list_command(),
+            self.get_edit_command(),
+            self.get_storage_command(),
+            self.get_import_command(),
+            self.get_add_command(),
+            self.get_remove_command(),
+            self.get_export_shell_command(),
+        ]
+
+    def get_status_command(self):
+        """Command to print some info for this plugin"""
+
+        @click.command()
+        def status():
+            """Print some info for this plugin"""
+            status_str = (
+                f"{type(self).__name__}:\n"
+                f"{len(self.get_item_names())} {self.item_description} in plugin\n"
+            )
+            if self.config_file_path:
+                status_str += f"Config file: {self.config_file_path}"
+            click.echo(status_str)
+
+        return status
+
+    def get_list_command(self):
+        """Command to list or search items"""
+
+        @click.command()
+        @click.argument("query", required=False)
+        def list(query):
+            """List all items, or only those with all words in QUERY"""
+            items = self.get_all_items()
+            if query:
+                items = self.fragment_list.search(query) + (
+                    self.storage or self.item_list
+                ).search(query)
+            click.echo("\n".join([str(x) for x in items]))
+
+        return list
+
+    def get_edit_command(self):
+        """Command to open the config file in an editor"""
+
+        @click.command()
+        def edit():
+            """Open settings file in editor"""
+            if self.storage:
+                with self.lock():
+                    self.reload()
+                    self.storage.export(self.item_list)  # show all changes
+            click.echo(f"Opening config file at '{self.config_file_path}'")
+            click.launch(str(self.config_file_path))
+
+        return edit
+
+    def get_storage_command(self):
+        """Command to switch between yaml and SQLite storage"""
+
+        @click.command()
+        @click.argument("backend", type=click.Choice(["yaml", "sqlite"]))
+        def storage(backend):
+            """Store items in yaml, or in SQLite for very many items"""
+            with self.lock():
+                self.reload()
+                self.storage.export(self.item_list)
+                previous, self.storage = self.storage, self.get_storage(
+                    self.config_file_path, backend
+                )
+                self.storage.save(self.item_list)
+                self.storage.export(self.item_list)
+                database_path = self.config_file_path.with_suffix(".sqlite")
+                if backend == "yaml" and database_path.exists():
+                    previous.close()
+                    database_path.unlink()
+            click.echo(
+                f"Stored {len(self.item_list)} {self.item_description} in {backend}"
+            )
+
+        return storage
+
+    def get_import_command(self):
+        """Command to add many items from a file at once"""
+        from yeahyeah.importing import FORMATS, plan_import  # imports this module
+
+        @click.command(name="import")
+        @click.argument("file", type=click.Path(exists=True, dir_okay=False))
+        @click.option(
+            "--format",
+            "file_format",
+            type=click.Choice(sorted(set(FORMATS.values()))),
+            help="Format of FILE. Defaults to guessing from its extension",
+        )
+        @click.option(
+            "--replace", is_flag=True, help="Replace existing items with same keyword"
+        )
+        @click.option("--dry-run", is_flag=True, help="Only report what would change")
+        def import_items(file, file_format, replace, dry_run):
+            """Add many items from FILE: csv, jsonl, yaml or bookmarks html
+
+            Items already present are skipped. Saves once, after reading all of FILE
+            """
+            with self.lock(), click.progressbar(
+                length=os.path.getsize(file), label="Reading", file=sys.stderr
+            ) as bar:
+                self.reload()
+                try:
+                    plan = plan_import(
+                        file,
+                        self.list_class,
+                        self.item_list,
+                        value_field=self.value_field,
+                        file_format=file_format,
+                        replace=replace,
+                        progress=lambda done, _: bar.update(done - bar.pos),
+                    )
+                except MenuItemLoadError as e:
+                    raise click.ClickException(str(e))
+                if plan.has_changes() and not dry_run:
+                    added, removed = plan.apply(self.item_list)
+                    self.save_change(added=added, removed=removed)
+            for message in plan.conflicts + plan.errors:
+                click.echo(message)
+            click.echo(plan.summary(dry_run=dry_run))
+
+        return import_items
+
+    def get_add_command(self):
+        """Command to add a single item"""
+
+        @click.command()
+        @click.argument("keyword")
+        @click.argument("value", metavar=self.value_field.upper())
+        def add(keyword, value):
+            """Add a new item"""
+            item = self.list_class.item_from_raw(keyword, {self.value_field: value})
+            click.echo(f"Adding {item}")
+            with self.lock():
+                self.reload()
+                self.item_list.append(item)
+                self.save_change(added=[item])
+
+        return add
+
+    def get_remove_command(self):
+        """Command to remove a single item by name"""
+
+        @click.command()
+        @click.argument("keyword")
+        def remove(keyword):
+            """Remove an existing item"""
+            with self.lock():
+                self.reload()
+                if keyword not in self.item_list:
+                    click.echo(f"Item with keyword {keyword} not found")
+                else:
+                    click.echo(f"Removing {self.item_list.remove(keyword)}")
+                    self.save_change(removed=[keyword])
+
+        return remove
+
+    def get_export_shell_command(self):
+        """Command to write items as shell functions"""
+
+        @click.command(name="export-shell")
+        @click.option(
+            "--top", type=int, help="Only export this many most frecently used"
+        )
+        @click.option(
+            "--prefix",
+            default="",
+            help="Prepend this to function names. Items named like a shell builtin "
+            "are only exported with a prefix",
+        )
+        def export_shell(top, prefix):
+            """Write items as shell functions that launch without starting python"""
+            shell_export = self.get_shell_export()
+            exported, skipped = shell_export.write(
+                self.get_all_items(),
+                usage_log=self.usage_log,
+                top=top,
+                prefix=prefix,
+            )
+            for message in skipped:
+                click.echo(f"Skipping {message}")
+            click.echo(
+                f"Exported {len(exported)} {self.item_description} to "
+                f"{shell_export.path}. It is kept up to date on changes. To use, "
+                f"add this to your shell startup file:\n\n"
+                f"    source {shell_export.path}"
+            )
+
+        return export_shell
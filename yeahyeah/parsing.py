@@ -0,0 +1,214 @@
+"""Reading menu item yaml files one item at a time. Parses by walking yaml
+parser events instead of loading the whole document, so that large catalogs
+never need to be held in memory as a single dictionary
+"""
+import yaml
+
+from yeahyeah.exceptions import MenuItemLoadError
+
+# libyaml is much faster than pure python yaml, but not always installed
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+def iter_yaml_items(file):
+    """Parse a yaml dictionary of menu items one item at a time, by walking
+    parser events. Only a single item is held in memory at any time. Safe:
+    only standard yaml tags are allowed and nothing is ever executed
+
+    Parameters
+    ----------
+    file: open file handle or str
+
+    Returns
+    -------
+    Iterator[Tuple[object, object, int]]
+        Name, parsed parameters and line number of each item, in file order
+
+    Raises
+    ------
+    MenuItemLoadError
+        When file is not valid yaml or not a dictionary
+    """
+    events = yaml.parse(file, Loader=YAML_LOADER)
+    try:
+        next(events)  # stream start
+        event = next(events)
+        if isinstance(event, yaml.StreamEndEvent):
+            raise MenuItemLoadError("Expected to load a dictionary, but file is empty")
+        event = next(events)  # document start is followed by the root node
+        if not isinstance(event, yaml.MappingStartEvent):
+            raise MenuItemLoadError(
+                f"Expected to load a dictionary, but found {event_type_name(event)} "
+                f"instead at line {event.start_mark.line + 1}"
+            )
+        constructor = YamlEventConstructor(events)
+        for event in events:
+            if isinstance(event, yaml.MappingEndEvent):
+                break
+            name = constructor.construct(event)
+            values = constructor.construct(next(events))
+            yield name, values, event_line(event)
+    except yaml.MarkedYAMLError as e:
+        mark = e.problem_mark or e.context_mark
+        location = f" at line {mark.line + 1}" if mark else ""
+        raise MenuItemLoadError(f"Could not parse yaml{location}: {e.problem}")
+    except yaml.YAMLError as e:
+        raise MenuItemLoadError(f"Could not parse yaml: {e}")
+
+
+# Constructors for the tags that menu item files can contain
+YAML_SCALAR_CONSTRUCTORS = {
+    tag: yaml.constructor.SafeConstructor.yaml_constructors[tag]
+    for tag in (
+        f"tag:yaml.org,2002:{x}"
+        for x in ("null", "bool", "int", "float", "str", "timestamp", "binary")
+    )
+}
+YAML_RESOLVER = yaml.resolver.Resolver()
+YAML_CONSTRUCTOR = yaml.constructor.SafeConstructor()
+
+
+class YamlEventConstructor:
+    """Builds python objects from the parser events of a single yaml document.
+    Remembers anchored values, so that later aliases and merge keys ('<<')
+    in the same document can refer to them
+    """
+
+    def __init__(self, events):
+        """
+
+        Parameters
+        ----------
+        events: Iterator[yaml.Event]
+            Parser events of the document
+        """
+        self.events = events
+        self.anchors = {}
+
+    def construct(self, event):
+        """Python object for the yaml node starting with event, consuming the
+        remaining events of that node
+
+        Parameters
+        ----------
+        event: yaml.Event
+            First event of the node
+
+        Raises
+        ------
+        MenuItemLoadError
+            For unknown aliases and tags that are not standard yaml scalars
+        """
+        if isinstance(event, yaml.ScalarEvent):
+            return self.anchor(event, self.construct_scalar(event))
+        if isinstance(event, yaml.AliasEvent):
+            return self.construct_alias(event)
+        if isinstance(event, yaml.MappingStartEvent):
+            return self.construct_mapping(event, self.anchor(event, {}))
+        if isinstance(event, yaml.SequenceStartEvent):
+            return self.construct_sequence(self.anchor(event, []))
+        raise MenuItemLoadError(
+            f"Unexpected {event_type_name(event)} at line {event_line(event)}"
+        )
+
+    def anchor(self, event, value):
+        """Remember value if event has an anchor. Returns value"""
+        if event.anchor is not None:
+            self.anchors[event.anchor] = value
+        return value
+
+    @staticmethod
+    def construct_scalar(event):
+        tag = scalar_tag(event)
+        if tag == yaml.resolver.BaseResolver.DEFAULT_SCALAR_TAG:
+            return event.value  # by far the most common case
+        try:
+            constructor = YAML_SCALAR_CONSTRUCTORS[tag]
+        except KeyError:
+            raise MenuItemLoadError(
+                f"Unsupported yaml tag {tag} at line {event_line(event)}"
+            )
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark)
+        return constructor(YAML_CONSTRUCTOR, node)
+
+    def construct_alias(self, event):
+        try:
+            return self.anchors[event.anchor]
+        except KeyError:
+            raise MenuItemLoadError(
+                f"Unknown yaml alias *{event.anchor} at line {event_line(event)}"
+            )
+
+    def construct_mapping(self, event, result):
+        """Fill result with the mapping's items. Keys given explicitly take
+        precedence over merged ones, like yaml.safe_load does
+        """
+        merged = {}
+        for key_event in self.events:
+            if isinstance(key_event, yaml.MappingEndEvent):
+                break
+            if is_merge_key(key_event):
+                for key, value in self.construct_merged(next(self.events)).items():
+                    merged.setdefault(key, value)
+            else:
+                key = self.construct(key_event)
+                result[key] = self.construct(next(self.events))
+        if merged:
+            explicit = dict(result)
+            result.clear()
+            result.update(merged)
+            result.update(explicit)
+        return result
+
+    def construct_merged(self, event):
+        """Dictionary to merge from value of a merge key. Earlier mappings in a
+        list of mappings take precedence
+        """
+        value = self.construct(event)
+        mappings = value if isinstance(value, list) else [value]
+        if not all(isinstance(x, dict) for x in mappings):
+            raise MenuItemLoadError(
+                f"Expected a dictionary or list of dictionaries to merge at line "
+                f"{event_line(event)}"
+            )
+        merged = {}
+        for mapping in mappings:
+            for key, value in mapping.items():
+                merged.setdefault(key, value)
+        return merged
+
+    def construct_sequence(self, result):
+        for item_event in self.events:
+            if isinstance(item_event, yaml.SequenceEndEvent):
+                return result
+            result.append(self.construct(item_event))
+
+
+def scalar_tag(event):
+    """Explicit tag of scalar event, or the tag yaml resolves its value to"""
+    if event.tag in (None, "!"):
+        return YAML_RESOLVER.resolve(yaml.ScalarNode, event.value, event.implicit)
+    return event.tag
+
+
+def is_merge_key(event):
+    """True if event is the merge key '<<' of a mapping"""
+    return (
+        isinstance(event, yaml.ScalarEvent)
+        and scalar_tag(event) == "tag:yaml.org,2002:merge"
+    )
+
+
+def event_line(event):
+    """Line number in the yaml file where event starts, counting from 1"""
+    return event.start_mark.line + 1
+
+
+def event_type_name(event):
+    """Human readable type of yaml node starting with event"""
+    return {
+        yaml.ScalarEvent: "a single value",
+        yaml.SequenceStartEvent: "a list",
+        yaml.MappingStartEvent: "a dictionary",
+    }.get(type(event), type(event).__name__)
@@ -1,49 +1,93 @@
 """Saving and loading things. Raising useful exceptions"""
+import functools
+import importlib.util
 import json
+import os
+import stat
+from contextlib import contextmanager
+from pathlib import Path
 from typing import Dict
 
 from yeahyeah.exceptions import YeahYeahException
 
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+    import msvcrt
+
 
 class SettingsFile:
-    """Base class for a context file that can be loaded and saved"""
+    """Base class for a context file that can be loaded and saved. Data is
+    serialised with a codec: the one given by name, or else the first available
+    codec for the file's extension, or else default_codec. See register_codec()
+    """
+
+    default_codec = "json"
 
-    def __init__(self, path):
+    def __init__(self, path, codec=None):
         """
         Parameters
         ----------
         path: Pathlike
             full path to file
+        codec: str, optional
+            Name of a registered codec to use. Defaults to None, meaning
+            choose by file extension
         """
 
         self.path = path
+        self.codec_name = codec
 
-    def save(self, data):
-        """Save given data to file
+    @property
+    def codec(self):
+        if self.codec_name:
+            return get_codec(self.codec_name)
+        return codec_for_path(self.path, default=self.default_codec)
+
+    def save(self, dict_in: Dict):
+        """Save given data to file. Does not write if the file already has
+        exactly this content, so that its modification time does not change
+
+        Parameters
+        ----------
+        dict_in:
+            The data to save
 
         Raises
         ------
         YeahYeahPersistenceException
             If saving does not work
 
-        """
-        raise NotImplementedError()
+        Returns
+        -------
+        bool:
+            True if the file was written, False if it was already up to date
 
-    def load(self):
         """
-        Raises
-        ------
-        FileNotFoundError
-            If rel_path does not exist
-        YeahYeahPersistenceException
-            If loading does not work
+        try:
+            content = self.codec.dumps(dict_in)
+        except TypeError as e:
+            raise YeahYeahPersistenceException(
+                f"Error trying to save dict {dict_in} to {self.path}: {e}"
+            )
+        if self.has_content(content):
+            return False
+        with atomic_write(self.path, mode="wb") as f:
+            f.write(content)
+        return True
 
+    def has_content(self, content):
+        """True if this file holds exactly content. Only reads the file if its
+        size matches
         """
-        raise NotImplementedError()
-
-
-class JSONSettingsFile(SettingsFile):
-    """A JSON-encoded file"""
+        try:
+            if os.stat(self.path).st_size != len(content):
+                return False
+            with open(self.path, "rb") as f:
+                return f.read() == content
+        except OSError:
+            return False
 
     def load(self):
         """
@@ -57,46 +101,271 @@ class JSONSettingsFile(SettingsFile):
         Returns
         -------
         dict:
-            The loaded json
+            The loaded data
 
         """
-        with open(self.path, "r") as f:
+        with open(self.path, "rb") as f:
             try:
-                return json.loads(f.read())
-            except json.decoder.JSONDecodeError as e:
+                return self.codec.load(f)
+            except ValueError as e:
                 raise YeahYeahPersistenceException(
                     f"Error trying to decode contents of {self.path}: {e}"
                 )
 
-    def save(self, dict_in: Dict):
+    def exists(self):
+        return self.path.exists()
+
+    def lock(self):
+        """Lock this file for a read-modify-write change. See file_lock()"""
+        return file_lock(self.path)
+
+
+class JSONSettingsFile(SettingsFile):
+    """A JSON-encoded file"""
+
+    default_codec = "json"
+
+
+class Codec:
+    """Serialises data to bytes and back. Subclass and add with register_codec()
+    to support other formats
+    """
+
+    name = None
+    extensions = ()  # file extensions, like '.json'. For choosing by extension
+    module = None  # module that needs to be installed, if any
+
+    def is_available(self):
+        """True if this codec's module is installed. Does not import it"""
+        return self.module is None or importlib.util.find_spec(self.module) is not None
+
+    def dumps(self, data):
+        """Serialise data
+
+        Returns
+        -------
+        bytes
+
+        Raises
+        ------
+        TypeError
+            If data cannot be serialised
         """
+        raise NotImplementedError()
+
+    def load(self, f):
+        """Deserialise, reading from f as needed
 
         Parameters
         ----------
-        dict_in:
-            The data to save
+        f: file opened in binary mode
 
         Raises
         ------
-        YeahYeahPersistenceException
-            If saving does not work
+        ValueError
+            If contents cannot be deserialised
+        """
+        raise NotImplementedError()
 
-        Returns
-        -------
-        dict:
-            The data to save in json format
 
-        """
-        with open(self.path, "w") as f:
+class JSONCodec(Codec):
+    name = "json"
+    extensions = (".json",)
+
+    def dumps(self, data):
+        return json.dumps(data).encode()
+
+    def load(self, f):
+        return json.load(f)
+
+
+class OrjsonCodec(Codec):
+    """JSON with orjson, which is several times faster than the json module.
+    Output is compact and can be read by the json module and vice versa
+    """
+
+    name = "orjson"
+    extensions = (".json",)
+    module = "orjson"
+
+    def dumps(self, data):
+        import orjson
+
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def load(self, f):
+        import orjson
+
+        return orjson.loads(f.read())  # orjson cannot read from a stream
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    extensions = (".msgpack", ".mpk")
+    module = "msgpack"
+
+    def dumps(self, data):
+        import msgpack
+
+        return msgpack.packb(data, use_bin_type=True)
+
+    def load(self, f):
+        import msgpack
+
+        try:
+            return msgpack.unpack(f, raw=False, strict_map_key=False)
+        except msgpack.UnpackException as e:
+            raise ValueError(e)
+
+
+CODECS = {}  # name: Codec, in order of preference
+
+
+def register_codec(codec):
+    """Make codec available to settings files, by name and by extension. For
+    an extension, earlier registered codecs are preferred
+
+    Parameters
+    ----------
+    codec: Codec
+    """
+    CODECS[codec.name] = codec
+    codec_for_extension.cache_clear()
+
+
+def get_codec(name):
+    """
+    Raises
+    ------
+    YeahYeahPersistenceException
+        If there is no such codec or its module is not installed
+    """
+    try:
+        codec = CODECS[name]
+    except KeyError:
+        raise YeahYeahPersistenceException(
+            f"Unknown codec '{name}'. Expected one of {list(CODECS)}"
+        )
+    if not codec.is_available():
+        raise YeahYeahPersistenceException(
+            f"Codec '{name}' requires '{codec.module}', which is not installed"
+        )
+    return codec
+
+
+@functools.lru_cache()
+def codec_for_extension(extension, default):
+    """First available codec for extension, or else codec with name default"""
+    for codec in CODECS.values():
+        if extension in codec.extensions and codec.is_available():
+            return codec
+    return get_codec(default)
+
+
+def codec_for_path(path, default="json"):
+    return codec_for_extension(Path(path).suffix.lower(), default)
+
+
+register_codec(OrjsonCodec())  # preferred for .json when installed
+register_codec(JSONCodec())
+register_codec(MsgpackCodec())
+
+
+def fingerprint(path):
+    """Modification time and size of the file at path
+
+    Returns
+    -------
+    List[int] or None
+        [mtime in nanoseconds, size in bytes], or None if file does not exist
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat_result.st_mtime_ns, stat_result.st_size]
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """Open a temporary file next to path for writing, and replace path with it
+    when the block finishes without errors. Readers of path never see a
+    partially written file, so they do not need to lock
+
+    Parameters
+    ----------
+    path: Pathlike
+        File to write
+    mode: str, optional
+        "w" for text or "wb" for binary. Defaults to "w"
+
+    Returns
+    -------
+    ContextManager[IO]
+        Open file handle to write to
+    """
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{os.urandom(4).hex()}.tmp")
+    try:
+        with open(temp_path, mode.replace("w", "x")) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass  # new file, keep permissions from umask
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """Hold an exclusive advisory lock on path while in this block. Waits for
+    other processes holding the lock. Not reentrant: do not lock the same path
+    again within the block
+
+    The lock is taken on a separate '.<name>.lock' file next to path, because
+    atomic_write() replaces path itself
+
+    Parameters
+    ----------
+    path: Pathlike
+        File to lock. Does not need to exist
+    blocking: bool, optional
+        If False, do not wait for the lock but raise BlockingIOError when it is
+        held. Defaults to True
+
+    Raises
+    ------
+    BlockingIOError
+        If blocking is False and the lock is held by someone else
+    """
+    path = Path(path)
+    with open(path.with_name(f".{path.name}.lock"), "a") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        else:
             try:
-                f.write(json.dumps(dict_in))
-            except TypeError as e:
-                raise YeahYeahPersistenceException(
-                    f"Error trying to save dict {dict_in} to {self.path}: {e}"
+                msvcrt.locking(
+                    f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1
                 )
-
-    def exists(self):
-        return self.path.exists()
+            except OSError as e:
+                if blocking:
+                    raise
+                raise BlockingIOError(str(e)) from e
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 class YeahYeahPersistenceException(YeahYeahException):
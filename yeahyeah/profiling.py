@@ -0,0 +1,279 @@
+"""Where does the time go when yeahyeah starts? Runs a cold start in a fresh
+interpreter with '-X importtime' and times each phase: importing yeahyeah,
+reading settings and, for each plugin, importing, initialising and registering
+commands. Each import is attributed to the phase it happened in, so a slow
+plugin can be pinpointed.
+
+Only imports standard library modules at module level. The profiled interpreter
+runs this module as a script, and should import yeahyeah itself during the
+phases only.
+"""
+import json
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+from yeahyeah.exceptions import YeahYeahException
+
+PHASE_MARKER = "yeahyeah-profile-phase: "  # separates phases in importtime output
+
+
+class StartupProfile:
+    """Duration of each startup phase, and self and cumulative time of each
+    import during startup
+    """
+
+    def __init__(self, phases, imports):
+        """
+
+        Parameters
+        ----------
+        phases: List[Dict]
+            {'name': phase name, 'plugin': plugin import path or None,
+            'seconds': duration} for each phase, in order
+        imports: List[Dict]
+            {'module': module name, 'self_us': int, 'cumulative_us': int,
+            'phase': phase name, 'plugin': plugin import path or None} for each
+            imported module, in import order
+        """
+        self.phases = phases
+        self.imports = imports
+
+    def top_imports(self, top):
+        """The top imports by self time, slowest first"""
+        return sorted(self.imports, key=lambda x: -x["self_us"])[:top]
+
+    def to_dict(self, top=None):
+        """
+
+        Parameters
+        ----------
+        top: int, optional
+            Only include this many imports, by self time. Defaults to None,
+            meaning all imports in import order
+        """
+        imports = self.imports if top is None else self.top_imports(top)
+        return {"phases": self.phases, "imports": imports}
+
+    def to_table(self, top=15):
+        """Human-readable tables of phases and slowest imports
+
+        Parameters
+        ----------
+        top: int, optional
+            Number of imports to show. Defaults to 15
+
+        Returns
+        -------
+        str
+        """
+        lines = [f"{'phase':<30}{'plugin':<25}{'ms':>10}"]
+        for phase in self.phases:
+            lines.append(
+                f"{phase['name']:<30}{short_name(phase['plugin']):<25}"
+                f"{phase['seconds'] * 1000:>10.1f}"
+            )
+        total = sum(x["seconds"] for x in self.phases)
+        lines.append(f"{'total':<55}{total * 1000:>10.1f}")
+
+        lines += [
+            "",
+            f"{'slowest imports':<40}{'self ms':>10}{'cumul. ms':>10}  during",
+        ]
+        for imported in self.top_imports(top):
+            during = imported["phase"]
+            if imported["plugin"]:
+                during += f" {short_name(imported['plugin'])}"
+            lines.append(
+                f"{imported['module']:<40}{imported['self_us'] / 1000:>10.1f}"
+                f"{imported['cumulative_us'] / 1000:>10.1f}  {during}"
+            )
+        return "\n".join(lines)
+
+
+def short_name(plugin_path):
+    """Class name of plugin import path, or empty string for None"""
+    return plugin_path.rsplit(".", 1)[-1] if plugin_path else ""
+
+
+def profile_startup(configuration_path):
+    """Profile a cold yeahyeah start in a fresh interpreter
+
+    Parameters
+    ----------
+    configuration_path: Pathlike
+        Configuration folder to start yeahyeah with
+
+    Returns
+    -------
+    StartupProfile
+
+    Raises
+    ------
+    YeahYeahProfilingException
+        If the profiled interpreter fails
+    """
+    started = time.time()
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-m",
+            "yeahyeah.profiling",
+            str(configuration_path),
+            repr(started),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        error = "\n".join(
+            x
+            for x in result.stderr.splitlines()
+            if not x.startswith(("import time:", PHASE_MARKER))
+        )
+        raise YeahYeahProfilingException(f"Profiling yeahyeah startup failed:\n{error}")
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return StartupProfile(phases=phases, imports=parse_importtime(result.stderr))
+
+
+def parse_importtime(stderr):
+    """Parse '-X importtime' output, attributing each import to the phase that
+    was last announced with a PHASE_MARKER line
+
+    Parameters
+    ----------
+    stderr: str
+        stderr of the profiled interpreter
+
+    Returns
+    -------
+    List[Dict]
+        As StartupProfile.imports
+    """
+    phase, plugin = "interpreter start", None
+    imports = []
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            phase, plugin = json.loads(line[len(PHASE_MARKER) :])
+        elif line.startswith("import time:"):
+            fields = line[len("import time:") :].split("|")
+            if len(fields) != 3 or not fields[0].strip().isdigit():
+                continue  # header line
+            imports.append(
+                {
+                    "module": fields[2].strip(),
+                    "self_us": int(fields[0]),
+                    "cumulative_us": int(fields[1]),
+                    "phase": phase,
+                    "plugin": plugin,
+                }
+            )
+    return imports
+
+
+class PhaseTimer:
+    """Times phases in the profiled interpreter"""
+
+    def __init__(self):
+        self.phases = []
+        self.running = []  # (name, plugin) of phases in progress, innermost last
+
+    def add(self, name, seconds, plugin=None):
+        self.phases.append({"name": name, "plugin": plugin, "seconds": seconds})
+
+    @contextmanager
+    def phase(self, name, plugin=None):
+        """Time the code in this block as a phase. Imports during the block are
+        attributed to this phase. Phases can be nested
+        """
+        self.running.append((name, plugin))
+        announce_phase(name, plugin)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, plugin=plugin)
+            self.running.pop()
+            if self.running:
+                announce_phase(*self.running[-1])
+
+    @contextmanager
+    def timed_method(self, obj, method_name, plugin):
+        """Time each call of obj.method_name() in this block as a separate phase"""
+        method = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            with self.phase(method_name, plugin=plugin):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, timed)
+        try:
+            yield
+        finally:
+            delattr(obj, method_name)
+
+
+def announce_phase(name, plugin):
+    """Mark the start of a phase in the importtime output on stderr"""
+    print(PHASE_MARKER + json.dumps([name, plugin]), file=sys.stderr, flush=True)
+
+
+def run_phases(configuration_path, started):
+    """Go through all phases of a yeahyeah start, loading all plugins
+
+    Parameters
+    ----------
+    configuration_path: Pathlike
+        Configuration folder to start yeahyeah with
+    started: float
+        time.time() just before this interpreter was started
+
+    Returns
+    -------
+    List[Dict]
+        As StartupProfile.phases
+    """
+    timer = PhaseTimer()
+    timer.add("interpreter start", time.time() - started)
+    with timer.phase("import yeahyeah.core"):
+        from pathlib import Path
+
+        from yeahyeah.core import YeahYeah, import_class
+
+    with timer.phase("create YeahYeah"):
+        jj = YeahYeah(configuration_path=Path(configuration_path))
+    with timer.phase("get_settings"):
+        settings = jj.get_settings()
+    with timer.phase("load command index"):
+        for plugin_path in settings.plugin_paths:
+            jj.add_lazy_plugin(plugin_path)
+        jj.get_valid_command_index()
+
+    for plugin_path in settings.plugin_paths:
+        with timer.phase("import", plugin=plugin_path):
+            plugin_class = import_class(plugin_path)
+        with timer.phase("init_from_context", plugin=plugin_path):
+            plugin = plugin_class.init_from_context(context=jj.context)
+
+        # registration is what remains of add_plugin_instance()
+        phase_count = len(timer.phases)
+        with timer.timed_method(
+            plugin, "get_command_group", plugin_path
+        ), timer.timed_method(plugin, "get_admin_commands", plugin_path):
+            with timer.phase("register commands", plugin=plugin_path):
+                jj.add_plugin_instance(plugin)
+        register = timer.phases.pop()
+        register["seconds"] -= sum(x["seconds"] for x in timer.phases[phase_count:])
+        timer.phases.append(register)
+    return timer.phases
+
+
+class YeahYeahProfilingException(YeahYeahException):
+    pass
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_phases(sys.argv[1], float(sys.argv[2]))))
@@ -0,0 +1,344 @@
+"""Resident yeahyeah daemon. Keeps all plugins loaded and executes commands for
+clients connecting over a unix socket. See yeahyeah.client for the client side.
+
+Protocol: the client sends one line of JSON with 'args', 'prog_name', 'env' and
+'cwd', together with its stdin, stdout and stderr file descriptors. The daemon
+runs the command with these streams and replies with one line of JSON holding
+'exit_code'. Requests are handled one at a time.
+"""
+import array
+import json
+import os
+import socket
+import stat
+import sys
+import traceback
+from contextlib import contextmanager
+
+from yeahyeah.client import default_socket_path, private_socket_dir
+from yeahyeah.exceptions import YeahYeahException
+
+SD_LISTEN_FDS_START = 3  # first file descriptor passed by systemd
+
+
+class YeahYeahServer:
+    """Runs yeahyeah commands for clients connecting to a unix socket"""
+
+    def __init__(self, load_yeahyeah, socket_path=None, idle_timeout=None):
+        """
+
+        Parameters
+        ----------
+        load_yeahyeah: Callable[[], YeahYeah]
+            Returns a YeahYeah instance with all plugins loaded. Called on start
+            and again whenever the loaded instance is outdated
+        socket_path: str, optional
+            Listen on this path. Defaults to client.default_socket_path()
+        idle_timeout: float, optional
+            Stop after this many seconds without requests. Defaults to None,
+            meaning never stop
+        """
+        self.load_yeahyeah = load_yeahyeah
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.yeahyeah = None
+
+    def get_yeahyeah(self):
+        """Loaded YeahYeah instance. Reloaded if settings or any plugin config
+        file has changed since loading
+        """
+        if self.yeahyeah is None or self.yeahyeah.get_valid_command_index() is None:
+            self.yeahyeah = self.load_yeahyeah()
+        return self.yeahyeah
+
+    def serve(self):
+        """Handle requests until idle timeout is reached"""
+        self.get_yeahyeah()
+        sock, owns_socket_file = self.get_listening_socket()
+        sock.settimeout(self.idle_timeout)
+        try:
+            while True:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    return
+                with conn:
+                    self.handle(conn)
+        finally:
+            sock.close()
+            if owns_socket_file:
+                os.unlink(self.socket_path)
+
+    def get_listening_socket(self):
+        """Socket passed by systemd socket activation if any, otherwise a new
+        socket at socket_path
+
+        Returns
+        -------
+        Tuple[socket.socket, bool]
+            The socket, and whether the socket file was created here
+
+        Raises
+        ------
+        YeahYeahServerException
+            If another daemon is already listening at socket_path, or
+            socket_path cannot be used safely
+        """
+        if os.environ.get("LISTEN_PID") == str(os.getpid()) and int(
+            os.environ.get("LISTEN_FDS", 0)
+        ):
+            for key in ("LISTEN_PID", "LISTEN_FDS", "YEAHYEAH_NO_DAEMON"):
+                os.environ.pop(key, None)
+            owner = os.environ.pop("YEAHYEAH_SOCKET_OWNER", None) == "1"
+            return socket.socket(fileno=SD_LISTEN_FDS_START), owner
+
+        if os.path.dirname(self.socket_path) == private_socket_dir():
+            ensure_private_dir(private_socket_dir())
+        if os.path.exists(self.socket_path):
+            self.remove_stale_socket()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        sock.listen()
+        return sock, True
+
+    def remove_stale_socket(self):
+        """Remove the socket file at socket_path, left over from a dead daemon
+
+        Raises
+        ------
+        YeahYeahServerException
+            If a daemon is still listening, or the file belongs to another user
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except ConnectionRefusedError:
+                pass
+            except PermissionError as e:
+                raise YeahYeahServerException(
+                    f"Cannot use {self.socket_path}: {e}"
+                ) from e
+            else:
+                raise YeahYeahServerException(
+                    f"A yeahyeah daemon is already listening on {self.socket_path}"
+                )
+        try:
+            os.unlink(self.socket_path)
+        except PermissionError as e:  # stale socket of another user
+            raise YeahYeahServerException(
+                f"Cannot remove stale socket {self.socket_path}: {e}"
+            ) from e
+
+    def handle(self, conn):
+        """Read a single request from conn, execute it, send back exit code"""
+        conn.settimeout(5)
+        try:
+            request, fds = receive_request(conn)
+        except (OSError, ValueError):
+            return
+        try:
+            exit_code = self.run(request, fds)
+        except OSError as e:  # could not take over client state, e.g. bad cwd
+            os.write(fds[2], f"Error: yeahyeah daemon: {e}\n".encode())
+            exit_code = 1
+        finally:
+            for fd in fds:
+                os.close(fd)
+        conn.settimeout(None)
+        conn.sendall(json.dumps({"exit_code": exit_code}).encode() + b"\n")
+
+    def run(self, request, fds):
+        """Execute the command line in request with the client's streams,
+        environment and working directory
+
+        Returns
+        -------
+        int
+            exit code
+        """
+        with client_process_state(request["env"], request["cwd"], fds):
+            return self.run_command(request)
+
+    def run_command(self, request):
+        """Execute the command line in request in the current process state
+
+        Returns
+        -------
+        int
+            exit code
+        """
+        try:
+            yeahyeah = self.get_yeahyeah()
+            if not yeahyeah.launch_plain(request["args"]):
+                yeahyeah.root_cli.main(
+                    args=request["args"], prog_name=request["prog_name"]
+                )
+        except SystemExit as e:
+            return exit_code_from(e)
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+
+class YeahYeahForkServer(YeahYeahServer):
+    """Runs each command in a fresh child process, forked from a process that
+    has already imported and initialised all plugins. Commands cannot influence
+    each other this way, at the cost of a fork per request.
+
+    When any plugin config file changes, this process replaces itself with a new
+    one so that children start from fresh plugins again
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.listening_socket = None
+        self.owns_socket_file = False
+
+    def get_listening_socket(self):
+        sock, owns_socket_file = super().get_listening_socket()
+        self.listening_socket, self.owns_socket_file = sock, owns_socket_file
+        return sock, owns_socket_file
+
+    def handle(self, conn):
+        super().handle(conn)
+        if self.yeahyeah.get_valid_command_index() is None:
+            self.reexec()
+
+    def run(self, request, fds):
+        """Execute the command line in request in a child process
+
+        Returns
+        -------
+        int
+            exit code of the child
+        """
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:  # child
+            exit_code = 1
+            try:
+                use_client_state(request["env"], request["cwd"], fds)
+                exit_code = self.run_command(request)
+            except OSError as e:  # could not take over client state, e.g. bad cwd
+                print(f"Error: yeahyeah daemon: {e}", file=sys.stderr)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(exit_code)
+
+        _, status = os.waitpid(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(status)
+        return exit_code if exit_code >= 0 else 128 - exit_code  # killed by signal
+
+    def reexec(self):
+        """Replace this process by a freshly started copy. The listening socket
+        is passed on as if by systemd socket activation
+        """
+        os.dup2(self.listening_socket.fileno(), SD_LISTEN_FDS_START)
+        os.set_inheritable(SD_LISTEN_FDS_START, True)
+        env = dict(os.environ, LISTEN_FDS="1", LISTEN_PID=str(os.getpid()))
+        env["YEAHYEAH_NO_DAEMON"] = "1"  # entry point should not connect to us
+        if self.owns_socket_file:
+            env["YEAHYEAH_SOCKET_OWNER"] = "1"
+        args = getattr(sys, "orig_argv", [sys.executable] + sys.argv)
+        os.execve(sys.executable, args, env)
+
+
+def ensure_private_dir(path):
+    """Create folder path accessible to the current user only, or check that an
+    existing one is. Keeps other users from placing or replacing the socket
+
+    Raises
+    ------
+    YeahYeahServerException
+        If path exists but is not a folder owned by and private to this user
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(path)
+    if (
+        not stat.S_ISDIR(status.st_mode)
+        or status.st_uid != os.getuid()
+        or status.st_mode & 0o077
+    ):
+        raise YeahYeahServerException(
+            f"{path} should be a folder accessible only to user {os.getuid()}"
+        )
+
+
+def receive_request(conn):
+    """Read one request line and the file descriptors sent along with it
+
+    Returns
+    -------
+    Tuple[Dict, List[int]]
+        The request, and the client's stdin, stdout, stderr file descriptors
+    """
+    fds = array.array("i")
+    msg, ancdata, _, _ = conn.recvmsg(65536, socket.CMSG_LEN(3 * fds.itemsize))
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[: len(data) - (len(data) % fds.itemsize)])
+    while not msg.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ValueError("Connection closed before request was complete")
+        msg += chunk
+    if len(fds) != 3:
+        raise ValueError(f"Expected 3 file descriptors, got {len(fds)}")
+    return json.loads(msg), list(fds)
+
+
+@contextmanager
+def client_process_state(env, cwd, fds):
+    """Temporarily use the environment, working directory and standard streams
+    of a client in this process
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [os.dup(x) for x in (0, 1, 2)]
+    saved_env = dict(os.environ)
+    saved_cwd = os.getcwd()
+    try:
+        use_client_state(env, cwd, fds)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+        for target, fd in enumerate(saved_fds):
+            os.dup2(fd, target)
+            os.close(fd)
+
+
+def use_client_state(env, cwd, fds):
+    """Use the environment, working directory and standard streams of a client
+    in this process
+    """
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+    os.environ.clear()
+    os.environ.update(env)
+    os.chdir(cwd)
+
+
+def exit_code_from(system_exit):
+    """Exit code as int, following the conventions of sys.exit()"""
+    code = system_exit.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+class YeahYeahServerException(YeahYeahException):
+    pass
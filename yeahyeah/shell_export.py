@@ -0,0 +1,198 @@
+"""Exporting menu items as shell functions, so that launching an item from the
+shell does not start python at all
+"""
+import json
+import re
+import shlex
+import string
+from pathlib import Path
+
+from yeahyeah.exceptions import MenuItemExportError
+from yeahyeah.persistence import atomic_write
+
+
+def format_fields(pattern):
+    """Split a str.format() pattern into literal text and field names
+
+    Parameters
+    ----------
+    pattern: str
+        A pattern like 'https://host/{name}'
+
+    Returns
+    -------
+    List[Tuple[str, str or None]]
+        (literal text, name of field following it or None)
+
+    Raises
+    ------
+    MenuItemExportError
+        If pattern is invalid or uses anything but plain field names
+    """
+    try:
+        parsed = list(string.Formatter().parse(pattern))
+    except ValueError as e:
+        raise MenuItemExportError(f"Invalid pattern '{pattern}': {e}")
+    for _, field, spec, conversion in parsed:
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            raise MenuItemExportError(
+                f"Pattern '{pattern}' uses more than plain field names"
+            )
+    return [(literal, field) for literal, field, _, _ in parsed]
+
+
+def shell_format(segments, values):
+    """Shell word that renders a str.format() pattern
+
+    Parameters
+    ----------
+    segments: List[Tuple[str, str or None]]
+        As returned by format_fields()
+    values: Dict[str, str]
+        field name: shell expression for its value, like '$1'
+
+    Returns
+    -------
+    str
+    """
+    word = ""
+    for literal, field in segments:
+        if literal:
+            word += shlex.quote(literal)
+        if field is not None:
+            word += f'"{values[field]}"'
+    return word or "''"
+
+
+class ShellFunctionExport:
+    """A file that can be sourced in bash or zsh. Defines one shell function per
+    menu item, which launches the item without starting python
+    """
+
+    OPTIONS_PREFIX = "# options: "  # line with the options for write()
+
+    def __init__(self, path):
+        """
+
+        Parameters
+        ----------
+        path: Pathlike
+            Path to the file
+        """
+        self.path = Path(path)
+
+    def exists(self):
+        return self.path.exists()
+
+    def is_outdated(self, *source_paths):
+        """True if any of source_paths has changed since this file was written.
+        Source paths that do not exist are ignored
+        """
+        modified = self.path.stat().st_mtime
+        return any(
+            modified < Path(x).stat().st_mtime for x in source_paths if Path(x).exists()
+        )
+
+    def read_options(self):
+        """Options this file was last written with
+
+        Returns
+        -------
+        Dict
+            keyword arguments for write()
+        """
+        with open(self.path, "r") as f:
+            for line in f:
+                if line.startswith(self.OPTIONS_PREFIX):
+                    return json.loads(line[len(self.OPTIONS_PREFIX) :])
+        return {}
+
+    def write(self, items, usage_log=None, top=None, prefix=""):
+        """Write shell functions for items to this file
+
+        Parameters
+        ----------
+        items: List[YeahYeahMenuItem]
+            Items to write functions for
+        usage_log: UsageLog, optional
+            For selecting top items. Enabled when top is given and disabled
+            otherwise, as nothing else reads it. Functions also record launches
+            in this log. Defaults to None
+        top: int, optional
+            Only write functions for this many items with the highest frecency.
+            Defaults to None, meaning all items
+        prefix: str, optional
+            Prepend this to each function name. Defaults to empty string. Items
+            whose function name would be a shell builtin or keyword are skipped
+
+        Returns
+        -------
+        Tuple[List[str], List[str]]
+            names of items exported, messages for items that could not be
+        """
+        if usage_log and top is None:
+            usage_log.disable()
+            usage_log = None
+        if top is not None and usage_log:
+            usage_log.enable()
+            scores = usage_log.frecency()
+            items = sorted(items, key=lambda x: -scores.get(x.name, 0))[:top]
+        elif top is not None:
+            items = items[:top]
+
+        options = {"top": top, "prefix": prefix}
+        lines = [
+            "# Generated by yeahyeah. Do not edit, changes will be overwritten",
+            self.OPTIONS_PREFIX + json.dumps(options),
+        ]
+        exported, skipped = [], []
+        for item in items:
+            function_name = prefix + item.name
+            if not SHELL_FUNCTION_NAME.fullmatch(function_name):
+                skipped.append(f"{item.name}: not a valid shell function name")
+                continue
+            if function_name in SHELL_BUILTIN_NAMES:
+                skipped.append(
+                    f"{item.name}: would replace shell builtin {function_name}. "
+                    f"Use --prefix"
+                )
+                continue
+            try:
+                body = item.to_shell_function(function_name)
+            except MenuItemExportError as e:
+                skipped.append(f"{item.name}: {e}")
+                continue
+            if usage_log:
+                log = shlex.quote(str(usage_log.path.absolute()))
+                body = (
+                    f"printf '%s\\t%s\\n' \"${{EPOCHSECONDS:-$(date +%s)}}\" "
+                    f"{shlex.quote(item.name)} >> {log}\n" + body
+                )
+            body = "\n".join("    " + x for x in body.splitlines())
+            lines.append(f"{function_name}() {{\n{body}\n}}")
+            exported.append(item.name)
+
+        with atomic_write(self.path) as f:  # shells might be sourcing this
+            f.write("\n".join(lines) + "\n")
+        return exported, skipped
+
+    def update(self, items, usage_log=None):
+        """Rewrite this file with the options it was written with, if it exists"""
+        if self.exists():
+            self.write(items, usage_log=usage_log, **self.read_options())
+
+
+SHELL_FUNCTION_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+# Builtins and keywords of bash and zsh. Functions with these names would
+# change how the shell itself works
+SHELL_BUILTIN_NAMES = frozenset(
+    """alias autoload bg bind bindkey break builtin caller case cd chdir command
+    compgen complete compopt continue coproc declare dirs disown do done echo elif
+    else emulate enable esac eval exec exit export false fc fg fi float for foreach
+    function functions getopts hash help history if in integer jobs kill let local
+    logout mapfile noglob popd print printf pushd pwd read readarray readonly
+    rehash repeat return select set setopt shift shopt source suspend test then
+    time times trap true type typeset ulimit umask unalias unfunction unhash unset
+    unsetopt until vared wait whence where which while zle zmodload zstyle""".split()
+)
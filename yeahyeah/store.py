@@ -0,0 +1,292 @@
+"""SQLite storage for menu item lists, for very large catalogs. Lookups by name
+are indexed point queries and adding or removing an item is a single small
+transaction, instead of parsing or rewriting a whole yaml file.
+
+The yaml file stays the way to edit items by hand. export() writes all items to
+it, and load() imports it again when it was changed since. Both are lossless.
+
+Drop-in alternative for MenuItemJournal. Imported only when a catalog actually
+uses SQLite, to keep sqlite3 out of the common startup path
+"""
+import json
+import sqlite3
+
+from yeahyeah.exceptions import MenuItemLoadError
+from yeahyeah.persistence import atomic_write, fingerprint
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    help_text TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS items_unique_name ON items (name);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# Databases written before names were unique have a plain index on name, and
+# might hold several items with the same name. Keep the one added last
+UNIQUE_NAMES_UPGRADE = """
+DELETE FROM items WHERE id NOT IN (SELECT MAX(id) FROM items GROUP BY name);
+DROP INDEX items_name;
+"""
+
+# Full text search over names and help texts. Not every sqlite3 build has FTS5
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    name, help_text, content='items', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts(rowid, name, help_text)
+    VALUES (new.id, new.name, new.help_text);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, name, help_text)
+    VALUES ('delete', old.id, old.name, old.help_text);
+END;
+CREATE TRIGGER IF NOT EXISTS items_fts_update AFTER UPDATE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, name, help_text)
+    VALUES ('delete', old.id, old.name, old.help_text);
+    INSERT INTO items_fts(rowid, name, help_text)
+    VALUES (new.id, new.name, new.help_text);
+END;
+"""
+
+
+class SQLiteMenuItemStore:
+    """Menu items in a SQLite database, with the yaml menu item file as a
+    human-editable copy
+    """
+
+    def __init__(self, path, yaml_path, list_class, full_text_search=True):
+        """
+
+        Parameters
+        ----------
+        path: Pathlike
+            Path to the database file. Created if it does not exist
+        yaml_path: Pathlike
+            Path to the yaml menu item file to import from and export to
+        list_class: Type[MenuItemList]
+            List class for the items in this store
+        full_text_search: bool, optional
+            Index names and help texts for search(), if sqlite3 supports it.
+            Defaults to True
+        """
+        self.path = path
+        self.yaml_path = yaml_path
+        self.list_class = list_class
+        self.full_text_search = full_text_search
+        self.loaded = None  # fingerprints of database and yaml at last load
+        self._connection = None
+
+    @property
+    def connection(self):
+        """Connection to the database, creating tables if needed"""
+        if self._connection is None:
+            connection = sqlite3.connect(str(self.path), timeout=30)
+            with connection:
+                if self.has_table(connection, "items_name"):
+                    connection.executescript(UNIQUE_NAMES_UPGRADE)
+                connection.executescript(SCHEMA)
+                if self.full_text_search:
+                    self.full_text_search = self.create_fts(connection)
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def has_table(connection, name):
+        """True if the database has a table, index or trigger with this name"""
+        return bool(
+            connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+            ).fetchone()
+        )
+
+    def create_fts(self, connection):
+        """Create the full text search table if needed. Indexes existing items
+        if the table is new, for example in a database that was created without
+
+        Returns
+        -------
+        bool
+            False if this sqlite3 build has no FTS5
+        """
+        existed = self.has_table(connection, "items_fts")
+        try:
+            connection.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            return False
+        if not existed:
+            connection.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild')")
+        return True
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def fingerprints(self):
+        return [fingerprint(self.path), fingerprint(self.yaml_path)]
+
+    def files(self):
+        """Files that items are read from"""
+        return [self.yaml_path, self.path]
+
+    def is_changed(self):
+        """True if database or yaml file were changed by anything other than
+        this object since the last load()
+        """
+        return self.fingerprints() != self.loaded
+
+    def load(self):
+        """All items, in the order they were added. Imports the yaml file first
+        if it was edited since it was last exported or imported
+
+        Returns
+        -------
+        MenuItemList
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When an item or the yaml file could not be loaded
+        """
+        if self.is_yaml_changed():
+            self.import_yaml()
+        self.loaded = self.fingerprints()
+        rows = self.connection.execute("SELECT data FROM items ORDER BY id")
+        return self.list_class(items=[self.item_from_row(x) for x in rows])
+
+    def find(self, name):
+        """The item with this name, as an indexed point query. Imports the yaml
+        file first if it was edited since it was last exported or imported
+
+        Returns
+        -------
+        SerialisableMenuItem or None
+
+        Raises
+        ------
+        MenuItemLoadError:
+            When the item or the yaml file could not be loaded
+        """
+        if self.is_yaml_changed():
+            self.import_yaml()
+        row = self.connection.execute(
+            "SELECT data FROM items WHERE name = ?", (name,)
+        ).fetchone()
+        return self.item_from_row(row) if row else None
+
+    def search(self, query):
+        """Items with all words in query in their name or help text. Words match
+        the start of words with full text search, or anywhere without
+
+        Returns
+        -------
+        MenuItemList
+        """
+        connection = self.connection  # connecting finds out if FTS is available
+        words = query.split()
+        if not words:
+            rows = connection.execute("SELECT data FROM items ORDER BY id")
+        elif self.full_text_search:
+            match = " ".join('"' + x.replace('"', '""') + '"*' for x in words)
+            rows = connection.execute(
+                "SELECT items.data FROM items_fts JOIN items "
+                "ON items.id = items_fts.rowid WHERE items_fts MATCH ? "
+                "ORDER BY items.id",
+                (match,),
+            )
+        else:
+            condition = " AND ".join(["(name || ' ' || help_text) LIKE ?"] * len(words))
+            rows = connection.execute(
+                f"SELECT data FROM items WHERE {condition} ORDER BY id",
+                [f"%{x}%" for x in words],
+            )
+        return self.list_class(items=[self.item_from_row(x) for x in rows])
+
+    def record(self, added=(), removed=()):
+        """Save changes in a single transaction
+
+        Parameters
+        ----------
+        added: List[SerialisableMenuItem], optional
+            Items that were added. Defaults to none
+        removed: List[str], optional
+            Names of items that were removed. Defaults to none
+        """
+        unchanged = not self.is_changed()
+        with self.connection as connection:
+            connection.executemany(
+                "DELETE FROM items WHERE name = ?", [(x,) for x in removed]
+            )
+            self.insert(connection, added)
+        if unchanged:
+            self.loaded = self.fingerprints()
+
+    def needs_compaction(self):
+        """Never, each change is saved in place"""
+        return False
+
+    def save(self, item_list):
+        """Replace all items with the items in item_list, in a single transaction"""
+        with self.connection as connection:
+            connection.execute("DELETE FROM items")
+            self.insert(connection, item_list)
+        self.loaded = self.fingerprints()
+
+    def export(self, item_list):
+        """Write item_list to the yaml file, for editing by hand. load() imports
+        the yaml file again once it has been edited
+        """
+        with atomic_write(self.yaml_path) as f:
+            item_list.save(file=f)
+        self.set_yaml_fingerprint()
+
+    def import_yaml(self):
+        """Replace all items with the items in the yaml file. Parses one item at a
+        time, so that the file is never fully in memory
+        """
+        with open(self.yaml_path, "r") as f, self.connection as connection:
+            connection.execute("DELETE FROM items")
+            self.insert(connection, self.list_class.iter_load(f))
+        self.set_yaml_fingerprint()
+
+    def is_yaml_changed(self):
+        """True if the yaml file was changed since it was last exported or
+        imported
+        """
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'yaml_fingerprint'"
+        ).fetchone()
+        current = fingerprint(self.yaml_path)
+        return current is not None and (row is None or json.loads(row[0]) != current)
+
+    def set_yaml_fingerprint(self):
+        with self.connection as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ("yaml_fingerprint", json.dumps(fingerprint(self.yaml_path))),
+            )
+
+    def insert(self, connection, items):
+        """Add items. An item replaces the item with the same name, in its
+        position
+        """
+        connection.executemany(
+            "INSERT INTO items (name, help_text, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE "
+            "SET help_text = excluded.help_text, data = excluded.data",
+            (
+                (x.name, x.help_text, json.dumps(self.list_class.item_to_data(x)))
+                for x in items
+            ),
+        )
+
+    def item_from_row(self, row):
+        try:
+            return self.list_class.item_from_data(json.loads(row[0]))
+        except ValueError as e:
+            raise MenuItemLoadError(f"Could not read item from {self.path}: {e}")
@@ -0,0 +1,129 @@
+"""Recording when menu items are launched, for ranking items by how often and
+how recently they were used
+"""
+import collections
+import functools
+import os
+import time
+from pathlib import Path
+
+from yeahyeah.persistence import atomic_write
+
+
+class UsageLog:
+    """Append-only record of when menu items were launched. One line per launch:
+    '<unix timestamp>\t<item name>'
+
+    Launches are only recorded while the log is enabled, which a shell export
+    that picks its top items by usage does. The oldest half of the log is
+    dropped whenever it grows beyond MAX_SIZE
+    """
+
+    MAX_SIZE = 256 * 1024  # bytes, about 10000 launches
+
+    def __init__(self, path):
+        """
+
+        Parameters
+        ----------
+        path: Pathlike
+            Path to log file. Does not need to exist
+        """
+        self.path = Path(path)
+
+    def record(self, name):
+        """Record that the item with this name was launched just now. Does
+        nothing if the log is not enabled
+        """
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)  # never create
+        except FileNotFoundError:
+            return
+        with open(fd, "a") as f:
+            f.write(f"{int(time.time())}\t{name}\n")
+            size = f.tell()
+        if size > self.MAX_SIZE:
+            self.drop_oldest()
+
+    def is_enabled(self):
+        return self.path.exists()
+
+    def enable(self):
+        """Start recording launches"""
+        self.path.touch()
+
+    def disable(self):
+        """Stop recording launches and remove the log"""
+        if self.path.exists():
+            self.path.unlink()
+
+    def drop_oldest(self):
+        """Remove the oldest half of the recorded launches"""
+        with open(self.path, "r") as f:
+            lines = f.readlines()
+        with atomic_write(self.path) as f:
+            f.writelines(lines[len(lines) // 2 :])
+
+    def frecency(self, now=None):
+        """Score for each launched item. Higher for items launched often and
+        recently
+
+        Parameters
+        ----------
+        now: float, optional
+            Unix timestamp to calculate ages against. Defaults to now
+
+        Returns
+        -------
+        Dict[str, float]
+            item name: frecency score. Items never launched are not included
+        """
+        now = now or time.time()
+        scores = collections.defaultdict(float)
+        if not self.path.exists():
+            return scores
+        with open(self.path, "r") as f:
+            for line in f:
+                timestamp, _, name = line.rstrip("\n").partition("\t")
+                try:
+                    scores[name] += frecency_weight(now - float(timestamp))
+                except ValueError:
+                    continue  # ignore damaged lines
+        return scores
+
+
+def frecency_weight(age):
+    """Weight of a single launch, given its age in seconds"""
+    days = age / (24 * 3600)
+    for max_days, weight in ((4, 100), (14, 70), (31, 50), (90, 30)):
+        if days < max_days:
+            return weight
+    return 10
+
+
+def record_usage(command, usage_log, name):
+    """Make click command record each launch in usage_log
+
+    Parameters
+    ----------
+    command: click.Command
+        Command to modify
+    usage_log: UsageLog
+        Log to record to
+    name: str
+        Name to record
+
+    Returns
+    -------
+    click.Command
+        The modified command
+    """
+    callback = command.callback
+
+    @functools.wraps(callback)
+    def recording_callback(*args, **kwargs):
+        usage_log.record(name)
+        return callback(*args, **kwargs)
+
+    command.callback = recording_callback
+    return command
@@ -7,6 +7,7 @@ from yeahyeah_plugins.clockify_plugin.context import (
     default_settings_file_name,
 )
 
+from yeahyeah_plugins.clockify_plugin.core import LOG_GROUP_HELP, LOG_GROUP_NAME
 from yeahyeah_plugins.clockify_plugin.decorators import handle_clockify_exceptions
 from yeahyeah_plugins.clockify_plugin.parameters import TIME
 from yeahyeah_plugins.clockify_plugin.time import as_local, now_local
@@ -15,11 +16,10 @@ from yeahyeah.context import YeahYeahContext
 from yeahyeah.persistence import JSONSettingsFile
 
 
-@click.group(name="log")
+@click.group(name=LOG_GROUP_NAME, help=LOG_GROUP_HELP)
 @click.pass_context
 @pass_yeahyeah_context
 def main(context: YeahYeahContext, ctx):
-    """Write to clockify log"""
     settings_file = JSONSettingsFile(
         path=context.settings_path / default_settings_file_name
     )
@@ -1,8 +1,6 @@
 """Context that gets passed around to this yeahyeah_plugins' functions"""
 
 import click
-from clockifyclient.api import APIServer
-from clockifyclient.client import APISession
 
 
 class ClockifyPluginContext:
@@ -11,7 +9,29 @@ class ClockifyPluginContext:
     def __init__(self, api_url, api_key):
         self.api_url = api_url
         self.api_key = api_key
-        self.session = APISession(api_server=APIServer(api_url), api_key=api_key)
+        self._session = None
+
+    @property
+    def session(self):
+        """Clockify API session. Created on first use, as importing the clockify
+        client is slow
+
+        Returns
+        -------
+        APISession
+        """
+        if self._session is None:
+            from clockifyclient.api import APIServer
+            from clockifyclient.client import APISession
+
+            self._session = APISession(
+                api_server=APIServer(self.api_url), api_key=self.api_key
+            )
+        return self._session
+
+    @session.setter
+    def session(self, value):
+        self._session = value
 
     @classmethod
     def init_from_dict(cls, dict_in):
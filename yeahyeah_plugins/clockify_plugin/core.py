@@ -1,5 +1,9 @@
-from yeahyeah_plugins.clockify_plugin.cli import main, edit_settings
-from yeahyeah.core import YeahYeahPlugin
+from yeahyeah.core import LazyGroup, YeahYeahPlugin
+
+# Name and help of the clockify log group. Here and not in cli, so that the
+# plugin can show them without importing cli
+LOG_GROUP_NAME = "log"
+LOG_GROUP_HELP = "Write to clockify log"
 
 
 class ClockifyPlugin(YeahYeahPlugin):
@@ -14,8 +18,14 @@ class ClockifyPlugin(YeahYeahPlugin):
         -------
         List[click.Command]
         """
-
-        return [main]
+        # cli imports the clockify client, which is slow. Only import when used
+        return [
+            LazyGroup(
+                name=LOG_GROUP_NAME,
+                import_path="yeahyeah_plugins.clockify_plugin.cli.main",
+                help=LOG_GROUP_HELP,
+            )
+        ]
 
     def get_admin_commands(self):
         """
@@ -26,5 +36,6 @@ class ClockifyPlugin(YeahYeahPlugin):
             list of click commands that can be used to admin this plugin
 
         """
+        from yeahyeah_plugins.clockify_plugin.cli import edit_settings
 
         return [edit_settings]
@@ -1,7 +1,6 @@
 from functools import wraps
 
 from click.exceptions import ClickException
-from clockifyclient.exceptions import ClockifyClientException
 
 
 def handle_clockify_exceptions(func):
@@ -9,6 +8,9 @@ def handle_clockify_exceptions(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
+        # slow import. Only do this when a command actually runs
+        from clockifyclient.exceptions import ClockifyClientException
+
         try:
             return func(*args, **kwargs)
         except ClockifyClientException as e:
@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from unittest.mock import Mock
 
 import click
@@ -8,6 +10,7 @@ from clockifyclient.models import Project
 
 from yeahyeah_plugins.clockify_plugin.cli import main, stop, projects, add, find_project
 from yeahyeah_plugins.clockify_plugin.context import ClockifyPluginContext
+from yeahyeah_plugins.clockify_plugin.core import ClockifyPlugin
 from yeahyeah.plugin_testing import MockContextCliRunner
 from yeahyeah.context import YeahYeahContext
 
@@ -173,3 +176,49 @@ def test_add_message_parsing(
     assert (
         mock_api_session.add_time_entry.call_args[1]["description"] == expected_message
     )
+
+
+IMPORT_CHECK_SCRIPT = """
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from yeahyeah.core import YeahYeah
+
+yeahyeah = YeahYeah(configuration_path=Path(sys.argv[1]))
+yeahyeah.add_lazy_plugin("yeahyeah_plugins.clockify_plugin.core.ClockifyPlugin")
+yeahyeah.add_lazy_plugin(
+    "yeahyeah_plugins.url_pattern_plugin.core.UrlPatternsPlugin"
+)
+with patch("click.launch"):
+    yeahyeah.root_cli.main(args=sys.argv[2:], standalone_mode=False)
+print(sorted(x for x in sys.modules if x.startswith("clockifyclient")))
+"""
+
+
+@pytest.mark.parametrize(
+    "args, expect_import",
+    [
+        ("wiki foo", False),
+        ("--help", False),
+        ("admin clockify --help", False),
+        ("log --help", False),
+        ("log status", True),
+    ],
+)
+def test_clockify_client_imported_on_use(tmpdir, args, expect_import):
+    """Having the plugin enabled should not cost the slow clockify client import"""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_CHECK_SCRIPT, str(tmpdir)] + args.split(" "),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imported = result.stdout.splitlines()[-1] != "[]"
+    assert imported == expect_import
+
+
+def test_clockify_lazy_group_matches_main():
+    """The stand-in group should show the name and help of the actual group"""
+    (lazy_group,) = ClockifyPlugin().get_commands()
+    assert lazy_group.name == main.name
+    assert lazy_group.help == main.help
@@ -2,8 +2,6 @@
 
 import datetime
 
-from clockifyclient.models import ClockifyDatetime
-
 
 def now_local():
     """The datetime now, time zone aware for local timezone
@@ -14,4 +12,6 @@ def now_local():
 
 
 def as_local(datetime_in):
+    from clockifyclient.models import ClockifyDatetime  # slow import, only on use
+
     return ClockifyDatetime(datetime_in).datetime_local
@@ -1,11 +1,17 @@
 import platform
+import shlex
 import subprocess
 
 import click
 
 from yeahyeah.core import YeahYeahPlugin
 from yeahyeah.context import YeahYeahContext
-from yeahyeah.objects import SerialisableMenuItem, MenuItemList
+from yeahyeah.objects import (
+    MenuItemList,
+    MenuItemPluginMixin,
+    SerialisableMenuItem,
+)
+from yeahyeah.persistence import atomic_write
 
 default_settings_file_name = "path_items.yaml"
 
@@ -13,6 +19,9 @@ default_settings_file_name = "path_items.yaml"
 class PathItem(SerialisableMenuItem):
     """A named UNC path"""
 
+    __slots__ = ("path",)
+    parameter_names = ("path",)
+
     def __init__(self, name, path, help_text=None):
         super().__init__(name, help_text)
         self.path = path
@@ -41,12 +50,46 @@ class PathItem(SerialisableMenuItem):
         @click.command(name=self.name, help=self.help_text)
         @click.option("--print-only", "-p", is_flag=True)
         def the_command(print_only):
-            click.echo(self.path)
-            if not print_only:
-                open_terminal(self.path)
+            self.launch(print_only=print_only)
 
         return the_command
 
+    def get_param_signatures(self):
+        return [
+            {
+                "kind": "option",
+                "name": "print_only",
+                "opts": ["--print-only", "-p"],
+                "secondary_opts": [],
+                "nargs": 1,
+                "is_flag": True,
+            }
+        ]
+
+    def parse_plain_args(self, args):
+        return None if args else {"print_only": False}
+
+    def launch(self, print_only=False):
+        click.echo(self.path)
+        if not print_only:
+            open_terminal(self.path)
+
+    def to_shell_function(self, function_name):
+        """Echo path and cd to it in the current shell. Like the click command,
+        but without opening a new terminal
+        """
+        if self.path.startswith("~/"):
+            path = "~/" + shlex.quote(self.path[2:])  # quoting would stop expansion
+        else:
+            path = shlex.quote(self.path)
+        return "\n".join(
+            [
+                f"echo {path}",
+                'case "$1" in -p|--print-only) return 0 ;; esac',
+                f"cd {path}",
+            ]
+        )
+
     @staticmethod
     def from_dict(dict_in):
         """Create a UrlPattern object from given dict.
@@ -67,22 +110,14 @@ class PathItemList(MenuItemList):
     item_classes = [PathItem]
 
 
-class PathItemPlugin(YeahYeahPlugin):
+class PathItemPlugin(MenuItemPluginMixin, YeahYeahPlugin):
+    """Plugin that holds PathItems"""
 
     slug = "path_items"
     short_slug = "path"
-
-    def __init__(self, item_list: PathItemList):
-        """Plugin that holds PathItems
-
-        Parameters
-        ----------
-        item_list: PathItemList, optional
-            Optional list of items
-        """
-
-        self.item_list = item_list
-        self.config_file_path = None
+    list_class = PathItemList
+    value_field = "path"
+    config_file_name = default_settings_file_name
 
     @classmethod
     def init_from_context(cls, context: YeahYeahContext):
@@ -98,36 +133,9 @@ class PathItemPlugin(YeahYeahPlugin):
 
         """
         return cls.init_from_file_path(
-            context.settings_path / default_settings_file_name
+            cls.get_config_file_path(context), context.layer_paths
         )
 
-    @classmethod
-    def init_from_file_path(cls, config_file_path) -> "PathItemPlugin":
-        """
-        Parameters
-        ----------
-        config_file_path: Pathlike
-            path to path item config file
-
-        Returns
-        -------
-        PathItemPlugin
-
-        """
-        cls.assert_config_file(config_file_path)
-        with open(config_file_path, "r") as f:
-            item_list = PathItemList.load(f)
-
-        obj = cls(item_list=item_list)
-        obj.config_file_path = config_file_path
-        return obj
-
-    def save(self):
-        """Save current list to disk if possible"""
-        if self.config_file_path:
-            with open(self.config_file_path, "w") as f:
-                self.item_list.save(file=f)
-
     @staticmethod
     def assert_config_file(config_file_path):
         """Make sure config file exists. If not, create an example config file"""
@@ -135,7 +143,7 @@ class PathItemPlugin(YeahYeahPlugin):
             return
         else:
             config_file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(config_file_path, "w") as f:
+            with atomic_write(config_file_path) as f:
                 example_patterns = [
                     PathItem(
                         name="home",
@@ -154,78 +162,6 @@ class PathItemPlugin(YeahYeahPlugin):
                 f"Creating with default contents.."
             )
 
-    def get_commands(self):
-        """
-
-        Returns
-        -------
-        List[click.Command]
-        """
-        commands = []
-        for item in self.item_list:
-            command = item.to_click_command()
-            command.help += f" ({self.short_slug})"
-            commands.append(command)
-
-        return commands
-
-    def get_admin_commands(self):
-        """
-
-        Returns
-        -------
-        List[click.Command]
-            list of click commands that can be used to admin this plugin
-
-        """
-
-        @click.command()
-        def status():
-            """Print some info for this plugin"""
-            status_str = (
-                f"PathItemPlugin:\n"
-                f"{len(self.get_commands())} path items in plugin\n"
-            )
-            if self.config_file_path:
-                status_str += f"Config file: {self.config_file_path}"
-            click.echo(status_str)
-
-        @click.command()
-        def edit():
-            """Open settings file in editor"""
-            click.echo(f"Opening config file at '{self.config_file_path}'")
-            click.launch(str(self.config_file_path))
-
-        @click.command()
-        @click.argument("keyword")
-        @click.argument("path")
-        def add(keyword, path):
-            """Add a new url pattern"""
-            pattern = PathItem(name=keyword, path=path)
-            click.echo(f"Adding {pattern}")
-            self.item_list.append(pattern)
-            self.save()
-
-        @click.command()
-        @click.argument("keyword")
-        def remove(keyword):
-            """Remove an existing path item"""
-            to_remove = [x for x in self.item_list if x.name == keyword]
-            if not to_remove:
-                click.echo(f"path with keyword {keyword} not found")
-            else:
-                click.echo(f"Removing {[str(x) for x in to_remove]}")
-                for x in to_remove:
-                    self.item_list.remove(x)
-                self.save()
-
-        @click.command()
-        def list():
-            """List all paths"""
-            click.echo("\n".join([str(x) for x in self.item_list]))
-
-        return [status, list, edit, add, remove]
-
 
 def open_terminal(path):
     """Open a terminal at the given path.
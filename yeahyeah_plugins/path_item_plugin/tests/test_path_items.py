@@ -1,12 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import subprocess
 from pathlib import Path
 from unittest.mock import Mock
 
 import pytest
 from click.testing import CliRunner
 
-from yeahyeah_plugins.path_item_plugin.core import PathItemPlugin
+from yeahyeah_plugins.path_item_plugin.core import PathItem, PathItemPlugin
 from yeahyeah.core import YeahYeah
 
 
@@ -53,3 +54,29 @@ def test_url_pattern_plugin_admin_add__remove_list_record(yeahyeah_instance):
     )
     assert response.exit_code == 0
     assert len(path_item_plugin.item_list) == 2
+
+
+def test_path_item_plugin_export_shell(tmpdir):
+    plugin = PathItemPlugin.init_from_file_path(Path(tmpdir) / "path_items.yaml")
+    folder = Path(tmpdir) / "some folder"
+    folder.mkdir()
+    plugin.item_list.append(PathItem(name="some_folder", path=str(folder)))
+    plugin.item_list.append(PathItem(name="not-valid", path="/tmp"))
+    runner = CliRunner()
+    response = runner.invoke(plugin.get_admin_commands()[-1], [])
+    assert response.exit_code == 0
+
+    def run_bash(command):
+        return subprocess.run(
+            ["bash", "-c", f"source {plugin.get_shell_export().path}; {command}"],
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    assert run_bash("some_folder; pwd") == f"{folder}\n{folder}\n"
+    assert run_bash("cd /; some_folder -p; pwd") == f"{folder}\n/\n"
+    assert "not-valid" not in plugin.get_shell_export().path.read_text()
+
+    # exported functions follow changes right away
+    runner.invoke(plugin.get_admin_commands()[-3], ["new", "/tmp"])  # add
+    assert run_bash("new; pwd") == "/tmp\n/tmp\n"
@@ -1,11 +1,21 @@
 import re
+import shlex
 import webbrowser
 
 import click
 
 from yeahyeah.context import YeahYeahContext
 from yeahyeah.core import YeahYeahPlugin
-from yeahyeah.objects import MenuItemList, SerialisableMenuItem
+from yeahyeah.index import argument_signature
+from yeahyeah.exceptions import MenuItemExportError
+from yeahyeah.objects import (
+    MenuItemList,
+    MenuItemPluginMixin,
+    SerialisableMenuItem,
+    is_plain_argument,
+)
+from yeahyeah.persistence import atomic_write
+from yeahyeah.shell_export import format_fields, shell_format
 
 default_settings_file_name = "url_patterns.yaml"
 
@@ -13,9 +23,22 @@ default_settings_file_name = "url_patterns.yaml"
 class UrlPattern(SerialisableMenuItem):
     """A named url pattern that launches some url and can be saved to disk"""
 
+    __slots__ = ("pattern", "_template")
+    parameter_names = ("pattern",)
+
     def __init__(self, name, pattern, help_text=None):
         super().__init__(name, help_text)
         self.pattern = pattern
+        self._template = None
+
+    @property
+    def template(self):
+        """pattern compiled into a UrlTemplate. Compiled on first use, so that
+        loading a catalog does not parse patterns that are never launched
+        """
+        if self._template is None or self._template.pattern != self.pattern:
+            self._template = UrlTemplate.compile(self.pattern)
+        return self._template
 
     def __str__(self):
         return f"URLPattern {self.name}:{self.pattern}"
@@ -48,21 +71,71 @@ class UrlPattern(SerialisableMenuItem):
     def to_click_command(self):
         """URL pattern as a click command that can be added with add_command()"""
 
-        arguments = re.findall(r"\{([^{}]*)\}", self.pattern)
+        arguments = self.get_argument_names()
 
         @click.command(name=self.name, help=self.help_text)
         def the_command(**kwargs):
-            url = self.pattern.format(**kwargs)
-            click.echo(url)
-            click.launch(url)
+            self.launch(**kwargs)
 
         for argument_name in arguments:
             the_command = click.argument(argument_name, type=click.STRING)(the_command)
 
         return the_command
 
+    def get_param_signatures(self):
+        return [argument_signature(x) for x in self.get_argument_names()]
+
+    def get_argument_names(self):
+        """Names of the fields in pattern, in order"""
+        return list(self.template.argument_names)
+
+    def has_plain_argument_names(self):
+        """True if click would use argument names as they are, so that keyword
+        arguments for launch() can be created without click
+        """
+        arguments = self.get_argument_names()
+        return len(set(arguments)) == len(arguments) and all(
+            x.isidentifier() and x == x.lower() for x in arguments
+        )
+
+    def parse_plain_args(self, args):
+        arguments = self.get_argument_names()
+        if (
+            len(args) != len(arguments)
+            or not all(is_plain_argument(x) for x in args)
+            or not self.has_plain_argument_names()
+        ):
+            return None
+        return dict(zip(arguments, args))
+
+    def launch(self, **kwargs):
+        url = self.template.render(kwargs)
+        click.echo(url)
+        click.launch(url)
+
+    def to_shell_function(self, function_name):
+        """Echo and open url, like the click command does"""
+        segments = format_fields(self.pattern)
+        fields = [field for _, field in segments if field is not None]
+        values = {field: f"${{{i}}}" for i, field in enumerate(fields, start=1)}
+        usage = " ".join(["Usage:", function_name] + [x.upper() for x in fields])
+        return "\n".join(
+            [
+                f'if [ "$#" -ne {len(fields)} ]; then',
+                f"    echo {shlex.quote(usage)} >&2",
+                "    return 2",
+                "fi",
+                f"local url={shell_format(segments, values)}",
+                'echo "$url"',
+                '${YEAHYEAH_OPEN:-xdg-open} "$url"',
+            ]
+        )
+
 
 class WildCardUrlPattern(UrlPattern):
+    __slots__ = ()
+    parameter_names = ("pattern", "capture_all_keywords")
+
     def __init__(self, name, pattern, capture_all_keywords=True, help_text=None):
         super().__init__(name, pattern, help_text)
 
@@ -74,18 +147,11 @@ class WildCardUrlPattern(UrlPattern):
     def to_click_command(self):
         """URL pattern as a click command that can be added with add_command()"""
 
-        arguments = re.findall(r"\{([^{}]*)\}", self.pattern)
+        arguments = self.get_argument_names()
 
         @click.command(name=self.name, help=self.help_text)
         def the_command(**kwargs):
-
-            if kwargs:
-                param_name, param_values = list(kwargs.items()).pop()
-                url = self.pattern.format(**{param_name: " ".join(param_values)})
-            else:
-                url = self.pattern
-            click.echo(f"loading {url}")
-            open_url(url)
+            self.launch(**kwargs)
 
         for argument_name in arguments:
             the_command = click.argument(argument_name, type=click.STRING, nargs=-1)(
@@ -94,6 +160,118 @@ class WildCardUrlPattern(UrlPattern):
 
         return the_command
 
+    def get_param_signatures(self):
+        return [argument_signature(x, nargs=-1) for x in self.get_argument_names()]
+
+    def parse_plain_args(self, args):
+        arguments = self.get_argument_names()
+        if (
+            len(arguments) > 1
+            or (args and not arguments)
+            or not all(is_plain_argument(x) for x in args)
+            or not self.has_plain_argument_names()
+        ):
+            return None
+        return {name: tuple(args) for name in arguments}
+
+    def launch(self, **kwargs):
+        if kwargs:
+            param_name, param_values = list(kwargs.items()).pop()
+            url = self.template.render({param_name: " ".join(param_values)})
+        else:
+            url = self.pattern
+        click.echo(f"loading {url}")
+        open_url(url)
+
+    def to_shell_function(self, function_name):
+        """Echo and open url with all arguments in a single field, like the click
+        command does
+        """
+        segments = format_fields(self.pattern)
+        fields = {field for _, field in segments if field is not None}
+        if len(fields) > 1:
+            raise MenuItemExportError("Wildcard pattern has more than one field")
+        if fields:
+            url = shell_format(segments, {field: "$*" for field in fields})
+        else:
+            url = shlex.quote(self.pattern)  # click command does not format these
+        return "\n".join(
+            [
+                "local IFS=' '",
+                f"local url={url}",
+                'echo "loading $url"',
+                '${YEAHYEAH_OPEN:-xdg-open} "$url"',
+            ]
+        )
+
+
+class UrlTemplate:
+    """A url pattern split into literal text and placeholders. Rendering joins
+    these, instead of parsing the pattern again each time like str.format does
+    """
+
+    __slots__ = ("pattern", "segments", "argument_names")
+
+    def __init__(self, pattern, segments):
+        """
+
+        Parameters
+        ----------
+        pattern: str
+            A pattern like 'https://host/{name}'
+        segments: Tuple[Tuple[str, str or None]] or None
+            (literal text, placeholder following it or None), as returned by
+            format_fields(). None if pattern uses more than plain placeholders,
+            in which case it is rendered with str.format
+        """
+        self.pattern = pattern
+        self.segments = segments
+        if segments is None:
+            self.argument_names = tuple(re.findall(r"\{([^{}]*)\}", pattern))
+        else:
+            self.argument_names = tuple(x for _, x in segments if x is not None)
+
+    def __repr__(self):
+        return f"UrlTemplate({self.pattern!r})"
+
+    @classmethod
+    def compile(cls, pattern):
+        """Split pattern into segments. Never fails: patterns that use format
+        specs or are invalid are rendered with str.format, which fails the same
+        way it always did
+        """
+        try:
+            segments = tuple(format_fields(pattern))
+        except MenuItemExportError:
+            segments = None
+        return cls(pattern, segments)
+
+    def render(self, values):
+        """Fill in placeholders
+
+        Parameters
+        ----------
+        values: Dict[str, str]
+            placeholder name: value
+
+        Returns
+        -------
+        str
+
+        Raises
+        ------
+        KeyError
+            If values is missing a placeholder
+        """
+        if self.segments is None:
+            return self.pattern.format(**values)
+        return "".join(
+            [
+                literal if field is None else f"{literal}{values[field]}"
+                for literal, field in self.segments
+            ]
+        )
+
 
 class URLPatternList(MenuItemList):
     """A persistable list of url patterns.
@@ -119,48 +297,42 @@ def open_url(url):
     webbrowser.open_new(url)
 
 
-class UrlPatternsPlugin(YeahYeahPlugin):
+class UrlPatternsPlugin(MenuItemPluginMixin, YeahYeahPlugin):
 
     slug = "url_patterns"
     short_slug = "url"
+    list_class = URLPatternList
+    value_field = "pattern"
+    config_file_name = default_settings_file_name
 
     def __init__(self, pattern_list):
-        """Plugin that holds URL path_items
+        """Plugin that holds URL patterns
 
         Parameters
         ----------
         pattern_list: URLPatternList
 
         """
-        self.pattern_list = pattern_list
-        self.config_file_path = None
+        super().__init__(item_list=pattern_list)
+
+    @property
+    def pattern_list(self):
+        """This plugin's own patterns, not those from fragments"""
+        return self.item_list
+
+    @pattern_list.setter
+    def pattern_list(self, value):
+        self.item_list = value
 
     @classmethod
     def init_from_context(cls, context: YeahYeahContext):
-        settings_file_path = context.settings_path / default_settings_file_name
-        cls.assert_config_file(settings_file_path)
-        with open(settings_file_path, "r") as f:
-            pattern_list = URLPatternList.load(f)
-
-        obj = cls(pattern_list=pattern_list)
-        obj.config_file_path = settings_file_path
-        return obj
+        return cls.init_from_file_path(
+            cls.get_config_file_path(context), context.layer_paths
+        )
 
     @classmethod
     def __from_file_path__(cls, config_file_path):
-        cls.assert_config_file(config_file_path)
-        with open(config_file_path, "r") as f:
-            pattern_list = URLPatternList.load(f)
-
-        obj = cls(pattern_list=pattern_list)
-        obj.config_file_path = config_file_path
-        return obj
-
-    def save(self):
-        """Save current pattern list to disk if possible"""
-        if self.config_file_path:
-            with open(self.config_file_path, "w") as f:
-                self.pattern_list.save(file=f)
+        return cls.init_from_file_path(config_file_path)
 
     @staticmethod
     def assert_config_file(config_file_path):
@@ -169,7 +341,7 @@ class UrlPatternsPlugin(YeahYeahPlugin):
             return
         else:
             config_file_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(config_file_path, "w") as f:
+            with atomic_write(config_file_path) as f:
                 example_patterns = [
                     UrlPattern(
                         name="virus",
@@ -190,75 +362,3 @@ class UrlPatternsPlugin(YeahYeahPlugin):
                 f"UrlPattern config file {config_file_path} did not exist. Creating "
                 f"with default contents.."
             )
-
-    def get_commands(self):
-        """
-
-        Returns
-        -------
-        List[click.Command]
-        """
-        commands = []
-        for item in self.pattern_list.data:
-            command = item.to_click_command()
-            command.help += f" ({self.short_slug})"
-            commands.append(command)
-
-        return commands
-
-    def get_admin_commands(self):
-        """
-
-        Returns
-        -------
-        List[click.Command]
-            list of click commands that can be used to admin this plugin
-
-        """
-
-        @click.command()
-        def status():
-            """Print some info for this plugin"""
-            status_str = (
-                f"UrlPatternsPlugin:\n"
-                f"{len(self.get_commands())} path_items in plugin\n"
-            )
-            if self.config_file_path:
-                status_str += f"Config file: {self.config_file_path}"
-            click.echo(status_str)
-
-        @click.command()
-        def edit():
-            """Open settings file in editor"""
-            click.echo(f"Opening config file at '{self.config_file_path}'")
-            click.launch(str(self.config_file_path))
-
-        @click.command()
-        @click.argument("keyword")
-        @click.argument("pattern")
-        def add(keyword, pattern):
-            """Add a new url pattern"""
-            pattern = UrlPattern(name=keyword, pattern=pattern)
-            click.echo(f"Adding {pattern}")
-            self.pattern_list.append(pattern)
-            self.save()
-
-        @click.command()
-        @click.argument("keyword")
-        def remove(keyword):
-            """Remove an existing url pattern"""
-            to_remove = [x for x in self.pattern_list if x.name == keyword]
-            if not to_remove:
-                click.echo(f"Pattern with keyword {keyword} not found")
-            else:
-                click.echo(f"Removing {[str(x) for x in to_remove]}")
-                for x in to_remove:
-                    self.pattern_list.remove(x)
-                self.save()
-
-        @click.command()
-        def list():
-            """List all url path_items"""
-            click.echo("\n".join([str(x) for x in self.pattern_list]))
-
-        return [status, list, edit, add, remove]
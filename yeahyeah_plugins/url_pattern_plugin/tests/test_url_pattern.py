@@ -1,17 +1,27 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-
+import pickle
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
+import yaml
 
 from click.testing import CliRunner
 
+from yeahyeah.index import param_signature
+from yeahyeah.caches import MenuItemFragments
+from yeahyeah.exceptions import MenuItemDuplicateError, MenuItemLoadError
+from yeahyeah.journal import MenuItemJournal
 from yeahyeah.objects import YeahYeahMenuItem
+from yeahyeah.parsing import iter_yaml_items
+from yeahyeah.usage import UsageLog
 from yeahyeah_plugins.url_pattern_plugin.core import (
     UrlPattern,
     URLPatternList,
+    UrlTemplate,
     WildCardUrlPattern,
     UrlPatternsPlugin,
 )
@@ -44,6 +54,21 @@ def test_capture_all(mock_web_browser):
     assert "Error: Got unexpected extra arguments (two three)" in result.output
 
 
+@pytest.mark.parametrize(
+    "item",
+    [
+        UrlPattern(name="a", pattern="https://host"),
+        UrlPattern(name="a", pattern="https://host/{first}/{Second-Field}"),
+        WildCardUrlPattern(name="a", pattern="https://search {query}"),
+    ],
+)
+def test_param_signatures(item):
+    """Parameters should be described exactly like click describes them"""
+    assert item.get_param_signatures() == [
+        param_signature(x) for x in item.to_click_command().params
+    ]
+
+
 def test_persisting(tmpdir):
     """Test saving and reading url path_items from disk"""
 
@@ -89,12 +114,227 @@ def test_load_from_file():
     assert from_file[2].pattern == "https://uniqcodeПривет.com"
 
 
+def test_load_cached(tmpdir, monkeypatch):
+    """Unchanged yaml should not be parsed again"""
+    test_file = Path(tmpdir) / "urlpatterns.yaml"
+    with open(test_file, "w") as f:
+        URLPatternList(items=[UrlPattern(name="test", pattern="https://a")]).save(f)
+
+    assert {x.name for x in URLPatternList.load_cached(test_file)} == {"test"}
+    assert (Path(tmpdir) / ".urlpatterns.yaml.marshal").exists()
+
+    parse = Mock(side_effect=AssertionError("Should not parse"))
+    monkeypatch.setattr("yeahyeah.caches.iter_yaml_items", parse)
+    assert {x.name for x in URLPatternList.load_cached(test_file)} == {"test"}
+
+    monkeypatch.undo()
+    with open(test_file, "a") as f:
+        f.write("test2:\n  pattern: https://b\n")
+    loaded = URLPatternList.load_cached(test_file)
+    assert {x.name for x in loaded} == {"test", "test2"}
+
+
+def test_load_unsafe(tmpdir):
+    """Loading should never execute anything"""
+    with pytest.raises(MenuItemLoadError):
+        URLPatternList.load("test: !!python/object/apply:os.system ['echo']")
+
+
+def test_load_picks_class_by_parameters():
+    """Each item should be loaded once, as the class whose parameters it has"""
+    loaded = URLPatternList.load(
+        "plain:\n  pattern: https://a/{x}\n"
+        "wild:\n  pattern: https://b/{q}\n  capture_all_keywords: true\n"
+        "helped:\n  pattern: https://c\n  text: some help\n"
+    )
+    assert [(type(x), x.name) for x in loaded] == [
+        (UrlPattern, "plain"),
+        (WildCardUrlPattern, "wild"),
+        (UrlPattern, "helped"),
+    ]
+    assert loaded[2].help_text == "some help"
+
+
+@pytest.mark.parametrize(
+    "content, message",
+    [
+        ("a:\n  pattern: https://a\nb:\n  path: /tmp\n", "item 'b' at line 3"),
+        ("a:\n  pattern: https://a\nb: just text\n", "item 'b' at line 3"),
+        ("a:\n  pattern: https://a\nb:\n  pattern: [unclosed\n", "at line 5"),
+        ("- a\n- b\n", "found a list instead at line 1"),
+        ("", "file is empty"),
+        ("a: *missing\n", "alias *missing at line 1"),
+    ],
+)
+def test_load_errors(content, message):
+    """Load errors should say where in the file the problem is"""
+    with pytest.raises(MenuItemLoadError) as e:
+        URLPatternList.load(content)
+    assert message in str(e.value)
+
+
+def test_load_anchors():
+    """Aliases and merge keys should refer to anchors earlier in the file"""
+    content = (
+        "base: &base\n  pattern: https://a/{x}\n  text: &help some help\n"
+        "copy: *base\n"
+        "merged:\n  <<: *base\n  pattern: https://b/{x}\n"
+        "helped:\n  pattern: https://c\n  text: *help\n"
+    )
+    loaded = URLPatternList.load(content)
+    assert [(x.name, x.pattern, x.help_text) for x in loaded] == [
+        ("base", "https://a/{x}", "some help"),
+        ("copy", "https://a/{x}", "some help"),
+        ("merged", "https://b/{x}", "some help"),
+        ("helped", "https://c", "some help"),
+    ]
+    assert [x[1] for x in iter_yaml_items(content)] == list(
+        yaml.safe_load(content).values()
+    )
+
+
+def test_load_streaming():
+    """Items should become available one at a time, before the rest of the file
+    has been parsed. Finding a single item should not read further
+    """
+    content = "a:\n  pattern: https://a\nb:\n  pattern: https://b\nc: [broken\n"
+    items = URLPatternList.iter_load(content)
+    assert next(items).name == "a"
+    assert next(items).name == "b"
+    with pytest.raises(MenuItemLoadError):
+        next(items)
+
+    assert URLPatternList.find(content, "b").pattern == "https://b"
+    with pytest.raises(MenuItemLoadError):
+        URLPatternList.find(content, "unknown")
+
+
+def test_load_yaml_types():
+    """Scalars should be parsed like yaml.safe_load does"""
+    loaded = URLPatternList.load(
+        "'123':\n  pattern: \"https://a\"\n"
+        "wild:\n  pattern: https://b\n  capture_all_keywords: yes\n"
+    )
+    assert loaded[0].name == "123"
+    assert isinstance(loaded[1], WildCardUrlPattern)
+    assert URLPatternList.find("7:\n  pattern: https://c\n", 7).pattern == "https://c"
+
+
 def test_base_class():
     test = YeahYeahMenuItem(name="test")
     with pytest.raises(NotImplementedError):
         test.to_click_command()
 
 
+def test_item_list_index():
+    """Items can be found and removed by name. Names are unique"""
+    a, b, c = (UrlPattern(name=x, pattern=f"https://{x}") for x in "abc")
+    item_list = URLPatternList(items=[a, b, c])
+
+    assert item_list.get("b") is b
+    assert item_list.get("d") is None
+    assert "b" in item_list and b in item_list
+    assert UrlPattern(name="b", pattern="https://b") not in item_list
+    assert item_list.remove("b") is b
+    assert "b" not in item_list
+    with pytest.raises(ValueError):
+        item_list.remove("b")
+    item_list.remove(a)
+    assert item_list == [c]
+
+    other_c = UrlPattern(name="c", pattern="https://other_c")
+    item_list = URLPatternList(items=[a, b, c, other_c])  # replaces in position
+    assert [x.name for x in item_list] == ["a", "b", "c"]
+    assert item_list[-1] is other_c
+    item_list.insert(0, c)
+    item_list.append(a)
+    assert item_list == [c, a, b]
+    del item_list[0]
+    assert item_list + [c] == [a, b, c]
+
+    with pytest.raises(MenuItemDuplicateError):
+        URLPatternList(items=[a, b, c, other_c], duplicates="error")
+    strict = URLPatternList(items=[a, b], duplicates="error")
+    with pytest.raises(MenuItemDuplicateError):
+        strict.append(a)
+    with pytest.raises(MenuItemDuplicateError):
+        strict.insert(0, b)
+    assert strict == [a, b]
+
+
+def test_item_list_positions():
+    """Changing items by position keeps names unique and order intact"""
+    a, b, c, d = (UrlPattern(name=x, pattern=f"https://{x}") for x in "abcd")
+    item_list = URLPatternList(items=[a, b, c, d])
+    with pytest.raises(AttributeError):
+        item_list.items.append(a)  # read-only, change the list itself
+
+    other_b = UrlPattern(name="b", pattern="https://other_b")
+    version = item_list.version
+    item_list[1] = other_b
+    assert item_list == [a, other_b, c, d]
+    assert item_list.get("b") is other_b
+    assert item_list.version != version
+
+    item_list[-1] = b  # like append, replaces the item with the same name
+    assert item_list == [a, b, c]
+    item_list[0] = d
+    assert item_list == [d, b, c]
+    del item_list[-2]
+    assert item_list == [d, c]
+    assert "b" not in item_list
+    with pytest.raises(IndexError):
+        item_list[2] = a
+    with pytest.raises(IndexError):
+        del item_list[2]
+
+    strict = URLPatternList(items=[a, b], duplicates="error")
+    with pytest.raises(MenuItemDuplicateError):
+        strict[0] = b
+    assert strict == [a, b]
+
+
+def test_items_have_slots():
+    """Items keep no __dict__, but still pickle for parallel parsing"""
+    items = [
+        UrlPattern(name="a", pattern="https://a/{q}", help_text="A"),
+        WildCardUrlPattern(name="b", pattern="https://b/{q}"),
+    ]
+    for item in items:
+        assert not hasattr(item, "__dict__")
+        copy = pickle.loads(pickle.dumps(item))
+        assert type(copy) is type(item)
+        assert copy.to_dict() == item.to_dict()
+        assert copy.help_text == item.help_text
+
+
+def test_url_template():
+    template = UrlTemplate.compile("https://{host}/a%20b/{{literal}}?q={query}")
+    assert template.argument_names == ("host", "query")
+    assert (
+        template.render({"host": "h", "query": "a b/c"})
+        == "https://h/a%20b/{literal}?q=a b/c"
+    )
+    with pytest.raises(KeyError):
+        template.render({"host": "h"})
+
+    # anything but plain placeholders is left to str.format
+    template = UrlTemplate.compile("https://host/{page:>3}")
+    assert template.segments is None
+    assert template.argument_names == ("page:>3",)
+    assert template.render({"page": "1"}) == "https://host/  1"
+
+
+def test_url_pattern_template():
+    """Patterns are compiled once, on first use"""
+    pattern = UrlPattern(name="a", pattern="https://{host}/{{x}}")
+    template = pattern.template
+    assert pattern.get_argument_names() == ["host"]
+    assert pattern.template is template
+    pattern.pattern = "https://{other}"
+    assert pattern.get_argument_names() == ["other"]
+
+
 def test_url_pattern_plugin(tmpdir, disable_click_echo):
     config_file = Path(tmpdir / "test_url_pattern_config.yaml")
     assert not config_file.exists()
@@ -112,7 +352,7 @@ def test_url_pattern_plugin_admin(yeahyeah_instance):
         yeahyeah_instance.root_cli, "admin url_patterns status".split(" ")
     )
     assert response.exit_code == 0
-    assert "3 path_items in plugin" in response.output
+    assert "3 url patterns in plugin" in response.output
 
 
 def test_url_pattern_plugin_admin_add__remove_list_record(yeahyeah_instance):
@@ -152,3 +392,374 @@ def test_url_pattern_plugin_admin_add_escape_all(yeahyeah_instance):
     )
     assert response.exit_code == 0
     assert len(url_pattern_plugin.pattern_list) == 4
+
+
+def run_bash(script_path, command):
+    """Source script_path in bash, run command with echo instead of a browser
+
+    Returns
+    -------
+    subprocess.CompletedProcess
+    """
+    return subprocess.run(
+        ["bash", "-c", f"source {script_path}; {command}"],
+        capture_output=True,
+        text=True,
+        env={"YEAHYEAH_OPEN": "echo opening", "PATH": "/usr/bin:/bin"},
+    )
+
+
+def test_url_pattern_plugin_export_shell(tmpdir, disable_click_echo):
+    plugin = UrlPatternsPlugin.__from_file_path__(Path(tmpdir) / "url_patterns.yaml")
+    plugin.pattern_list.append(
+        UrlPattern(name="quote", pattern="https://host/{a}?q='{b}'&x=$HOME")
+    )
+    response = CliRunner().invoke(plugin.get_admin_commands()[-1], [])
+    assert response.exit_code == 0
+    script = plugin.get_shell_export().path
+
+    result = run_bash(script, "wiki Some_article")
+    assert result.stdout == (
+        "https://en.wikipedia.org/wiki/Some_article\n"
+        "opening https://en.wikipedia.org/wiki/Some_article\n"
+    )
+    result = run_bash(script, "quote 'a b' \"it's\"")
+    assert result.stdout.splitlines()[0] == "https://host/a b?q='it's'&x=$HOME"
+    result = run_bash(script, "search one two")
+    assert result.stdout.splitlines()[0] == "loading https://duckduckgo.com/?q=one two"
+    result = run_bash(script, "wiki")
+    assert result.returncode == 2
+    assert "Usage: wiki ARTICLE_SLUG" in result.stderr
+
+
+def test_url_pattern_plugin_export_shell_builtins(tmpdir, disable_click_echo):
+    """Items named like shell builtins should only be exported with a prefix"""
+    plugin = UrlPatternsPlugin.__from_file_path__(Path(tmpdir) / "url_patterns.yaml")
+    plugin.pattern_list.append(UrlPattern(name="test", pattern="https://test"))
+    export_shell = plugin.get_admin_commands()[-1]
+    script = plugin.get_shell_export().path
+
+    CliRunner().invoke(export_shell, [])
+    assert "test()" not in script.read_text()
+    assert run_bash(script, "type -t test").stdout == "builtin\n"
+
+    CliRunner().invoke(export_shell, ["--prefix", "j_"])
+    assert run_bash(script, "type -t j_test").stdout == "function\n"
+
+
+def test_usage_log_size(tmpdir, monkeypatch):
+    """Usage log should only be written when enabled, and not grow too large"""
+    usage_log = UsageLog(Path(tmpdir) / "usage.log")
+    usage_log.record("a")
+    assert not usage_log.path.exists()
+
+    usage_log.enable()
+    monkeypatch.setattr(UsageLog, "MAX_SIZE", 100)
+    for name in "abcdefghijkl":
+        usage_log.record(name)
+    assert usage_log.path.stat().st_size <= 100
+    assert "l" in usage_log.frecency()
+    assert "a" not in usage_log.frecency()
+
+    usage_log.disable()
+    assert not usage_log.is_enabled()
+
+
+def test_url_pattern_plugin_export_shell_top(tmpdir, disable_click_echo):
+    """Only most frecently used patterns should be exported. Changes to patterns
+    should be exported right away
+    """
+    plugin = UrlPatternsPlugin.__from_file_path__(Path(tmpdir) / "url_patterns.yaml")
+    plugin.usage_log = UsageLog(Path(tmpdir) / "usage.log")
+    search = [x for x in plugin.get_commands() if x.name == "search"][0]
+    CliRunner().invoke(search, ["something"])
+    assert not plugin.usage_log.is_enabled()  # nothing uses usage yet
+
+    runner = CliRunner()
+    runner.invoke(plugin.get_admin_commands()[-1], "--top 1 --prefix j_".split(" "))
+    CliRunner().invoke(search, ["something"])
+    runner.invoke(plugin.get_admin_commands()[-1], "--top 1 --prefix j_".split(" "))
+    script = plugin.get_shell_export().path
+
+    assert run_bash(script, "type -t j_search").stdout == "function\n"
+    assert run_bash(script, "type -t j_wiki").stdout == ""
+    run_bash(script, "j_search else")  # shell functions record launches as well
+    assert plugin.usage_log.frecency() == {"search": 200}
+
+    for _ in range(3):
+        plugin.usage_log.record("virus")
+    runner.invoke(plugin.get_admin_commands()[-2], ["wiki"])  # remove
+    assert run_bash(script, "type -t j_search").stdout == ""
+    assert run_bash(script, "type -t j_virus").stdout == "function\n"
+
+
+def test_url_pattern_plugin_journal(tmpdir, disable_click_echo, monkeypatch):
+    """Admin add and remove should append to a journal instead of rewriting the
+    config file. Loading should replay the journal, edit should fold it back in
+    """
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    plugin = UrlPatternsPlugin.__from_file_path__(config_file)
+    journal_path = Path(tmpdir) / "url_patterns.yaml.journal"
+    original = config_file.read_text()
+    admin = {x.name: x for x in plugin.get_admin_commands()}
+    runner = CliRunner()
+
+    runner.invoke(admin["add"], ["new", "https://new/{q}"])
+    runner.invoke(admin["remove"], ["wiki"])
+    assert config_file.read_text() == original
+    assert len(journal_path.read_text().splitlines()) == 2
+    assert plugin.get_config_files() == [
+        config_file,
+        journal_path,
+        Path(tmpdir) / "url_patterns.d",  # fragments, see test_fragments
+    ]
+
+    with open(journal_path, "a") as f:
+        f.write('{"add": {"type": "UrlPat')  # interrupted append is ignored
+    names = [
+        x.name for x in UrlPatternsPlugin.__from_file_path__(config_file).pattern_list
+    ]
+    assert names == ["search", "virus", "new"]
+
+    with patch("yeahyeah_plugins.url_pattern_plugin.core.click.launch"):
+        runner.invoke(admin["edit"])
+    assert not journal_path.exists()
+    loaded = UrlPatternsPlugin.__from_file_path__(config_file).pattern_list
+    assert [x.name for x in loaded] == ["new", "search", "virus"]
+
+    monkeypatch.setattr(MenuItemJournal, "COMPACT_SIZE", 100)
+    runner.invoke(admin["add"], ["other", "https://other"])
+    assert journal_path.exists()
+    runner.invoke(admin["add"], ["another", "https://another"])
+    assert not journal_path.exists()
+    assert "another" in config_file.read_text()
+
+
+def test_journal_replay_is_idempotent(tmpdir):
+    """Replaying a journal that was already folded into the file, for example
+    after a crash during compaction, should not duplicate items
+    """
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    item = UrlPattern(name="a", pattern="https://a")
+    with open(config_file, "w") as f:
+        URLPatternList(items=[item]).save(f)
+    journal = MenuItemJournal(config_file, URLPatternList)
+    journal.record(added=[item, UrlPattern(name="b", pattern="https://b")])
+    journal.record(removed=["b"])
+    journal.record(added=[UrlPattern(name="b", pattern="https://b")])
+
+    assert [x.name for x in journal.load()] == ["a", "b"]
+
+
+def test_journal_find(tmpdir, monkeypatch):
+    """Finding a single item should apply the journal to that item only, and read
+    the parse cache when it is valid
+    """
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    items = [UrlPattern(name=x, pattern=f"https://{x}") for x in "abc"]
+    with open(config_file, "w") as f:
+        URLPatternList(items=items).save(f)
+    journal = MenuItemJournal(config_file, URLPatternList)
+    journal.record(added=[UrlPattern(name="b", pattern="https://new_b")])
+    journal.record(removed=["c"])
+    journal.record(added=[UrlPattern(name="d", pattern="https://d")])
+
+    assert journal.find("a").pattern == "https://a"
+    assert journal.find("b").pattern == "https://new_b"
+    assert journal.find("c") is None
+    assert journal.find("d").pattern == "https://d"
+    assert journal.find("e") is None
+
+    journal.load()  # writes parse cache
+    monkeypatch.setattr(
+        "yeahyeah.caches.iter_yaml_items", Mock(side_effect=AssertionError("Parsed"))
+    )
+    assert journal.find("a").pattern == "https://a"
+    assert journal.find("b").pattern == "https://new_b"
+
+
+def add_patterns(config_file, prefix, count):
+    """Add count patterns, each with a separate admin add like jj would"""
+    MenuItemJournal.COMPACT_SIZE = 2000  # compact often, in between other adds
+    for i in range(count):
+        plugin = UrlPatternsPlugin.__from_file_path__(config_file)
+        add = {x.name: x for x in plugin.get_admin_commands()}["add"]
+        add.main([f"{prefix}_{i}", f"https://{prefix}/{i}"], standalone_mode=False)
+
+
+def read_patterns(config_file, count):
+    """Load patterns count times. Returns number of patterns seen each time"""
+    return [
+        len(MenuItemJournal(config_file, URLPatternList).load()) for _ in range(count)
+    ]
+
+
+def test_concurrent_admin_add(tmpdir, disable_click_echo):
+    """Parallel adds should never lose an item, and parallel reads should never
+    see a broken file
+    """
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    UrlPatternsPlugin.assert_config_file(config_file)
+    with ProcessPoolExecutor(max_workers=8) as executor:
+        adds = [executor.submit(add_patterns, config_file, x, 40) for x in "abcdef"]
+        reads = [executor.submit(read_patterns, config_file, 100) for _ in range(2)]
+        for future in adds:
+            future.result()
+        for future in reads:
+            assert all(3 <= x <= 243 for x in future.result())
+
+    names = [x.name for x in MenuItemJournal(config_file, URLPatternList).load()]
+    assert len(names) == len(set(names)) == 243
+
+
+def test_url_pattern_plugin_sqlite_storage(tmpdir, disable_click_echo):
+    """Patterns can be stored in SQLite, and moved back to yaml"""
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    database = Path(tmpdir) / "url_patterns.sqlite"
+    plugin = UrlPatternsPlugin.__from_file_path__(config_file)
+    admin = {x.name: x for x in plugin.get_admin_commands()}
+    runner = CliRunner()
+
+    runner.invoke(admin["storage"], ["sqlite"])
+    original = config_file.read_text()
+    runner.invoke(admin["add"], ["new", "https://new/{q}"])
+    runner.invoke(admin["remove"], ["wiki"])
+    assert database.exists()
+    assert config_file.read_text() == original
+    assert plugin.get_config_files() == [
+        config_file,
+        database,
+        Path(tmpdir) / "url_patterns.d",  # fragments, see test_fragments
+    ]
+
+    loaded = UrlPatternsPlugin.__from_file_path__(config_file)
+    assert [x.name for x in loaded.pattern_list] == ["search", "virus", "new"]
+    assert [str(x) for x in loaded.storage.search("new")] == [
+        "URLPattern new:https://new/{q}"
+    ]
+
+    with patch("yeahyeah_plugins.url_pattern_plugin.core.click.launch"):
+        runner.invoke(admin["edit"])
+    assert "new" in config_file.read_text()
+
+    runner.invoke(admin["storage"], ["yaml"])
+    assert not database.exists()
+    loaded = UrlPatternsPlugin.__from_file_path__(config_file)
+    assert [x.name for x in loaded.pattern_list] == ["new", "search", "virus"]
+
+
+def test_url_pattern_plugin_import(tmpdir, disable_click_echo):
+    """Import adds all new patterns with a single save, and nothing on a dry run"""
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    journal_path = Path(tmpdir) / "url_patterns.yaml.journal"
+    import_file = Path(tmpdir) / "links.jsonl"
+    with open(import_file, "w") as f:
+        f.write('{"name": "wiki", "pattern": "https://other_wiki/{slug}"}\n')
+        f.writelines(f'{{"name": "l{i}", "url": "https://l/{i}"}}\n' for i in range(5))
+    plugin = UrlPatternsPlugin.__from_file_path__(config_file)
+    import_items = {x.name: x for x in plugin.get_admin_commands()}["import"]
+    runner = CliRunner()
+    original = config_file.read_text()
+
+    result = runner.invoke(import_items, [str(import_file), "--dry-run"])
+    assert result.exit_code == 0
+    assert config_file.read_text() == original
+    assert not journal_path.exists()
+
+    result = runner.invoke(import_items, [str(import_file)])
+    assert result.exit_code == 0
+    assert len(journal_path.read_text().splitlines()) == 5
+    loaded = UrlPatternsPlugin.__from_file_path__(config_file).pattern_list
+    assert [x.name for x in loaded] == ["search", "virus", "wiki"] + [
+        f"l{i}" for i in range(5)
+    ]
+    assert loaded[2].pattern == "https://en.wikipedia.org/wiki/{article_slug}"
+
+    runner.invoke(import_items, [str(import_file), "--replace"])
+    loaded = UrlPatternsPlugin.__from_file_path__(config_file).pattern_list
+    assert [x.name for x in loaded][-1] == "wiki"
+    assert loaded[-1].pattern == "https://other_wiki/{slug}"
+    assert len(loaded) == 8
+
+    result = runner.invoke(import_items, [str(import_file), "--format", "csv"])
+    assert result.exit_code == 1  # not a csv file
+
+
+def write_fragment(path, names):
+    path.parent.mkdir(exist_ok=True)
+    with open(path, "w") as f:
+        URLPatternList(
+            items=[UrlPattern(name=x, pattern=f"https://{x}") for x in names]
+        ).save(f)
+
+
+def test_fragments(tmpdir, monkeypatch):
+    """Fragments load in name order, and loading again only parses fragments
+    that changed
+    """
+    folder = Path(tmpdir) / "url_patterns.d"
+    fragments = MenuItemFragments([folder], URLPatternList)
+    assert list(fragments.load()) == []
+    write_fragment(folder / "b_team.yaml", ["b1", "b2"])
+    write_fragment(folder / "a_team.yaml", ["a1"])
+    (folder / "notes.txt").write_text("not a fragment")
+
+    assert fragments.is_changed()
+    assert [x.name for x in fragments.load()] == ["a1", "b1", "b2"]
+    assert not fragments.is_changed()
+
+    parse = Mock(wraps=fragments.parse)
+    monkeypatch.setattr(fragments, "parse", parse)
+    write_fragment(folder / "b_team.yaml", ["b3"])
+    assert [x.name for x in fragments.load()] == ["a1", "b3"]
+    assert parse.call_args[0][0] == [folder / "b_team.yaml"]
+
+    (folder / "a_team.yaml").unlink()
+    assert [x.name for x in fragments.load()] == ["b3"]
+    assert parse.call_args[0][0] == []  # nothing changed, nothing to parse
+
+    # a new instance, as in a new process, reads unchanged fragments from cache
+    monkeypatch.setattr(
+        "yeahyeah.caches.iter_yaml_items", Mock(side_effect=AssertionError)
+    )
+    loaded = MenuItemFragments([folder], URLPatternList).load()
+    assert [x.name for x in loaded] == ["b3"]
+
+
+def test_fragments_parallel(tmpdir, monkeypatch):
+    folder = Path(tmpdir) / "url_patterns.d"
+    for i in range(10):
+        write_fragment(folder / f"team_{i}.yaml", [f"t{i}_a", f"t{i}_b"])
+    monkeypatch.setattr(MenuItemFragments, "PARALLEL_MIN", 4)
+
+    loaded = MenuItemFragments([folder], URLPatternList, max_workers=2).load()
+    assert len(loaded) == 20
+    assert loaded[-1].name == "t9_b"
+
+    with open(folder / "team_3.yaml", "a") as f:
+        f.write("broken:\n  no_pattern: here\n")
+    with pytest.raises(MenuItemLoadError, match="team_3.yaml"):
+        MenuItemFragments([folder], URLPatternList).load()
+
+
+def test_url_pattern_plugin_fragments(tmpdir, disable_click_echo):
+    """Fragment patterns become commands. Own patterns win, and admin changes
+    never write fragment patterns to the config file
+    """
+    config_file = Path(tmpdir) / "url_patterns.yaml"
+    folder = Path(tmpdir) / "url_patterns.d"
+    write_fragment(folder / "team.yaml", ["team_wiki", "wiki"])
+    plugin = UrlPatternsPlugin.__from_file_path__(config_file)
+
+    commands = {x.name: x for x in plugin.get_commands()}
+    assert "team_wiki" in commands
+    assert plugin.get_command_data()["wiki"]["item"]["wiki"]["pattern"] == (
+        "https://en.wikipedia.org/wiki/{article_slug}"
+    )
+    assert folder / "team.yaml" in plugin.get_config_files()
+
+    admin = {x.name: x for x in plugin.get_admin_commands()}
+    write_fragment(folder / "other_team.yaml", ["other"])
+    CliRunner().invoke(admin["add"], ["new", "https://new"])
+    assert "other" in [x.name for x in plugin.get_all_items()]  # reloaded
+    assert "team_wiki" not in config_file.read_text()